@@ -0,0 +1,43 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p95_ms", help="Latency field to compare (p50_ms, p95_ms, p99_ms, ...)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown reported as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    with open(args.candidate) as f:
+        candidate = json.load(f)["results"]
+
+    regressions = 0
+    for size in sorted(set(baseline) & set(candidate), key=int):
+        print(f"== {size} users")
+        for op, old in baseline[size].items():
+            new = candidate[size].get(op)
+            if not isinstance(old, dict) or not isinstance(new, dict) or args.metric not in old:
+                continue
+            before, after = old[args.metric], new[args.metric]
+            change = (after - before) / before * 100 if before else 0.0
+            flag = ""
+            if change > args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"  {op:24s} {before:10.3f} -> {after:10.3f} ms  ({change:+6.1f}%){flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
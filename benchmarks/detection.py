@@ -0,0 +1,97 @@
+"""
+Detection speed/accuracy trade-off for the settings in utils/config.py.
+
+Runs face detection over a recorded video (or image folder) once per setting
+and reports frames per second plus recall/precision against a full-resolution
+reference pass.
+
+    python -m benchmarks.detection --source hallway.mp4 --frames 300
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import cv2
+
+from core.recognition import FaceRecognizer
+from core.sources import iter_frames
+from core.tracker import iou
+from utils.config import Config
+
+# name -> (detection_scale, detection_roi, detect_around_tracks)
+SETTINGS: Dict[str, tuple] = {
+    "full": (1.0, None, False),
+    "scale_0.75": (0.75, None, False),
+    "scale_0.5": (0.5, None, False),
+    "scale_0.33": (0.33, None, False),
+    "scale_0.5_roi_center": (0.5, (0.2, 0.0, 0.8, 1.0), False),
+    "scale_0.5_tracks": (0.5, None, True),
+}
+
+
+def match_boxes(found: List[tuple], reference: List[tuple], threshold: float = 0.5) -> int:
+    """Number of reference boxes matched by a found box with IoU >= threshold."""
+    matched, used = 0, set()
+    for ref in reference:
+        for i, box in enumerate(found):
+            if i not in used and iou(box, ref) >= threshold:
+                used.add(i)
+                matched += 1
+                break
+    return matched
+
+
+def run_setting(recognizer: FaceRecognizer, grays: list, scale: float, roi, around_tracks: bool):
+    recognizer.detection_scale = scale
+    recognizer.detection_roi = roi
+    recognizer.detect_around_tracks = around_tracks
+    recognizer.reset_tracking()
+
+    detections = []
+    start = time.perf_counter()
+    for gray in grays:
+        faces = recognizer.detect_faces(gray)
+        if recognizer.tracker is not None:
+            recognizer.tracker.update(faces)
+        detections.append(faces)
+    elapsed = time.perf_counter() - start
+    return detections, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", required=True, help="Video file or directory of images")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    grays = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in iter_frames(args.source, args.frames)]
+    if not grays:
+        raise SystemExit(f"No frames read from {args.source}")
+
+    recognizer = FaceRecognizer(db_manager=None, server_url=None)
+    reference, _ = run_setting(recognizer, grays, *SETTINGS["full"])
+
+    results = {}
+    for name, setting in SETTINGS.items():
+        detections, elapsed = run_setting(recognizer, grays, *setting)
+        ref_total = sum(len(r) for r in reference)
+        found_total = sum(len(d) for d in detections)
+        hits = sum(match_boxes(d, r) for d, r in zip(detections, reference))
+        results[name] = {
+            "fps": round(len(grays) / elapsed, 1),
+            "recall": round(hits / ref_total, 3) if ref_total else None,
+            "precision": round(hits / found_total, 3) if found_total else None,
+        }
+        print(f"{name:24s} {results[name]['fps']:8.1f} fps  recall={results[name]['recall']}  "
+              f"precision={results[name]['precision']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"source": args.source, "frames": len(grays),
+                       "scale_factor": Config.DETECTION_SCALE_FACTOR, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Timing helpers shared by the benchmark scripts."""
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds plus throughput (calls/sec) for a list of durations in seconds."""
+    arr = np.asarray(samples, dtype=np.float64) * 1000.0
+    total = arr.sum() / 1000.0
+    return {
+        "n": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 4),
+        "p50_ms": round(float(np.percentile(arr, 50)), 4),
+        "p95_ms": round(float(np.percentile(arr, 95)), 4),
+        "p99_ms": round(float(np.percentile(arr, 99)), 4),
+        "max_ms": round(float(arr.max()), 4),
+        "throughput_per_s": round(arr.size / total, 2) if total > 0 else None,
+    }
+
+
+def measure(fn: Callable[[int], object], repeat: int, warmup: int = 3) -> Dict[str, float]:
+    """Call fn(i) `repeat` times (after `warmup` untimed calls) and summarize the latencies."""
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
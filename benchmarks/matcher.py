@@ -0,0 +1,107 @@
+"""
+cv2 LBPH predict vs the vectorized NumPy matcher (core/lbp_matcher.py).
+
+For each model size it trains an LBPH model on synthetic users, builds
+LBPHMatcher instances from it, and reports per-query latency percentiles plus
+how often each matcher agrees with cv2 on the top-1 label and how often it
+names the right user.
+
+    python -m benchmarks.matcher --sizes 1000,10000 --samples 3 --output matcher.json
+
+Every template is a grid_x * grid_y * 256 float32 histogram (64 KB with the
+defaults), held once by cv2 and once by each matcher, so 10k users at 3
+samples needs roughly 4 GB of RAM.
+"""
+import argparse
+import json
+from typing import Dict
+
+import cv2
+import numpy as np
+
+from benchmarks.harness import measure
+from benchmarks.synthetic import synthetic_face
+from core.lbp_matcher import LBPHMatcher
+
+# name -> LBPHMatcher keyword arguments
+VARIANTS: Dict[str, dict] = {
+    "numpy_chisqr": {"metric": "chisqr"},
+    "numpy_chisqr_mean": {"metric": "chisqr", "prototypes_per_user": 1},
+    "numpy_hellinger": {"metric": "hellinger"},
+}
+
+
+def build_model(users: int, samples: int, chunk: int = 500):
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    for start in range(0, users, chunk):
+        faces, labels = [], []
+        for u in range(start, min(users, start + chunk)):
+            for s in range(samples):
+                faces.append(synthetic_face(u, s))
+                labels.append(u)
+        if start == 0:
+            recognizer.train(faces, np.array(labels))
+        else:
+            recognizer.update(faces, np.array(labels))
+    return recognizer
+
+
+def bench_size(users: int, args) -> Dict:
+    results: Dict = {"users": users, "templates": users * args.samples}
+    recognizer = build_model(users, args.samples)
+
+    rng = np.random.default_rng(0)
+    expected = rng.integers(0, users, args.queries)
+    queries = [synthetic_face(int(u), 1000 + i) for i, u in enumerate(expected)]
+
+    reference = [recognizer.predict(q)[0] for q in queries]
+    results["cv2"] = measure(lambda i: recognizer.predict(queries[i % len(queries)]), repeat=args.queries)
+    results["cv2"]["accuracy"] = round(float(np.mean(np.array(reference) == expected)), 3)
+
+    for name, kwargs in VARIANTS.items():
+        matcher = LBPHMatcher.from_cv2(recognizer, **kwargs)
+        labels = [matcher.match(q)[0][0] for q in queries]
+        results[name] = measure(lambda i: matcher.match(queries[i % len(queries)]), repeat=args.queries)
+        results[name]["accuracy"] = round(float(np.mean(np.array(labels) == expected)), 3)
+        results[name]["agreement"] = round(float(np.mean(np.array(labels) == np.array(reference))), 3)
+        results[name]["templates"] = len(matcher)
+        del matcher
+
+    # Top-k is a by-product of the same distance pass
+    matcher = LBPHMatcher.from_cv2(recognizer, metric="chisqr")
+    results[f"numpy_top{args.k}"] = measure(lambda i: matcher.match(queries[i % len(queries)], k=args.k),
+                                            repeat=args.queries)
+    hits = [expected[i] in [label for label, _ in matcher.match(q, k=args.k)] for i, q in enumerate(queries)]
+    results[f"numpy_top{args.k}"]["accuracy"] = round(float(np.mean(hits)), 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated enrolled-user counts")
+    parser.add_argument("--samples", type=int, default=3, help="Training samples per user")
+    parser.add_argument("--queries", type=int, default=100, help="Predictions timed per matcher")
+    parser.add_argument("--k", type=int, default=5, help="k for the top-k run")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)  # predict is single-threaded; keep the comparison fair
+    report = {"args": vars(args), "results": {}}
+    for users in (int(s) for s in args.sizes.split(",")):
+        print(f"== {users} users x {args.samples} samples")
+        result = bench_size(users, args)
+        report["results"][str(users)] = result
+        for key, value in result.items():
+            if isinstance(value, dict):
+                extra = "".join(f"  {k}={value[k]}" for k in ("accuracy", "agreement") if k in value)
+                print(f"  {key:20s} p50={value['p50_ms']:.3f}ms p95={value['p95_ms']:.3f}ms "
+                      f"p99={value['p99_ms']:.3f}ms{extra}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
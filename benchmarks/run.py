@@ -0,0 +1,192 @@
+"""
+Benchmark suite for the recognition, registration and database hot paths.
+
+For each model size it builds a fresh LBPH model of synthetic users, fills
+attendance.db with years of synthetic history, and records latency
+percentiles and throughput for process_frame, register_new_face, model load,
+log_attendance, get_stats, get_recent_logs and the summary reports. Results
+are written as JSON; compare two runs with
+`python -m benchmarks.compare old.json new.json`.
+
+    python -m benchmarks.run --sizes 10,1000,10000 --output bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from benchmarks.harness import measure, summarize
+from benchmarks.synthetic import fill_attendance, registration_frames, synthetic_face, synthetic_frame
+from utils.config import Config
+
+
+def face_crop(recognizer, user: int, sample: int) -> np.ndarray:
+    """Detect a synthetic face the way registration does and return the grayscale crop."""
+    face = synthetic_face(user, sample)
+    canvas = np.full((face.shape[0] + 80, face.shape[1] + 80), 100, np.uint8)
+    canvas[40:40 + face.shape[0], 40:40 + face.shape[1]] = face
+    found = recognizer.face_cascade.detectMultiScale(canvas, scaleFactor=1.1, minNeighbors=5, minSize=(50, 50))
+    if len(found) == 0:
+        return face
+    x, y, w, h = max(found, key=lambda r: r[2] * r[3])
+    return canvas[y:y + h, x:x + w]
+
+
+def bulk_enroll(db, recognizer, users: int, samples: int, chunk: int = 500) -> None:
+    """Add users straight to the model, one save per chunk (too slow to do one register_new_face each)."""
+    for start in range(0, users, chunk):
+        entries = []
+        for u in range(start, min(users, start + chunk)):
+            ok, user_id = db.add_user_placeholder(f"user-{u}", f"BENCH-{u}")
+            entries.append((user_id, f"user-{u}", [face_crop(recognizer, u, s) for s in range(samples)]))
+        if entries:
+            recognizer.save_samples(entries)
+
+
+def bench_size(users: int, args) -> Dict:
+    from core.database import DatabaseManager
+    from core.recognition import FaceRecognizer
+
+    results: Dict = {"users": users}
+    db = DatabaseManager(connect_cloud=False)
+    recognizer = FaceRecognizer(db, server_url=None)  # Time the local model, not a shared server
+
+    # Model build: bulk users first, then the last few through the real registration path
+    registered = min(args.register, users)
+    start = time.perf_counter()
+    bulk_enroll(db, recognizer, users - registered, args.bulk_samples)
+    results["bulk_enroll_s"] = round(time.perf_counter() - start, 2)
+
+    samples: List[float] = []
+    for i in range(registered):
+        u = users - registered + i
+        frames = registration_frames(u, args.register_frames)
+        start = time.perf_counter()
+        ok, msg = recognizer.register_new_face(frames, f"user-{u}", f"BENCH-{u}")
+        samples.append(time.perf_counter() - start)
+        if not ok:
+            print(f"  registration of user-{u} failed: {msg}", file=sys.stderr)
+    if samples:
+        results["register_new_face"] = summarize(samples)
+    model_file = recognizer.store.path if recognizer.store is not None else recognizer.model_path
+    results["model_bytes"] = os.path.getsize(model_file) if os.path.exists(model_file) else 0
+
+    results["model_load"] = measure(lambda i: FaceRecognizer(db, server_url=None), repeat=args.load_repeat, warmup=0)
+
+    # Recognition: one known face per frame, tracking off so every frame pays for predict
+    recognizer.tracker = None
+    user_ids = sorted(recognizer.known_face_names)
+    name_to_seed = {name: int(name.split("-")[1]) for name in recognizer.known_face_names.values()}
+    frames = []
+    for i in range(args.frames):
+        user_id = user_ids[i % len(user_ids)]
+        seed = name_to_seed[recognizer.known_face_names[user_id]]
+        frames.append((user_id, synthetic_frame(synthetic_face(seed, 1000 + i))))
+    correct = 0
+
+    def recognize(i):
+        nonlocal correct
+        expected, frame = frames[i % len(frames)]
+        _, _, ids = recognizer.process_frame(frame)
+        correct += expected in ids
+
+    results["process_frame"] = measure(recognize, repeat=args.frames, warmup=0)
+    results["process_frame"]["accuracy"] = round(correct / args.frames, 3)
+    results["predict_calls"] = recognizer.predict_calls
+
+    # Database: years of history, then the per-sighting and dashboard queries
+    start = time.perf_counter()
+    results["attendance_rows"] = fill_attendance(Config.DB_PATH, min(users, args.log_users), args.years)
+    results["fill_attendance_s"] = round(time.perf_counter() - start, 2)
+    new_ids = iter(range(10_000_000, 20_000_000))
+    results["log_attendance_first"] = measure(lambda i: db.log_attendance(next(new_ids), "new"), repeat=args.db_repeat)
+    results["log_attendance_repeat"] = measure(lambda i: db.log_attendance(10_000_000, "new"), repeat=args.db_repeat)
+    results["get_stats"] = measure(lambda i: db.get_stats(), repeat=args.db_repeat)
+    results["get_recent_logs"] = measure(lambda i: db.get_recent_logs(limit=20), repeat=args.db_repeat)
+
+    # Reports read the daily summary, so it is rebuilt for the synthetic history first
+    start = time.perf_counter()
+    db.backfill_daily_summary()
+    results["backfill_summary_s"] = round(time.perf_counter() - start, 2)
+    month_ago = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
+    today = datetime.date.today().isoformat()
+    results["daily_report_30d"] = measure(lambda i: db.get_daily_report(month_ago, today), repeat=args.db_repeat)
+    results["user_report_30d"] = measure(lambda i: db.get_user_report(1, month_ago, today), repeat=args.db_repeat)
+
+    db.close()
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)), text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,10000", help="Comma-separated enrolled-user counts")
+    parser.add_argument("--bulk-samples", type=int, default=3, help="Samples per bulk-enrolled user")
+    parser.add_argument("--register", type=int, default=5, help="Users enrolled through register_new_face per size")
+    parser.add_argument("--register-frames", type=int, default=30, help="Frames per registration burst")
+    parser.add_argument("--frames", type=int, default=200, help="process_frame calls per size")
+    parser.add_argument("--load-repeat", type=int, default=3)
+    parser.add_argument("--years", type=float, default=3.0, help="Years of synthetic attendance history")
+    parser.add_argument("--log-users", type=int, default=200, help="Users appearing in the synthetic history")
+    parser.add_argument("--db-repeat", type=int, default=500)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directories")
+    args = parser.parse_args()
+    args.output = os.path.abspath(args.output)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": {},
+    }
+
+    cwd = os.getcwd()
+    for users in (int(s) for s in args.sizes.split(",")):
+        workdir = tempfile.mkdtemp(prefix=f"bench_{users}_")
+        os.chdir(workdir)  # FaceRecognizer keeps its model files in the working directory
+        Config.DB_PATH = os.path.join(workdir, "attendance.db")
+        Config.USE_CLOUD = False  # Synthetic rows must never reach the real cloud table
+        print(f"== {users} users ({workdir})")
+        try:
+            result = bench_size(users, args)
+        finally:
+            os.chdir(cwd)
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+        report["results"][str(users)] = result
+        for key, value in result.items():
+            if isinstance(value, dict):
+                print(f"  {key:24s} p50={value['p50_ms']:.3f}ms p95={value['p95_ms']:.3f}ms "
+                      f"p99={value['p99_ms']:.3f}ms  {value['throughput_per_s']}/s")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+In-process matching vs the shared recognition server (core/recognition_service.py) on localhost.
+
+It enrols synthetic users straight into the server's matcher, then reports
+per-crop latency in-process and over HTTP from one client, and the request
+rate and batch sizes with several clients sending at once.
+
+    python -m benchmarks.server --users 1000 --clients 1,4,16 --output server.json
+"""
+import argparse
+import json
+import threading
+import time
+from typing import Dict
+
+import numpy as np
+
+from benchmarks.harness import measure
+from benchmarks.synthetic import synthetic_face
+from core.metrics import metrics
+from core.recognition import FaceRecognizer
+from core.recognition_service import RecognitionClient, RecognitionServer
+
+
+def build_recognizer(users: int, samples: int) -> FaceRecognizer:
+    recognizer = FaceRecognizer(db_manager=None, server_url=None)
+    recognizer.matcher = recognizer.matcher or recognizer._new_matcher()
+    hists = np.vstack([recognizer.matcher.histogram(synthetic_face(u, s)) for u in range(users) for s in range(samples)])
+    recognizer.matcher.set_templates(hists, np.repeat(np.arange(users, dtype=np.int32), samples))
+    recognizer.known_face_names = {u: f"user-{u}" for u in range(users)}
+    recognizer.is_trained = True
+    return recognizer
+
+
+def bench_clients(server: RecognitionServer, clients: int, requests: int, users: int) -> Dict:
+    metrics.reset()
+
+    def run(c: int):
+        client = RecognitionClient(server.url, timeout=30.0)
+        for i in range(requests):
+            client.identify([synthetic_face((c + i) % users, 1000 + i)])
+
+    threads = [threading.Thread(target=run, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    counters = metrics.counters()
+    return {"clients": clients, "requests_per_s": round(clients * requests / elapsed, 1),
+            "mean_batch": round(counters["server_requests"] / max(1.0, counters["server_batches"]), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="Enrolled synthetic users")
+    parser.add_argument("--samples", type=int, default=3, help="Templates per user")
+    parser.add_argument("--clients", default="1,4,16", help="Comma-separated concurrent client counts")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per client")
+    parser.add_argument("--workers", type=int, default=2, help="Server worker threads")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    metrics.enabled = True  # The batch counters come from the metrics registry
+    recognizer = build_recognizer(args.users, args.samples)
+    server = RecognitionServer(lambda: recognizer, workers=args.workers, max_batch=args.max_batch)
+    server.start()
+    try:
+        queries = [synthetic_face(i % args.users, 2000 + i) for i in range(args.requests)]
+        client = RecognitionClient(server.url, timeout=30.0)
+        results: Dict = {
+            "in_process": measure(lambda i: recognizer.predict_batch([queries[i % len(queries)]]), repeat=args.requests),
+            "server_1_client": measure(lambda i: client.identify([queries[i % len(queries)]]), repeat=args.requests),
+            "concurrent": [bench_clients(server, int(n), args.requests, args.users) for n in args.clients.split(",")],
+        }
+    finally:
+        server.stop()
+
+    for key in ("in_process", "server_1_client"):
+        r = results[key]
+        print(f"{key:16s} p50={r['p50_ms']:.3f}ms p95={r['p95_ms']:.3f}ms p99={r['p99_ms']:.3f}ms")
+    for r in results["concurrent"]:
+        print(f"{r['clients']:3d} clients     {r['requests_per_s']:8.1f} req/s  mean batch {r['mean_batch']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
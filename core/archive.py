@@ -0,0 +1,90 @@
+import os
+import re
+import glob
+import sqlite3
+import pathlib
+from typing import List
+
+ARCHIVE_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS archive.attendance (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        name TEXT,
+        timestamp DATETIME,
+        synced BOOLEAN DEFAULT 0
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS archive.idx_attendance_ts_user ON attendance(timestamp, user_id)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_attendance_user_ts ON attendance(user_id, timestamp)",
+)
+
+
+def month_bounds(month: str):
+    """Half-open [start, end) timestamp strings for a "YYYY-MM" month."""
+    year, mon = int(month[:4]), int(month[5:7])
+    next_month = f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+    return f"{month}-01 00:00:00", f"{next_month}-01 00:00:00"
+
+
+def shift_month(month: str, months: int) -> str:
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+class AttendanceArchive:
+    """
+    Closed months of attendance, moved out of the live table into one SQLite
+    file per month (`attendance-YYYY-MM.db`, same columns and indexes). The live
+    table stays small, and a month is only opened when a query reaches it.
+
+    Rows are copied and committed to the archive before they are deleted from
+    the live table, so a crash in between leaves a copy in both; archiving the
+    month again removes it from the live table.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, month: str) -> str:
+        return os.path.join(self.directory, f"attendance-{month}.db")
+
+    def months(self) -> List[str]:
+        """Archived months, oldest first."""
+        pattern = re.compile(r"attendance-(\d{4}-\d{2})\.db$")
+        found = (pattern.search(path) for path in glob.glob(os.path.join(self.directory, "attendance-*.db")))
+        return sorted(match.group(1) for match in found if match)
+
+    def contains(self, month: str) -> bool:
+        return os.path.exists(self.path(month))
+
+    def connect(self, month: str) -> sqlite3.Connection:
+        """Read-only connection to one month's archive."""
+        uri = pathlib.Path(self.path(month)).absolute().as_uri() + "?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def archive_month(self, conn: sqlite3.Connection, month: str, synced_only: bool) -> int:
+        """
+        Move one month's rows from the live table (on the writer connection `conn`,
+        with no transaction open) into its archive file. With synced_only, rows still
+        waiting for the cloud upload stay in the live table. Returns the rows moved.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        start, end = month_bounds(month)
+        where = "timestamp >= ? AND timestamp < ?" + (" AND synced = 1" if synced_only else "")
+
+        conn.execute("ATTACH DATABASE ? AS archive", (self.path(month),))
+        try:
+            for statement in ARCHIVE_SCHEMA:
+                conn.execute(statement)
+            # Copy and commit first: the archive is durable before anything leaves the live table
+            conn.execute("INSERT OR IGNORE INTO archive.attendance (id, user_id, name, timestamp, synced) "
+                         f"SELECT id, user_id, name, timestamp, synced FROM main.attendance WHERE {where}",
+                         (start, end))
+            conn.commit()
+            moved = conn.execute(f"DELETE FROM main.attendance WHERE {where}", (start, end)).rowcount
+            conn.commit()
+            conn.execute("VACUUM archive")
+        finally:
+            conn.execute("DETACH DATABASE archive")
+        return moved
@@ -0,0 +1,167 @@
+import os
+import csv
+import time
+import logging
+import multiprocessing
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.sources import list_images
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+MAX_PHOTO_SIDE = 1280  # Larger photos are downscaled before detection
+
+
+@dataclass
+class RosterEntry:
+    name: str
+    employee_id: str
+    photo_dir: str
+
+
+def read_roster(csv_path: str, photos_root: Optional[str] = None) -> List[RosterEntry]:
+    """
+    Read a CSV with `name` and `employee_id` columns and an optional `photos`
+    column (a folder, relative to the CSV). Without it, photos are expected in
+    <photos_root>/<employee_id>/.
+    """
+    base = os.path.dirname(os.path.abspath(csv_path))
+    photos_root = photos_root or base
+    entries: List[RosterEntry] = []
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = {"name", "employee_id"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"{csv_path} is missing columns: {', '.join(sorted(missing))}")
+        for row in reader:
+            name, employee_id = row["name"].strip(), row["employee_id"].strip()
+            if not name and not employee_id:
+                continue
+            photos = (row.get("photos") or "").strip()
+            photo_dir = os.path.join(base, photos) if photos else os.path.join(photos_root, employee_id)
+            entries.append(RosterEntry(name, employee_id, photo_dir))
+    return entries
+
+
+# Per-process state, created once by the pool initializer
+_worker_cascade = None
+
+
+def _init_worker(cascade_path: str) -> None:
+    global _worker_cascade
+    import cv2
+    # Parallelism comes from the pool; OpenCV's own threads would only oversubscribe the cores
+    cv2.setNumThreads(1)
+    _worker_cascade = cv2.CascadeClassifier(cascade_path)
+
+
+def _extract(entry: RosterEntry) -> Tuple[RosterEntry, Optional[np.ndarray], int, str]:
+    """Worker: (entry, samples (n, size, size) uint8 or None, photos read, error)."""
+    import cv2
+    from core.enrollment import SampleBuffer, extract_face
+
+    if not os.path.isdir(entry.photo_dir):
+        return entry, None, 0, f"photo folder not found: {entry.photo_dir}"
+    photos = list_images(entry.photo_dir)
+    buffer = SampleBuffer(Config.REGISTRATION_SAMPLES, Config.SAMPLE_SIZE, Config.SAMPLE_DUPLICATE_THRESHOLD)
+    rejected: Dict[str, int] = {}
+    for path in photos:
+        if buffer.is_full():
+            break
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            rejected["unreadable"] = rejected.get("unreadable", 0) + 1
+            continue
+        scale = MAX_PHOTO_SIDE / max(gray.shape)
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        crop, score, reason = extract_face(gray, _worker_cascade, min_sharpness=Config.SAMPLE_MIN_SHARPNESS,
+                                           brightness_range=Config.SAMPLE_BRIGHTNESS_RANGE)
+        if reason is None and not buffer.add(crop, score):
+            reason = "duplicate"
+        if reason:
+            rejected[reason] = rejected.get(reason, 0) + 1
+
+    if buffer.count == 0:
+        detail = ", ".join(f"{n} {reason}" for reason, n in rejected.items()) or "no photos"
+        return entry, None, len(photos), f"no usable face ({detail})"
+    return entry, buffer.crops[:buffer.count].copy(), len(photos), ""
+
+
+class BulkImporter:
+    """
+    Enrol a whole roster from photos: face extraction runs in a process pool,
+    then every user is inserted in one transaction and the model is saved once.
+    """
+
+    def __init__(self, recognizer, db_manager, workers: Optional[int] = None, min_samples: int = 1):
+        self.recognizer = recognizer
+        self.db = db_manager
+        self.workers = workers or os.cpu_count() or 1
+        self.min_samples = min_samples
+
+    def run(self, entries: List[RosterEntry]) -> Dict:
+        start = time.perf_counter()
+        failures: List[Dict[str, str]] = []
+        ready: List[Tuple[RosterEntry, np.ndarray]] = []
+        photos = 0
+
+        seen = set()
+        unique = []
+        for entry in entries:
+            if entry.employee_id in seen:
+                failures.append({"employee_id": entry.employee_id, "name": entry.name,
+                                 "reason": "duplicate employee_id in roster"})
+            else:
+                seen.add(entry.employee_id)
+                unique.append(entry)
+
+        with multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                  initargs=(self.recognizer.cascade_path,)) as pool:
+            for i, (entry, samples, n_photos, error) in enumerate(
+                    pool.imap_unordered(_extract, unique, chunksize=4), 1):
+                photos += n_photos
+                if not error and len(samples) < self.min_samples:
+                    error = f"only {len(samples)} usable faces in {n_photos} photos"
+                if error:
+                    failures.append({"employee_id": entry.employee_id, "name": entry.name, "reason": error})
+                else:
+                    ready.append((entry, samples))
+                if i % 100 == 0:
+                    logger.info(f"Extracted faces for {i}/{len(unique)} users")
+        extract_time = time.perf_counter() - start
+
+        # Users are committed in one transaction before the model is saved, so the model
+        # never holds templates for ids that were rolled back (and could be handed out again)
+        by_id = {entry.employee_id: (entry, samples) for entry, samples in ready}
+        added, rejected = self.db.add_users([(e.name, e.employee_id) for e, _ in ready])
+        for employee_id, reason in rejected.items():
+            failures.append({"employee_id": employee_id, "name": by_id[employee_id][0].name, "reason": reason})
+        if added:
+            try:
+                self.recognizer.save_samples([(user_id, by_id[eid][0].name, list(by_id[eid][1]))
+                                              for eid, user_id in added.items()])
+            except Exception as e:
+                logger.error(f"Saving the face model failed, removing the {len(added)} new users: {e}")
+                self.db.delete_users(list(added.values()))
+                failures += [{"employee_id": eid, "name": by_id[eid][0].name, "reason": f"model save failed: {e}"}
+                             for eid in added]
+                added = {}
+
+        elapsed = time.perf_counter() - start
+        return {
+            "users": len(entries),
+            "imported": len(added),
+            "failed": len(failures),
+            "failures": failures,
+            "photos": photos,
+            "samples": int(sum(len(by_id[eid][1]) for eid in added)),
+            "seconds": round(elapsed, 2),
+            "extract_seconds": round(extract_time, 2),
+            "photos_per_s": round(photos / extract_time, 1) if extract_time > 0 else None,
+            "users_per_s": round(len(added) / elapsed, 1) if elapsed > 0 else None,
+        }
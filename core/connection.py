@@ -0,0 +1,107 @@
+import sqlite3
+import weakref
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+# Applied to every connection. WAL lets readers run alongside the single writer,
+# and synchronous=NORMAL is durable enough under WAL while avoiding an fsync per commit.
+PRAGMAS = (
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",      # ~16 MB page cache
+    "PRAGMA mmap_size = 268435456",    # 256 MB memory-mapped reads
+)
+
+
+class _ReaderHolder:
+    """Per-thread slot for a reader connection; weak-referenceable, unlike the connection itself."""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+class ConnectionManager:
+    """
+    Owns the SQLite connections for one database file.
+
+    There is a single long-lived writer connection, serialized by a lock, and one
+    reader connection per thread, closed when that thread exits. Any thread (UI,
+    registration, recognition) can call `reader()` or `writer()` concurrently.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._write_depth = 0  # Nesting of writer() blocks on the thread holding the lock
+
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode = WAL")
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        # Connections are only ever used by one thread at a time (per-thread
+        # readers, lock-guarded writer), but close_all() runs on any thread.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        if readonly:
+            # Autocommit so a reader never holds a WAL snapshot open between queries
+            conn.isolation_level = None
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """Return the calling thread's read-only connection, opening it on first use."""
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = _ReaderHolder(self._connect(readonly=True))
+            self._local.holder = holder
+            with self._readers_lock:
+                self._readers.append(holder.conn)
+            # Thread-local values are dropped when their thread exits; close the connection with them
+            weakref.finalize(holder, self._release, holder.conn)
+        return holder.conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        with self._readers_lock:
+            if conn in self._readers:
+                self._readers.remove(conn)
+        conn.close()
+
+    @property
+    def open_readers(self) -> int:
+        with self._readers_lock:
+            return len(self._readers)
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Exclusive access to the writer connection; commits on success, rolls back
+        on error. A nested writer() block joins the outer transaction.
+        """
+        with self._write_lock:
+            self._write_depth += 1
+            try:
+                yield self._writer
+                if self._write_depth == 1:
+                    self._writer.commit()
+            except Exception:
+                if self._write_depth == 1:
+                    self._writer.rollback()
+                raise
+            finally:
+                self._write_depth -= 1
+
+    def close_all(self) -> None:
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        with self._write_lock:
+            self._writer.close()
@@ -3,15 +3,70 @@ import datetime
 from utils.config import Config
 import os
 import json
+import zlib
+import heapq
+import threading
+import numpy as np
+from contextlib import closing
+from core.archive import AttendanceArchive, month_bounds, shift_month
+from core.connection import ConnectionManager
+from core.migrations import migrate, backfill_daily_summary
+from core.sync import CloudSyncWorker, RestUploader, supabase_uploader
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# One row per (day, user): check-ins counted, earliest and latest sighting kept
+SUMMARY_UPSERT = (
+    "INSERT INTO daily_attendance_summary (day, user_id, name, first_seen, last_seen, count) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(day, user_id) DO UPDATE SET count = count + excluded.count, name = excluded.name, "
+    "first_seen = MIN(first_seen, excluded.first_seen), last_seen = MAX(last_seen, excluded.last_seen)"
+)
+
+
+def day_bounds(day):
+    """Half-open [start, end) timestamp strings for a local date, usable as an index range."""
+    start = datetime.datetime.combine(day, datetime.time.min)
+    end = start + datetime.timedelta(days=1)
+    return start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)
+
+
+def decode_samples(count, size, blob):
+    """Inverse of the face_samples encoding: a (count, size, size) uint8 array."""
+    return np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(count, size, size)
+
+
+def _chunked(cursor, size):
+    """Rows of an executed cursor, fetched `size` at a time."""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, connect_cloud=True):
         self.db_path = Config.DB_PATH
         self.use_cloud = Config.USE_CLOUD
         self.supabase = None
+        self.sync_worker = None
+        self.connections = None
+        # Closed months moved out of the attendance table (see archive_closed_months)
+        self.archive = AttendanceArchive(os.path.join(os.path.dirname(self.db_path), Config.ARCHIVE_DIR))
+        self._archive_ids = {}  # month -> (MIN(id), MAX(id)) of its archive file
+        
+        # Users already marked present today, so repeat sightings skip SQLite
+        self._marked_today: set = set()
+        self._marked_day = None
+        self._marked_lock = threading.Lock()
         
         self.init_local_db()
-        self.init_cloud_db()
+        # The GUI connects from its warm-up thread instead, so a slow network doesn't delay the window
+        if connect_cloud:
+            self.init_cloud_db()
+        self._load_marked_today(datetime.date.today())
 
     def init_local_db(self):
         """Initialize SQLite database with required tables."""
@@ -19,142 +74,397 @@ class DatabaseManager:
         if db_dir:
             os.makedirs(db_dir, exist_ok=True)
             
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                employee_id TEXT UNIQUE NOT NULL,
-                face_encoding TEXT, 
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Attendance Logs table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS attendance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                name TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                synced BOOLEAN DEFAULT 0,
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        ''')
+        self.connections = ConnectionManager(self.db_path)
         
-        conn.commit()
-        conn.close()
+        # Create or upgrade the schema in place (see core/migrations.py)
+        with self.connections.writer() as conn:
+            migrate(conn)
 
     def init_cloud_db(self):
-        """Initialize Supabase client if enabled."""
+        """Initialize the cloud uploader and start the background sync worker if enabled."""
         if self.use_cloud and Config.SUPABASE_URL and Config.SUPABASE_KEY:
             try:
-                from supabase import create_client
-                self.supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
-                print("Connected to Supabase Cloud.")
+                if Config.CLOUD_TRANSPORT == "rest":
+                    upload = RestUploader(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+                    # Nothing is contacted until the first upload
+                    print(f"Cloud sync over REST to {upload.url}.")
+                else:
+                    from supabase import create_client
+                    self.supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+                    upload = supabase_uploader(self.supabase)
+                    print("Connected to Supabase Cloud (supabase client).")
             except Exception as e:
                 print(f"Failed to connect to Supabase: {e}")
                 self.use_cloud = False
+                return
+            
+            self.sync_worker = CloudSyncWorker(
+                self, upload,
+                batch_size=Config.SYNC_BATCH_SIZE,
+                base_delay=Config.SYNC_RETRY_BASE,
+                max_delay=Config.SYNC_RETRY_MAX,
+                idle_interval=Config.SYNC_IDLE_INTERVAL,
+                station=Config.STATION_ID,
+            )
+            self.sync_worker.start()
 
     def add_user_placeholder(self, name, employee_id):
         """Creates a user entry and returns the ID for training."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check if exists
-            cursor.execute("SELECT id FROM users WHERE employee_id = ?", (employee_id,))
-            exists = cursor.fetchone()
-            if exists:
-                conn.close()
-                return False, "Employee ID already exists"
+            with self.connections.writer() as conn:
+                cursor = conn.cursor()
                 
-            cursor.execute("INSERT INTO users (name, employee_id) VALUES (?, ?)", (name, employee_id))
-            new_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+                # Check if exists
+                cursor.execute("SELECT id FROM users WHERE employee_id = ?", (employee_id,))
+                exists = cursor.fetchone()
+                if exists:
+                    return False, "Employee ID already exists"
+                    
+                cursor.execute("INSERT INTO users (name, employee_id) VALUES (?, ?)", (name, employee_id))
+                new_id = cursor.lastrowid
             return True, new_id
         except Exception as e:
             return False, str(e)
 
+    def add_users(self, users):
+        """
+        Insert (name, employee_id) pairs in a single transaction.
+        Returns ({employee_id: new id}, {employee_id: error}).
+        """
+        added, failed = {}, {}
+        with self.connections.writer() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT employee_id FROM users")
+            existing = {row[0] for row in cursor.fetchall()}
+            for name, employee_id in users:
+                if employee_id in existing:
+                    failed[employee_id] = "Employee ID already exists"
+                    continue
+                cursor.execute("INSERT INTO users (name, employee_id) VALUES (?, ?)", (name, employee_id))
+                added[employee_id] = cursor.lastrowid
+                existing.add(employee_id)
+        return added, failed
+
+    def save_face_samples(self, user_id, samples):
+        """Store a user's normalized (count, size, size) uint8 face crops, replacing any earlier set."""
+        samples = np.ascontiguousarray(samples, dtype=np.uint8)
+        count, size = samples.shape[0], samples.shape[1]
+        blob = zlib.compress(samples.tobytes(), 6)
+        with self.connections.writer() as conn:
+            conn.execute("INSERT OR REPLACE INTO face_samples (user_id, count, size, data) VALUES (?, ?, ?, ?)",
+                         (user_id, count, size, blob))
+
+    def iter_face_samples(self, decode=True):
+        """
+        Yield (user_id, name, samples) for every user with stored samples. With
+        decode=False, samples is the raw (count, size, compressed bytes) tuple,
+        cheap to hand to worker processes.
+        """
+        cursor = self.connections.reader().cursor()
+        cursor.execute("SELECT f.user_id, u.name, f.count, f.size, f.data "
+                       "FROM face_samples f JOIN users u ON u.id = f.user_id ORDER BY f.user_id")
+        for user_id, name, count, size, blob in cursor:
+            if decode:
+                yield user_id, name, decode_samples(count, size, blob)
+            else:
+                yield user_id, name, (count, size, blob)
+
+    def get_users_without_samples(self):
+        """Users enrolled before face samples were stored; a rebuild cannot retrain them."""
+        cursor = self.connections.reader().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT u.* FROM users u LEFT JOIN face_samples f ON f.user_id = u.id "
+                       "WHERE f.user_id IS NULL ORDER BY u.id")
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_user_by_employee_id(self, employee_id):
+        cursor = self.connections.reader().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT * FROM users WHERE employee_id = ?", (employee_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def delete_user(self, user_id):
+        """Remove a user and their stored face samples. Attendance history is kept."""
+        self.delete_users([user_id])
+
+    def delete_users(self, user_ids):
+        """delete_user for several users in one transaction."""
+        params = [(user_id,) for user_id in user_ids]
+        with self.connections.writer() as conn:
+            conn.executemany("DELETE FROM face_samples WHERE user_id = ?", params)
+            conn.executemany("DELETE FROM users WHERE id = ?", params)
+
     def get_all_users(self):
         """Retrieve all users."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        cursor = self.connections.reader().cursor()
+        cursor.row_factory = sqlite3.Row
         cursor.execute("SELECT * FROM users")
         rows = cursor.fetchall()
-        conn.close()
         return [dict(row) for row in rows]
 
-    def log_attendance(self, user_id, name):
-        """Log attendance with cooldown check."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Check if already logged TODAY
-        # We use 'localtime' to ensure day boundaries are correct for the user
-        cursor.execute('''
-            SELECT timestamp FROM attendance 
-            WHERE user_id = ? AND date(timestamp) = date('now', 'localtime')
-            ORDER BY timestamp DESC LIMIT 1
-        ''', (user_id,))
-        
-        last_log = cursor.fetchone()
-        
-        if last_log:
-            conn.close()
-            # It's already done today.
-            # We return False and the specific message.
-            return False, "You already took attendance today"
-        
-        # If not, log it
-        now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute("INSERT INTO attendance (user_id, name, timestamp) VALUES (?, ?, ?)",
-                       (user_id, name, now_str))
-        conn.commit()
+    def iter_users(self, chunk_size=1000):
+        """Yield (id, name, employee_id, created_at) for every user, fetched chunk_size rows at a time."""
+        cursor = self.connections.reader().cursor()
+        cursor.execute("SELECT id, name, employee_id, created_at FROM users ORDER BY id")
+        yield from _chunked(cursor, chunk_size)
+
+    def _load_marked_today(self, day):
+        """Warm the present-today cache from the DB for the given local date."""
+        cursor = self.connections.reader().cursor()
+        cursor.execute("SELECT DISTINCT user_id FROM attendance WHERE timestamp >= ? AND timestamp < ?",
+                       day_bounds(day))
+        self._marked_today = {row[0] for row in cursor.fetchall()}
+        self._marked_day = day
+
+    def log_attendance(self, user_id, name, timestamp=None):
+        """
+        Log attendance with cooldown check.
+        `timestamp` ("YYYY-MM-DD HH:MM:SS", local time) backfills a past sighting,
+        e.g. when replaying recorded footage; it defaults to now.
+        """
+        with self._marked_lock:
+            today = datetime.date.today()
+            if self._marked_day != today:
+                self._load_marked_today(today)
+            
+            if timestamp is None:
+                timestamp = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+            day = datetime.datetime.strptime(timestamp, TIMESTAMP_FORMAT).date()
+            
+            if day == today:
+                # Already logged TODAY - answered from memory, no DB round trip
+                if user_id in self._marked_today:
+                    return False, "You already took attendance today"
+            elif self._has_attendance_on(user_id, day):
+                return False, f"Attendance already recorded for {day.isoformat()}"
+            
+            with self.connections.writer() as conn:
+                conn.execute("INSERT INTO attendance (user_id, name, timestamp) VALUES (?, ?, ?)",
+                             (user_id, name, timestamp))
+                # Same transaction, so reports never disagree with the raw log
+                conn.execute(SUMMARY_UPSERT, (day.isoformat(), user_id, name, timestamp, timestamp, 1))
+            if day == today:
+                self._marked_today.add(user_id)
         
-        # Trigger cloud sync in background
-        if self.use_cloud:
-            self.sync_to_cloud(user_id, name)
+        # The row is now in the outbox; wake the background sync worker
+        if self.sync_worker:
+            self.sync_worker.notify()
             
-        conn.close()
         return True, f"Welcome, {name}! Marked Present."
 
-    def sync_to_cloud(self, user_id, name):
-        """Push log to Supabase."""
-        try:
-            data = {
-                "user_id": user_id,
-                "name": name,
-                "timestamp": datetime.datetime.now().isoformat()
-            }
-            self.supabase.table("attendance").insert(data).execute()
-        except Exception as e:
-            print(f"Cloud sync failed: {e}")
+    def _has_attendance_on(self, user_id, day):
+        query = "SELECT 1 FROM attendance WHERE user_id = ? AND timestamp >= ? AND timestamp < ? LIMIT 1"
+        params = (user_id, *day_bounds(day))
+        if self.connections.reader().execute(query, params).fetchone() is not None:
+            return True
+        # Backfilling a day whose month has already been archived
+        month = day.strftime("%Y-%m")
+        if self.archive.contains(month):
+            with closing(self.archive.connect(month)) as conn:
+                return conn.execute(query, params).fetchone() is not None
+        return False
+
+    def get_unsynced_logs(self, limit=100):
+        """Oldest attendance rows not yet pushed to the cloud (the sync outbox)."""
+        cursor = self.connections.reader().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT id, user_id, name, timestamp FROM attendance WHERE synced = 0 ORDER BY id LIMIT ?",
+                       (limit,))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def mark_synced(self, log_ids):
+        """Flag attendance rows as uploaded."""
+        with self.connections.writer() as conn:
+            conn.executemany("UPDATE attendance SET synced = 1 WHERE id = ?", [(i,) for i in log_ids])
 
     def get_recent_logs(self, limit=10):
         """Get recent attendance logs."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.connections.reader().cursor()
         cursor.execute("SELECT name, timestamp FROM attendance ORDER BY timestamp DESC LIMIT ?", (limit,))
-        rows = cursor.fetchall()
-        conn.close()
+        return cursor.fetchall()
+
+    def get_logs_after(self, after_id=0, limit=500):
+        """Attendance rows with id > after_id, oldest first, as (id, name, timestamp) tuples."""
+        cursor = self.connections.reader().cursor()
+        cursor.execute("SELECT id, name, timestamp FROM attendance WHERE id > ? ORDER BY id LIMIT ?",
+                       (after_id, limit))
+        return cursor.fetchall()
+
+    def get_logs_before(self, before_id=None, limit=50):
+        """
+        The page of attendance rows just older than before_id (the newest page if None),
+        newest first, across the live table and the archives. Keyset pagination on
+        the primary key, so deep pages cost the same as the first. An archive file is
+        only opened when its id range can contribute to the page.
+        """
+        where, params = ("WHERE id < ? ", [before_id]) if before_id is not None else ("", [])
+        query = f"SELECT id, name, timestamp FROM attendance {where}ORDER BY id DESC LIMIT ?"
+        rows = self.connections.reader().execute(query, params + [limit]).fetchall()
+        for month in self.archive.months():
+            low, high = self._archive_id_range(month)
+            if low is None or (before_id is not None and low >= before_id):
+                continue
+            if len(rows) == limit and high < rows[-1][0]:
+                continue
+            archived = self.archive.connect(month)
+            try:
+                rows += archived.execute(query, params + [limit]).fetchall()
+            finally:
+                archived.close()
+            rows = heapq.nlargest(limit, rows, key=lambda row: row[0])
         return rows
 
+    def _archive_id_range(self, month):
+        if month not in self._archive_ids:
+            archived = self.archive.connect(month)
+            try:
+                self._archive_ids[month] = archived.execute("SELECT MIN(id), MAX(id) FROM attendance").fetchone()
+            finally:
+                archived.close()
+        return self._archive_ids[month]
+
     def get_stats(self):
         """Get basic stats."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.connections.reader().cursor()
         
         cursor.execute("SELECT COUNT(*) FROM users")
         total_users = cursor.fetchone()[0]
         
-        cursor.execute("SELECT COUNT(*) FROM attendance WHERE date(timestamp) = date('now', 'localtime')")
+        cursor.execute("SELECT COUNT(*) FROM attendance WHERE timestamp >= ? AND timestamp < ?",
+                       day_bounds(datetime.date.today()))
         today_attendance = cursor.fetchone()[0]
         
-        conn.close()
         return {"users": total_users, "today": today_attendance}
+
+    def get_daily_report(self, start_day, end_day):
+        """Per-day totals for start_day..end_day (inclusive), read from the summary table only."""
+        cursor = self.connections.reader().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT day, COUNT(*) AS present, SUM(count) AS check_ins, MIN(first_seen) AS first_seen "
+                       "FROM daily_attendance_summary WHERE day >= ? AND day <= ? GROUP BY day ORDER BY day",
+                       (str(start_day), str(end_day)))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_user_report(self, user_id, start_day, end_day):
+        """One user's days present in start_day..end_day with first/last sighting and check-ins."""
+        cursor = self.connections.reader().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT day, first_seen, last_seen, count FROM daily_attendance_summary "
+                       "WHERE user_id = ? AND day >= ? AND day <= ? ORDER BY day",
+                       (user_id, str(start_day), str(end_day)))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_users_report(self, start_day, end_day):
+        """Per-user totals for start_day..end_day: days present, check-ins, first and last day seen."""
+        cursor = self.connections.reader().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT user_id, MAX(name) AS name, COUNT(*) AS days_present, SUM(count) AS check_ins, "
+                       "MIN(day) AS first_day, MAX(day) AS last_day FROM daily_attendance_summary "
+                       "WHERE day >= ? AND day <= ? GROUP BY user_id ORDER BY user_id",
+                       (str(start_day), str(end_day)))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def backfill_daily_summary(self, start_day=None, end_day=None):
+        """
+        Rebuild the summary from raw attendance, live and archived (all days, or
+        start_day..end_day). Returns the summary rows written from the live table
+        plus those merged from archives.
+        """
+        start, end = start_day and str(start_day), end_day and str(end_day)
+        with self.connections.writer() as conn:
+            rows = backfill_daily_summary(conn, start, end)
+            for month in self._archived_months(start, end):
+                where, params = "", []
+                if start:
+                    where, params = " WHERE timestamp >= ?", [start]
+                if end:
+                    where += (" AND" if where else " WHERE") + " timestamp < date(?, '+1 day')"
+                    params.append(end)
+                with closing(self.archive.connect(month)) as archived:
+                    days = archived.execute(
+                        "SELECT substr(timestamp, 1, 10), user_id, MAX(name), MIN(timestamp), MAX(timestamp), "
+                        f"COUNT(*) FROM attendance{where} GROUP BY substr(timestamp, 1, 10), user_id", params).fetchall()
+                conn.executemany(SUMMARY_UPSERT, days)
+                rows += len(days)
+            return rows
+
+    def _archived_months(self, start=None, end=None):
+        """Archived "YYYY-MM" months overlapping the day range (both ends optional)."""
+        return [m for m in self.archive.months() if (not start or m >= start[:7]) and (not end or m <= end[:7])]
+
+    # --- Archival ---
+
+    def archive_closed_months(self, retention_months=None):
+        """
+        Move attendance older than the last `retention_months` months (the current
+        one included) into per-month archive files. Rows not yet uploaded to the
+        cloud stay in the live table whenever cloud sync is configured, even if this
+        process could not connect. Returns {month: rows moved}.
+        """
+        retention_months = retention_months or Config.ARCHIVE_RETENTION_MONTHS
+        cutoff = shift_month(datetime.date.today().strftime("%Y-%m"), 1 - retention_months)
+        cursor = self.connections.reader().cursor()
+        cursor.execute("SELECT DISTINCT substr(timestamp, 1, 7) FROM attendance WHERE timestamp < ?",
+                       (month_bounds(cutoff)[0],))
+        moved = {}
+        for (month,) in cursor.fetchall():
+            # One month per writer transaction, so live check-ins only wait for a single month
+            with self.connections.writer() as conn:
+                moved[month] = self.archive.archive_month(conn, month, synced_only=Config.USE_CLOUD)
+            self._archive_ids.pop(month, None)
+            print(f"Archived {moved[month]} attendance rows from {month}.")
+        return moved
+
+    def iter_attendance(self, start_day=None, end_day=None, user_id=None, chunk_size=1000):
+        """
+        Yield attendance rows (id, user_id, name, timestamp, synced) in timestamp
+        order across the live table and the monthly archives, between start_day
+        and end_day inclusive (both optional), optionally for one user. Rows are
+        fetched chunk_size at a time, so memory does not grow with the range.
+        """
+        start, end = start_day and str(start_day), end_day and str(end_day)
+        where, params = [], []
+        if start:
+            where.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            where.append("timestamp < date(?, '+1 day')")
+            params.append(end)
+        if user_id is not None:
+            where.append("user_id = ?")
+            params.append(user_id)
+
+        # Month by month, merging the live rows and the archived rows of that month
+        live = self.connections.reader()
+        first, last = live.execute("SELECT MIN(timestamp), MAX(timestamp) FROM attendance").fetchone()
+        months = self._archived_months(start, end) + [m[:7] for m in (first, last) if m]
+        if not months:
+            return
+        month, last_month = min(months), max(months)
+        if start:
+            month = max(month, start[:7])
+        if end:
+            last_month = min(last_month, end[:7])
+
+        query = ("SELECT id, user_id, name, timestamp, synced FROM attendance "
+                 "WHERE timestamp >= ? AND timestamp < ?" + "".join(f" AND {w}" for w in where) + " ORDER BY timestamp")
+        while month <= last_month:
+            month_params = [*month_bounds(month), *params]
+            sources = [_chunked(live.execute(query, month_params), chunk_size)]
+            archived = self.archive.connect(month) if self.archive.contains(month) else None
+            try:
+                if archived is not None:
+                    sources.append(_chunked(archived.execute(query, month_params), chunk_size))
+                yield from heapq.merge(*sources, key=lambda row: row[3])
+            finally:
+                if archived is not None:
+                    archived.close()
+            month = shift_month(month, 1)
+
+    def close(self):
+        """Stop the sync worker and close all pooled SQLite connections."""
+        if self.sync_worker:
+            self.sync_worker.stop()
+        if self.connections:
+            self.connections.close_all()
@@ -0,0 +1,167 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+THUMB_SIZE = 16  # Side of the thumbnails compared for near-duplicate rejection
+
+
+def sharpness(gray: np.ndarray) -> float:
+    """Variance of the Laplacian; low values mean motion blur or bad focus."""
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def brightness(gray: np.ndarray) -> float:
+    return float(gray.mean())
+
+
+def extract_face(gray: np.ndarray, cascade: cv2.CascadeClassifier, min_face: int = 50,
+                 min_sharpness: float = 30.0, brightness_range: Tuple[float, float] = (40.0, 220.0)
+                 ) -> Tuple[Optional[np.ndarray], float, Optional[str]]:
+    """
+    Crop the largest face in a grayscale image and check its quality.
+    Returns (crop, sharpness, None), or (None, sharpness, reason) with reason one
+    of "no_face", "blurry", "lighting".
+    """
+    faces = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_face, min_face))
+    if len(faces) == 0:
+        return None, 0.0, "no_face"
+    # Use the largest face in frame
+    x, y, w, h = max(faces, key=lambda rect: rect[2] * rect[3])
+    crop = gray[y:y+h, x:x+w]
+
+    score = sharpness(crop)
+    if score < min_sharpness:
+        return None, score, "blurry"
+    low, high = brightness_range
+    if not low <= brightness(crop) <= high:
+        return None, score, "lighting"
+    return crop, score, None
+
+
+class SampleBuffer:
+    """
+    Preallocated (capacity, size, size) uint8 array of normalized grayscale face
+    crops, plus the small thumbnails used to reject near-duplicates.
+    """
+
+    def __init__(self, capacity: int, size: int, duplicate_threshold: float):
+        self.capacity = capacity
+        self.size = size
+        self.duplicate_threshold = duplicate_threshold
+        self.crops = np.empty((capacity, size, size), dtype=np.uint8)
+        self.thumbs = np.empty((capacity, THUMB_SIZE * THUMB_SIZE), dtype=np.float32)
+        self.scores = np.empty(capacity, dtype=np.float32)
+        self.count: int = 0
+
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def add(self, crop: np.ndarray, score: float) -> bool:
+        """Resize `crop` into the next free slot unless it nearly duplicates a kept sample."""
+        if self.is_full():
+            return False
+        slot = self.crops[self.count]
+        cv2.resize(crop, (self.size, self.size), dst=slot, interpolation=cv2.INTER_AREA)
+        thumb = cv2.resize(slot, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        if self.count:
+            diffs = np.abs(self.thumbs[:self.count] - thumb).mean(axis=1)
+            if diffs.min() < self.duplicate_threshold:
+                return False
+        self.thumbs[self.count] = thumb
+        self.scores[self.count] = score
+        self.count += 1
+        return True
+
+    def samples(self) -> List[np.ndarray]:
+        """Views of the kept crops (no copies)."""
+        return list(self.crops[:self.count])
+
+
+class SampleCollector:
+    """
+    Turns camera frames into registration samples. Face detection runs in a
+    thread pool (one Haar cascade per thread, since a cascade must not be shared
+    between threads); each crop must be sharp enough, well lit and distinct from
+    the samples already kept. Frames are not retained once processed.
+    """
+
+    def __init__(self, cascade_path: str, capacity: int = 30, size: int = 160, workers: int = 4,
+                 min_sharpness: float = 30.0, brightness_range: Tuple[float, float] = (40.0, 220.0),
+                 duplicate_threshold: float = 2.0, min_face: int = 50):
+        self.cascade_path = cascade_path
+        self.buffer = SampleBuffer(capacity, size, duplicate_threshold)
+        self.min_sharpness = min_sharpness
+        self.brightness_range = brightness_range
+        self.min_face = min_face
+
+        self.frames_seen: int = 0
+        self.rejected = {"no_face": 0, "blurry": 0, "lighting": 0, "duplicate": 0}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enroll")
+        self._pending = []
+
+    @property
+    def accepted(self) -> int:
+        return self.buffer.count
+
+    def is_full(self) -> bool:
+        return self.buffer.is_full()
+
+    def _cascade(self) -> cv2.CascadeClassifier:
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = self._local.cascade = cv2.CascadeClassifier(self.cascade_path)
+        return cascade
+
+    def submit(self, frame: np.ndarray) -> None:
+        """Queue a BGR frame for detection and scoring."""
+        with self._lock:
+            self.frames_seen += 1
+            self._pending.append(self._pool.submit(self._process, frame))
+
+    def add_frames(self, frames: List[np.ndarray]) -> None:
+        for frame in frames:
+            self.submit(frame)
+        self.wait()
+
+    def _process(self, frame: np.ndarray) -> None:
+        if self.is_full():
+            return
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        crop, score, reason = extract_face(gray, self._cascade(), self.min_face, self.min_sharpness,
+                                           self.brightness_range)
+        if reason:
+            self._reject(reason)
+            return
+        with self._lock:
+            if not self.buffer.add(crop, score) and not self.buffer.is_full():
+                self.rejected["duplicate"] += 1
+
+    def _reject(self, reason: str) -> None:
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def wait(self) -> None:
+        """Block until every submitted frame has been processed."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def samples(self) -> List[np.ndarray]:
+        self.wait()
+        return self.buffer.samples()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def summary(self) -> str:
+        reasons = ", ".join(f"{n} {reason}" for reason, n in self.rejected.items() if n)
+        return f"{self.accepted} samples from {self.frames_seen} frames" + (f" (rejected: {reasons})" if reasons else "")
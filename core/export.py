@@ -0,0 +1,63 @@
+import io
+import csv
+import sys
+import gzip
+import json
+import itertools
+from typing import IO, Iterable, Iterator, Optional, Sequence, Tuple
+
+ATTENDANCE_COLUMNS = ("id", "user_id", "name", "timestamp", "synced")
+USER_COLUMNS = ("id", "name", "employee_id", "created_at")
+FORMATS = ("csv", "jsonl")
+BATCH_ROWS = 1000  # Rows formatted and written per call
+
+
+def open_output(path: Optional[str], compress: bool) -> IO[str]:
+    """Text stream for `path` ("-" or None for stdout), gzip-compressed if asked or if the path ends in .gz."""
+    compress = compress or bool(path and path.endswith(".gz"))
+    if path in (None, "-"):
+        if not compress:
+            return sys.stdout
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb"), encoding="utf-8", newline="")
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def write_rows(out: IO[str], columns: Sequence[str], rows: Iterable[Tuple], fmt: str = "csv") -> int:
+    """
+    Write rows from a generator as CSV (with a header) or JSON lines, BATCH_ROWS at
+    a time, so memory stays flat however many rows there are. Returns the rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    rows = iter(rows)
+    written = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(columns)
+    for batch in _batches(rows, BATCH_ROWS):
+        if fmt == "csv":
+            writer.writerows(batch)
+        else:
+            out.write("".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in batch))
+        written += len(batch)
+    return written
+
+
+def _batches(rows: Iterator[Tuple], size: int) -> Iterator[list]:
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def export_attendance(db, out: IO[str], fmt: str = "csv", start_day=None, end_day=None,
+                      user_id: Optional[int] = None) -> int:
+    """Stream attendance (live and archived) for the day range and user to `out`."""
+    return write_rows(out, ATTENDANCE_COLUMNS, db.iter_attendance(start_day, end_day, user_id), fmt)
+
+
+def export_users(db, out: IO[str], fmt: str = "csv") -> int:
+    return write_rows(out, USER_COLUMNS, db.iter_users(), fmt)
@@ -0,0 +1,257 @@
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Matches the float epsilon OpenCV uses when comparing interpolated neighbours
+_EPS = np.finfo(np.float32).eps
+
+
+def lbp_image(gray: np.ndarray, radius: int = 1, neighbors: int = 8) -> np.ndarray:
+    """
+    Extended (circular) LBP codes, computed the same way as OpenCV's LBPH so the
+    histograms are interchangeable with `LBPHFaceRecognizer.getHistograms()`.
+    """
+    src = gray.astype(np.float32)
+    rows, cols = src.shape
+    out_h, out_w = rows - 2 * radius, cols - 2 * radius
+    center = src[radius:radius + out_h, radius:radius + out_w]
+    codes = np.zeros((out_h, out_w), dtype=np.int32)
+
+    for n in range(neighbors):
+        # Angle in double precision, sample offset rounded to float, as OpenCV does
+        angle = 2.0 * np.pi * n / float(neighbors)
+        x = np.float32(radius * np.cos(angle))
+        y = np.float32(-radius * np.sin(angle))
+        fx, fy = int(np.floor(x)), int(np.floor(y))
+        cx, cy = int(np.ceil(x)), int(np.ceil(y))
+        ty, tx = np.float32(y - fy), np.float32(x - fx)
+        w1 = np.float32((1 - tx) * (1 - ty))
+        w2 = np.float32(tx * (1 - ty))
+        w3 = np.float32((1 - tx) * ty)
+        w4 = np.float32(tx * ty)
+
+        def shifted(dy, dx):
+            return src[radius + dy:radius + dy + out_h, radius + dx:radius + dx + out_w]
+
+        t = w1 * shifted(fy, fx) + w2 * shifted(fy, cx) + w3 * shifted(cy, fx) + w4 * shifted(cy, cx)
+        bit = (t > center) | (np.abs(t - center) < _EPS)
+        codes |= bit.astype(np.int32) << n
+    return codes
+
+
+def lbp_histogram(gray: np.ndarray, radius: int = 1, neighbors: int = 8,
+                  grid_x: int = 8, grid_y: int = 8) -> np.ndarray:
+    """Normalized spatial LBP histogram (grid_x * grid_y * 2^neighbors float32 values)."""
+    codes = lbp_image(gray, radius, neighbors)
+    bins = 1 << neighbors
+    cell_h, cell_w = codes.shape[0] // grid_y, codes.shape[1] // grid_x
+    if cell_h == 0 or cell_w == 0:
+        raise ValueError(f"Face crop {gray.shape} is too small for a {grid_x}x{grid_y} grid")
+
+    cells = codes[:cell_h * grid_y, :cell_w * grid_x]
+    cell_index = (np.arange(grid_y).repeat(cell_h)[:, None] * grid_x
+                  + np.arange(grid_x).repeat(cell_w)[None, :])
+    counts = np.bincount((cell_index * bins + cells).ravel(), minlength=grid_x * grid_y * bins)
+    return (counts / np.float32(cell_h * cell_w)).astype(np.float32)
+
+
+def reduce_prototypes(hists: np.ndarray, labels: np.ndarray, per_user: int,
+                      iterations: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Shrink each user's samples to at most `per_user` prototypes: the mean for
+    per_user=1, a few k-means iterations otherwise. per_user=0 keeps everything.
+    """
+    if per_user <= 0:
+        return hists, labels
+    out_h: List[np.ndarray] = []
+    out_l: List[np.ndarray] = []
+    for label in np.unique(labels):
+        samples = hists[labels == label]
+        k = min(per_user, len(samples))
+        if k == len(samples):
+            centers = samples
+        elif k == 1:
+            centers = samples.mean(axis=0, keepdims=True)
+        else:
+            centers = samples[np.linspace(0, len(samples) - 1, k).astype(int)].copy()
+            for _ in range(iterations):
+                d = ((samples[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+                assign = d.argmin(axis=1)
+                for c in range(k):
+                    members = samples[assign == c]
+                    if len(members):
+                        centers[c] = members.mean(axis=0)
+        out_h.append(centers.astype(np.float32))
+        out_l.append(np.full(len(centers), label, dtype=np.int32))
+    return np.concatenate(out_h), np.concatenate(out_l)
+
+
+class LBPHMatcher:
+    """
+    Nearest-neighbour matcher over LBP histograms held in one contiguous float32 matrix.
+
+    Templates are stored column-major (one row per histogram bin) because LBP
+    histograms are sparse: only the bins the query actually hits need to be
+    read, which makes the matrix slice contiguous and skips most of it.
+
+    `metric="chisqr"` reproduces OpenCV's LBPH distance (HISTCMP_CHISQR_ALT), so
+    the existing confidence threshold still applies. `metric="hellinger"` is a
+    single matrix-vector product over square-rooted templates and is faster
+    still, but its distances are on a 0..1 scale and need their own threshold.
+    """
+
+    def __init__(self, radius: int = 1, neighbors: int = 8, grid_x: int = 8, grid_y: int = 8,
+                 metric: str = "chisqr", prototypes_per_user: int = 0, block_elements: int = 1 << 16):
+        if metric not in ("chisqr", "hellinger"):
+            raise ValueError(f"Unknown metric: {metric}")
+        self.radius, self.neighbors = radius, neighbors
+        self.grid_x, self.grid_y = grid_x, grid_y
+        self.metric = metric
+        self.prototypes_per_user = prototypes_per_user
+        self.block_elements = block_elements  # Working-set size per chisqr step, sized to stay in L2
+        self.dim = grid_x * grid_y * (1 << neighbors)
+
+        # (dim, n_templates); square-rooted for hellinger
+        self.columns = np.empty((self.dim, 0), dtype=np.float32)
+        self.labels = np.empty(0, dtype=np.int32)
+        self._totals = np.empty(0, dtype=np.float32)  # Per-template histogram mass, for chisqr
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @classmethod
+    def from_cv2(cls, recognizer, **kwargs) -> "LBPHMatcher":
+        """Build a matcher with the same LBP parameters and templates as a trained cv2 LBPH model."""
+        matcher = cls(radius=recognizer.getRadius(), neighbors=recognizer.getNeighbors(),
+                      grid_x=recognizer.getGridX(), grid_y=recognizer.getGridY(), **kwargs)
+        hists = recognizer.getHistograms()
+        if hists:
+            matcher.set_templates(np.vstack(hists), recognizer.getLabels().ravel())
+        return matcher
+
+    def histogram(self, gray: np.ndarray) -> np.ndarray:
+        return lbp_histogram(gray, self.radius, self.neighbors, self.grid_x, self.grid_y)
+
+    def _prepare(self, hists: np.ndarray, labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        hists, labels = reduce_prototypes(np.asarray(hists, dtype=np.float32),
+                                          np.asarray(labels, dtype=np.int32), self.prototypes_per_user)
+        totals = hists.sum(axis=1, dtype=np.float32)
+        if self.metric == "hellinger":
+            hists = np.sqrt(hists)
+        return np.ascontiguousarray(hists.T), labels, totals
+
+    def set_templates(self, hists: np.ndarray, labels: np.ndarray) -> None:
+        columns, labels, totals = self._prepare(hists, labels)
+        with self._lock:
+            self.columns, self.labels, self._totals = columns, labels, totals
+
+    def add(self, hists: np.ndarray, labels: np.ndarray) -> None:
+        """Append templates for newly enrolled users (reduced per user like the rest)."""
+        columns, labels, totals = self._prepare(hists, labels)
+        with self._lock:
+            self.columns = np.hstack([self.columns, columns])
+            self.labels = np.concatenate([self.labels, labels])
+            self._totals = np.concatenate([self._totals, totals])
+
+    def remove(self, label: int) -> int:
+        """Drop every template of `label`; returns how many were removed."""
+        with self._lock:
+            keep = self.labels != label
+            removed = int(len(keep) - keep.sum())
+            if removed:
+                self.columns = np.ascontiguousarray(self.columns[:, keep])
+                self.labels = self.labels[keep]
+                self._totals = self._totals[keep]
+        return removed
+
+    def state(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(columns, labels, totals) as held by the matcher, e.g. for caching to disk."""
+        with self._lock:
+            return self.columns, self.labels, self._totals
+
+    def set_state(self, columns: np.ndarray, labels: np.ndarray, totals: np.ndarray) -> None:
+        """Adopt arrays previously returned by state(), without copying (they may be memory-mapped)."""
+        if columns.shape != (self.dim, len(labels)) or len(totals) != len(labels):
+            raise ValueError(f"Matcher state does not fit a {self.dim}-bin matcher")
+        with self._lock:
+            self.columns, self.labels, self._totals = columns, labels, totals
+
+    def distances(self, query: np.ndarray, state: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None) -> np.ndarray:
+        """
+        Distance from one query histogram to every template, in the order of the
+        labels of `state` (a snapshot from state(); taken here if not given).
+        """
+        columns, _, totals = state if state is not None else self.state()
+        query = query.astype(np.float32, copy=False)
+        bins = np.flatnonzero(query)
+
+        if self.metric == "hellinger":
+            # Histograms are normalized per cell, so the Bhattacharyya coefficient is scaled by the cell count
+            cells = self.grid_x * self.grid_y
+            bc = np.sqrt(query[bins]) @ columns[bins] / cells
+            return np.sqrt(np.clip(1.0 - bc, 0.0, None))
+
+        # Where the query bin is empty the chi-square term is just the template value t, so
+        # the distance is the template's total mass plus, over the occupied bins,
+        # (t - q)^2 / (t + q) - t = q * (q - 3t) / (t + q): one weighted sum per block.
+        acc = totals.copy()
+        step = max(16, self.block_elements // max(1, columns.shape[1]))
+        for start in range(0, len(bins), step):
+            idx = bins[start:start + step]
+            block = columns[idx]
+            q = query[idx]
+            denom = block + q[:, None]
+            block *= -3.0
+            block += q[:, None]
+            block /= denom
+            acc += q @ block
+        return 2.0 * np.maximum(acc, 0.0, out=acc)  # Rounding can leave an exact match slightly negative
+
+    def match_batch(self, grays: List[np.ndarray]) -> List[Optional[Tuple[int, float]]]:
+        """
+        Best (label, distance) for each of several face crops. With the hellinger
+        metric the whole batch is scored with one matrix product over the bins any
+        query hits; chi-square has no such form and runs query by query.
+        """
+        state = self.state()
+        columns, labels, _ = state
+        if not len(labels) or not grays:
+            return [None] * len(grays)
+        queries = np.vstack([self.histogram(g) for g in grays]).astype(np.float32, copy=False)
+        if self.metric != "hellinger":
+            return [self._best(self.distances(q, state), labels) for q in queries]
+        bins = np.flatnonzero(queries.any(axis=0))
+        bc = np.sqrt(queries[:, bins]) @ columns[bins] / (self.grid_x * self.grid_y)
+        best = bc.argmax(axis=1)
+        dist = np.sqrt(np.clip(1.0 - bc[np.arange(len(best)), best], 0.0, None))
+        return [(int(labels[i]), float(d)) for i, d in zip(best, dist)]
+
+    @staticmethod
+    def _best(dist: np.ndarray, labels: np.ndarray) -> Tuple[int, float]:
+        i = int(dist.argmin())
+        return int(labels[i]), float(dist[i])
+
+    def match(self, gray: np.ndarray, k: int = 1) -> List[Tuple[int, float]]:
+        """Top-k (label, distance) pairs for a face crop, one entry per distinct user, best first."""
+        return self.match_histogram(self.histogram(gray), k)
+
+    def match_histogram(self, query: np.ndarray, k: int = 1) -> List[Tuple[int, float]]:
+        # Templates and labels from one snapshot: a concurrent add() or remove() must not shift one against the other
+        state = self.state()
+        labels = state[1]
+        if not len(labels):
+            return []
+        dist = self.distances(query, state)
+        if k == 1:
+            return [self._best(dist, labels)]
+
+        # Best distance per user, then the k closest users
+        uniq, inverse = np.unique(labels, return_inverse=True)
+        best = np.full(len(uniq), np.inf, dtype=np.float32)
+        np.minimum.at(best, inverse, dist)
+        k = min(k, len(uniq))
+        top = np.argpartition(best, k - 1)[:k]
+        top = top[np.argsort(best[top])]
+        return [(int(uniq[i]), float(best[i])) for i in top]
@@ -0,0 +1,223 @@
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import numpy as np
+
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """Fixed-size buffer of (timestamp, duration) samples; the oldest sample is overwritten."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.stamps = np.zeros(size, dtype=np.float64)
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count: int = 0  # Total samples ever recorded
+        self._lock = threading.Lock()
+
+    def record(self, value: float, stamp: float) -> None:
+        with self._lock:
+            i = self.count % self.size
+            self.stamps[i] = stamp
+            self.values[i] = value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            n = min(self.count, self.size)
+            return self.stamps[:n].copy(), self.values[:n].copy(), self.count
+
+
+class _NullTimer:
+    """Shared do-nothing context manager handed out while instrumentation is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.metrics.record(self.stage, end - self.start, end)
+        return False
+
+
+class Metrics:
+    """
+    Per-stage timing registry.
+
+        with metrics.timer("detect"):
+            faces = cascade.detectMultiScale(...)
+
+    While `enabled` is False, `timer()` returns a shared no-op object and
+    `record()` returns immediately, so the instrumented code pays one
+    attribute check per stage.
+    """
+
+    def __init__(self, window: int = 512, enabled: bool = False):
+        self.window = window
+        self.enabled = enabled
+        self._buffers: Dict[str, RingBuffer] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def record(self, stage: str, seconds: float, stamp: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        buf = self._buffers.get(stage)
+        if buf is None:
+            with self._lock:
+                buf = self._buffers.setdefault(stage, RingBuffer(self.window))
+        buf.record(seconds, time.perf_counter() if stamp is None else stamp)
+
+    def incr(self, counter: str, amount: float = 1.0) -> None:
+        """Add to a monotonically increasing counter (e.g. work avoided)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0.0) + amount
+
+    def counters(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buffers = {}
+            self._counters = {}
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Rolling percentiles (ms) and rate (calls/sec, i.e. fps for per-frame stages) for every stage."""
+        now = time.perf_counter()
+        out: Dict[str, Dict[str, float]] = {}
+        for stage, buf in list(self._buffers.items()):
+            stamps, values, total = buf.snapshot()
+            if not len(values):
+                continue
+            ms = values * 1000.0
+            span = now - stamps.min()
+            out[stage] = {
+                "count": total,
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "mean_ms": float(ms.mean()),
+                "rate": float(len(values) / span) if span > 0 else 0.0,
+            }
+        return out
+
+    def prometheus_text(self, prefix: str = "attendance") -> str:
+        """Render the snapshot in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Per-stage latency over the rolling window.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        rates = [
+            f"# HELP {prefix}_stage_rate Calls per second over the rolling window.",
+            f"# TYPE {prefix}_stage_rate gauge",
+        ]
+        for stage, s in sorted(self.snapshot().items()):
+            for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {s[key] / 1000.0:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+            rates.append(f'{prefix}_stage_rate{{stage="{stage}"}} {s["rate"]:.3f}')
+        counters = []
+        for name, value in sorted(self.counters().items()):
+            counters += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value:.6f}"]
+        return "\n".join(lines + rates + counters) + "\n"
+
+    def overlay_text(self) -> str:
+        """Compact multi-line summary for the on-screen debug overlay."""
+        rows = []
+        for stage, s in sorted(self.snapshot().items()):
+            rows.append(f"{stage:<16} p50 {s['p50_ms']:6.2f}ms  p95 {s['p95_ms']:6.2f}ms  {s['rate']:5.1f}/s")
+        return "\n".join(rows)
+
+
+class MetricsExporter:
+    """Serves /metrics over HTTP and/or dumps the snapshot to a JSON file periodically."""
+
+    def __init__(self, metrics: Metrics, port: Optional[int] = None, json_path: Optional[str] = None,
+                 json_interval: float = 10.0, host: str = "127.0.0.1"):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.json_path = json_path
+        self.json_interval = json_interval
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self.port is not None:
+            metrics = self.metrics
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.rstrip("/") not in ("/metrics", ""):
+                        self.send_error(404)
+                        return
+                    body = metrics.prometheus_text().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+
+        if self.json_path:
+            threading.Thread(target=self._dump_loop, name="metrics-json", daemon=True).start()
+
+    def _dump_loop(self) -> None:
+        while not self._stop.wait(self.json_interval):
+            try:
+                with open(self.json_path, "w") as f:
+                    json.dump({"time": time.time(), "stages": self.metrics.snapshot(),
+                               "counters": self.metrics.counters()}, f, indent=2)
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {self.json_path}: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Process-wide registry used by the pipeline, recognizer and UI
+metrics = Metrics(window=Config.METRICS_WINDOW, enabled=Config.METRICS_ENABLED)
@@ -0,0 +1,130 @@
+import sqlite3
+import logging
+from typing import Callable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# A step is either a SQL statement or a callable taking the connection (for data migrations)
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+# (version, description, steps). Versions must be strictly increasing and
+# applied migrations must never be edited - add a new one instead.
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, "base schema", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            employee_id TEXT UNIQUE NOT NULL,
+            face_encoding TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            name TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            synced BOOLEAN DEFAULT 0,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+        ''',
+    ]),
+    (2, "attendance indexes for per-user and per-day range queries", [
+        # Per-user lookups ("has this user been seen in this range?")
+        "CREATE INDEX IF NOT EXISTS idx_attendance_user_ts ON attendance(user_id, timestamp)",
+        # Day/range scans and ORDER BY timestamp; covers COUNT and DISTINCT user_id
+        "CREATE INDEX IF NOT EXISTS idx_attendance_ts_user ON attendance(timestamp, user_id)",
+    ]),
+    (3, "partial index over the cloud sync outbox", [
+        "CREATE INDEX IF NOT EXISTS idx_attendance_unsynced ON attendance(id) WHERE synced = 0",
+    ]),
+    (4, "normalized face samples per user, for model rebuilds", [
+        # data: zlib-compressed uint8 array of shape (count, size, size)
+        '''
+        CREATE TABLE IF NOT EXISTS face_samples (
+            user_id INTEGER PRIMARY KEY REFERENCES users(id),
+            count INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+        ''',
+    ]),
+    (5, "per-day, per-user attendance summary for reports", [
+        '''
+        CREATE TABLE IF NOT EXISTS daily_attendance_summary (
+            day TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            name TEXT,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, user_id)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_summary_user_day ON daily_attendance_summary(user_id, day)",
+        lambda conn: backfill_daily_summary(conn),
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def backfill_daily_summary(conn: sqlite3.Connection, start: Optional[str] = None, end: Optional[str] = None) -> int:
+    """
+    Recompute daily_attendance_summary from the attendance table for the days in
+    [start, end] ("YYYY-MM-DD", both optional). Returns the number of summary rows written.
+    """
+    days, stamps, params = [], [], []
+    if start:
+        days.append("day >= ?")
+        stamps.append("timestamp >= ?")
+        params.append(start)
+    if end:
+        days.append("day <= ?")
+        stamps.append("timestamp < date(?, '+1 day')")
+        params.append(end)
+    conn.execute("DELETE FROM daily_attendance_summary" + (" WHERE " + " AND ".join(days) if days else ""), params)
+    # Timestamps are "YYYY-MM-DD HH:MM:SS": the day is a prefix, and the range filter uses the timestamp index
+    cursor = conn.execute(
+        "INSERT INTO daily_attendance_summary (day, user_id, name, first_seen, last_seen, count) "
+        "SELECT substr(timestamp, 1, 10), user_id, MAX(name), MIN(timestamp), MAX(timestamp), COUNT(*) "
+        "FROM attendance" + (" WHERE " + " AND ".join(stamps) if stamps else "") +
+        " GROUP BY substr(timestamp, 1, 10), user_id", params)
+    return cursor.rowcount
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Bring the database schema up to LATEST_VERSION in place.
+    Each migration runs in its own transaction together with the version bump,
+    so an interrupted upgrade resumes from the last completed step.
+    """
+    current = get_version(conn)
+    if current > LATEST_VERSION:
+        raise RuntimeError(f"Database schema v{current} is newer than this application (v{LATEST_VERSION})")
+
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Applying schema migration v{version}: {description}")
+        conn.execute("BEGIN")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
+
+    return current
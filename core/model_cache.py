@@ -0,0 +1,101 @@
+import os
+import glob
+import json
+import logging
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from core.lbp_matcher import LBPHMatcher
+from core.model_store import ModelStore
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCache:
+    """
+    Memory-mapped snapshot of the matcher's template matrix, so startup does not
+    have to read and checksum the whole model store.
+
+    Each generation is a pair of files named after the store checkpoint it was
+    built from: `columns-<key>.npy` (the (dim, n) float32 matrix, mapped read-only
+    and shared between processes through the page cache) and `index-<key>.npz`
+    (labels, per-template totals, names and the checkpoint). A generation is used
+    only if the store still ends at that checkpoint, which costs one header read.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _key(self, matcher: LBPHMatcher, checkpoint: Dict[str, int]) -> str:
+        return f"{checkpoint['crc']:08x}-{checkpoint['end']:x}-{matcher.metric}-{matcher.prototypes_per_user}"
+
+    def load(self, store: ModelStore, matcher: LBPHMatcher) -> Optional[Dict[int, str]]:
+        """Fill `matcher` from a valid cache generation and return the names, or None if there is none."""
+        indexes = sorted(glob.glob(os.path.join(self.directory, "index-*.npz")), key=os.path.getmtime, reverse=True)
+        for index_path in indexes:
+            try:
+                with np.load(index_path) as index:
+                    meta = json.loads(str(index["meta"]))
+                    if (meta["metric"], meta["prototypes"], tuple(meta["params"])) != \
+                            (matcher.metric, matcher.prototypes_per_user, store.params):
+                        continue
+                    if not store.verify(meta["checkpoint"]):
+                        continue
+                    labels, totals = index["labels"], index["totals"]
+                    names = dict(zip(index["name_ids"].tolist(), index["name_values"].tolist()))
+                columns = np.load(index_path.replace("index-", "columns-").replace(".npz", ".npy"), mmap_mode="r")
+                matcher.set_state(columns, labels, totals)
+                store.resume(meta["checkpoint"], set(np.unique(labels).tolist()))
+                logger.info(f"Loaded {len(names)} users ({len(labels)} templates) from the model cache.")
+                return names
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable model cache {index_path}: {e}")
+        return None
+
+    def save(self, store: ModelStore, matcher: LBPHMatcher, names: Dict[int, str], lock: threading.RLock) -> None:
+        """
+        Write a generation for the current state. `lock` must be held by whoever
+        updates the store and matcher, so the snapshot matches the checkpoint.
+        """
+        with lock:
+            columns, labels, totals = matcher.state()
+            checkpoint = store.checkpoint()
+            names = dict(names)
+        key = self._key(matcher, checkpoint)
+        index_path = os.path.join(self.directory, f"index-{key}.npz")
+        if os.path.exists(index_path):
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        columns_path = os.path.join(self.directory, f"columns-{key}.npy")
+        tmp = f"{columns_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(columns))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, columns_path)
+
+        # The index is written last: a generation without one is never used
+        meta = {"metric": matcher.metric, "prototypes": matcher.prototypes_per_user,
+                "params": list(store.params), "checkpoint": checkpoint}
+        tmp = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), labels=labels, totals=totals,
+                     name_ids=np.array(list(names.keys()), dtype=np.int64),
+                     name_values=np.array(list(names.values()), dtype=str))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, index_path)
+        self._remove_stale(key)
+        logger.info(f"Wrote model cache for {len(names)} users.")
+
+    def _remove_stale(self, keep: str) -> None:
+        for path in glob.glob(os.path.join(self.directory, "*")):
+            if keep in os.path.basename(path) or path.endswith(".tmp"):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Still mapped by another process (Windows); removed next time
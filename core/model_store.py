@@ -0,0 +1,369 @@
+import os
+import mmap
+import pickle
+import struct
+import zlib
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FSTO"
+VERSION = 1
+
+# magic, version, radius, neighbors, grid_x, grid_y
+FILE_HEADER = struct.Struct("<4sHHHHH")
+# kind, label, payload length, crc32 chained over every previous record
+RECORD_HEADER = struct.Struct("<BxxxiII")
+
+SAMPLES = 1  # payload: float32 histograms, one per row
+NAME = 2     # payload: utf-8 display name
+DELETE = 3   # no payload: drop everything recorded so far for the label
+
+
+def _record_crc(kind: int, label: int, payload: bytes, prev_crc: int) -> int:
+    crc = zlib.crc32(struct.pack("<BiI", kind, label, len(payload)), prev_crc)
+    return zlib.crc32(payload, crc)
+
+
+@dataclass
+class _Scan:
+    """Contents of a byte range of the store and where the valid records stopped."""
+    hists: Dict[int, List[np.ndarray]] = field(default_factory=dict)  # label -> sample blocks, in file order
+    names: Dict[int, str] = field(default_factory=dict)
+    deleted: Set[int] = field(default_factory=set)  # Labels with a DELETE record in the range
+    users: Set[int] = field(default_factory=set)
+    records: int = 0
+    end: int = 0
+    crc: int = 0
+    last_offset: int = 0
+
+
+class ModelStore:
+    """
+    Append-only binary store of LBP histograms and user names.
+
+    Each registration appends one SAMPLES and one NAME record and fsyncs, so
+    saving costs the size of the new samples rather than the whole model. Every
+    record carries a CRC chained over all previous records; a write torn by a
+    crash fails the check and is cut off on the next append. Deleting a user
+    appends a DELETE record that drops the user's earlier records. Compaction (one
+    record pair per user) runs in a background thread, writes a temporary file
+    and swaps it in with os.replace, so the store on disk is always complete.
+
+    There must be a single writing process; other processes may load(create=False).
+    """
+
+    def __init__(self, path: str, radius: int = 1, neighbors: int = 8, grid_x: int = 8, grid_y: int = 8,
+                 compact_min_records: int = 64):
+        self.path = path
+        self.params = (radius, neighbors, grid_x, grid_y)
+        self.dim = grid_x * grid_y * (1 << neighbors)
+        self.compact_min_records = compact_min_records
+
+        self.records: int = 0       # Records in the file
+        self.end: int = 0           # Offset just past the last valid record (0 = not scanned yet)
+        self.last_crc: int = 0      # Chained CRC of the last valid record
+        self.last_offset: int = 0   # Offset of the last valid record (0 when empty)
+        self._users: Set[int] = set()
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()  # One compaction at a time
+        self._compactor: Optional[threading.Thread] = None
+        self.on_compacted: Optional[Callable[[], None]] = None  # Called after a successful compaction
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @property
+    def users(self) -> int:
+        return len(self._users)
+
+    # --- Reading ---
+
+    def load(self, create: bool = True) -> Tuple[np.ndarray, np.ndarray, Dict[int, str]]:
+        """
+        Read the whole store: (histograms (n, dim) float32, labels (n,) int32, names).
+        A missing store is created, or with create=False (readers) read as empty.
+        """
+        with self._lock:
+            if not self.exists():
+                if not create:
+                    return self._stack(_Scan())
+                self._create()
+            scan = self._scan(0, None, 0)
+            self._adopt(scan)
+        return self._stack(scan)
+
+    def _stack(self, scan: _Scan) -> Tuple[np.ndarray, np.ndarray, Dict[int, str]]:
+        blocks = [block for label_blocks in scan.hists.values() for block in label_blocks]
+        hists = np.vstack(blocks) if blocks else np.empty((0, self.dim), dtype=np.float32)
+        labels = np.concatenate([np.full(len(block), label, dtype=np.int32)
+                                 for label, label_blocks in scan.hists.items() for block in label_blocks]
+                                ) if blocks else np.empty(0, dtype=np.int32)
+        return hists, labels, scan.names
+
+    def _adopt(self, scan: _Scan) -> None:
+        self.records, self._users = scan.records, scan.users
+        self.end, self.last_crc, self.last_offset = scan.end, scan.crc, scan.last_offset
+
+    def _scan(self, start: int, stop: Optional[int], prev_crc: int) -> _Scan:
+        """Parse records from `start` (0 = beginning of file) until `stop` or the first invalid record."""
+        scan = _Scan(crc=prev_crc)
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < FILE_HEADER.size:
+                raise ValueError(f"{self.path} is not a model store")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, version, *params = FILE_HEADER.unpack_from(mm, 0)
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError(f"{self.path} is not a version {VERSION} model store")
+                if tuple(params) != self.params:
+                    raise ValueError(f"{self.path} was written with LBP parameters {tuple(params)}, expected {self.params}")
+
+                offset = max(start, FILE_HEADER.size)
+                stop = size if stop is None else stop
+                while offset + RECORD_HEADER.size <= stop:
+                    kind, label, length, crc = RECORD_HEADER.unpack_from(mm, offset)
+                    body = offset + RECORD_HEADER.size
+                    if body + length > stop:
+                        break
+                    payload = mm[body:body + length]
+                    if _record_crc(kind, label, payload, scan.crc) != crc:
+                        break
+                    if kind == SAMPLES:
+                        hists = np.frombuffer(payload, dtype=np.float32).reshape(-1, self.dim)
+                        scan.hists.setdefault(label, []).append(hists)
+                        scan.users.add(label)
+                    elif kind == NAME:
+                        scan.names[label] = payload.decode("utf-8")
+                    elif kind == DELETE:
+                        scan.hists.pop(label, None)
+                        scan.names.pop(label, None)
+                        scan.users.discard(label)
+                        scan.deleted.add(label)
+                    scan.crc, scan.last_offset = crc, offset
+                    scan.records += 1
+                    offset = body + length
+
+        scan.end = offset
+        if stop == size and offset < size:
+            logger.warning(f"Ignoring {size - offset} bytes of incomplete data at the end of {self.path}")
+        return scan
+
+    # --- Checkpoints (used to validate derived caches without reading the store) ---
+
+    def checkpoint(self) -> Dict[str, int]:
+        """Position and chained CRC of the last record; identifies the store's exact contents."""
+        with self._lock:
+            if self.end == 0:
+                self._adopt(self._scan(0, None, 0))
+            return {"end": self.end, "crc": self.last_crc, "last_offset": self.last_offset, "records": self.records}
+
+    def verify(self, checkpoint: Dict[str, int]) -> bool:
+        """True if the file still ends exactly at `checkpoint` (one header read, whatever the store size)."""
+        try:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size != checkpoint["end"]:
+                    return False
+                if not checkpoint["last_offset"]:
+                    return checkpoint["end"] == FILE_HEADER.size
+                f.seek(checkpoint["last_offset"])
+                header = f.read(RECORD_HEADER.size)
+        except OSError:
+            return False
+        if len(header) != RECORD_HEADER.size:
+            return False
+        kind, label, length, crc = RECORD_HEADER.unpack(header)
+        return crc == checkpoint["crc"] and checkpoint["last_offset"] + RECORD_HEADER.size + length == checkpoint["end"]
+
+    def resume(self, checkpoint: Dict[str, int], users: Set[int]) -> None:
+        """Adopt a verified checkpoint instead of scanning the file."""
+        with self._lock:
+            self.records, self._users = checkpoint["records"], set(users)
+            self.end, self.last_crc, self.last_offset = checkpoint["end"], checkpoint["crc"], checkpoint["last_offset"]
+
+    # --- Writing ---
+
+    def _create(self) -> None:
+        self._adopt(self._write_file(self.path, [])[0])
+
+    def append(self, label: int, name: str, hists: np.ndarray) -> None:
+        """Durably add one user's samples and name."""
+        self.append_many([(label, name, hists)])
+
+    def append_many(self, users: List[Tuple[int, str, np.ndarray]]) -> None:
+        """Durably add several users' samples with a single fsync."""
+        users = [(label, name, np.ascontiguousarray(hists, dtype=np.float32)) for label, name, hists in users]
+        for _, _, hists in users:
+            if hists.ndim != 2 or hists.shape[1] != self.dim:
+                raise ValueError(f"Expected histograms of shape (n, {self.dim}), got {hists.shape}")
+        records = []
+        for label, name, hists in users:
+            records += [(SAMPLES, label, hists.tobytes()), (NAME, label, name.encode("utf-8"))]
+        self._append(records)
+        with self._lock:
+            self._users.update(label for label, _, _ in users)
+
+        if self.needs_compaction():
+            self.compact_async()
+
+    def delete(self, label: int) -> None:
+        """Durably drop one user's samples and name; other users' records are untouched."""
+        self._append([(DELETE, label, b"")])
+        with self._lock:
+            self._users.discard(label)
+
+        if self.needs_compaction():
+            self.compact_async()
+
+    def _append(self, records: List[Tuple[int, int, bytes]]) -> None:
+        with self._lock:
+            if not self.exists():
+                self._create()
+            elif self.end == 0:
+                self._adopt(self._scan(0, None, 0))
+            with open(self.path, "r+b") as f:
+                # Cut off anything past the last valid record (a write torn by a crash)
+                f.truncate(self.end)
+                f.seek(self.end)
+                for kind, label, payload in records:
+                    self.last_offset = f.tell()
+                    self.last_crc = self._write_record(f, kind, label, payload, self.last_crc)
+                    self.records += 1
+                f.flush()
+                os.fsync(f.fileno())
+                self.end = f.tell()
+
+    @staticmethod
+    def _write_record(f, kind: int, label: int, payload: bytes, prev_crc: int) -> int:
+        crc = _record_crc(kind, label, payload, prev_crc)
+        f.write(RECORD_HEADER.pack(kind, label, len(payload), crc))
+        f.write(payload)
+        return crc
+
+    def _write_users(self, f, scan: _Scan, hists: np.ndarray, labels: np.ndarray, names: Dict[int, str]) -> None:
+        """Write one SAMPLES + NAME record pair per user, continuing the CRC chain in `scan`."""
+        for label in np.unique(labels):
+            label = int(label)
+            for kind, payload in ((SAMPLES, np.ascontiguousarray(hists[labels == label]).tobytes()),
+                                  (NAME, names.get(label, "").encode("utf-8"))):
+                scan.last_offset = f.tell()
+                scan.crc = self._write_record(f, kind, label, payload, scan.crc)
+                scan.records += 1
+            scan.users.add(label)
+
+    def _write_file(self, path: str, parts: List[Tuple[np.ndarray, np.ndarray, Dict[int, str]]],
+                    replace: bool = True) -> Tuple[_Scan, str]:
+        """
+        Write a complete store to a uniquely named temporary file next to `path` and,
+        unless replace=False, rename it over `path`. Returns the scan and the temporary path.
+        """
+        scan = _Scan()
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                   dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(FILE_HEADER.pack(MAGIC, VERSION, *self.params))
+                for hists, labels, names in parts:
+                    self._write_users(f, scan, hists, labels, names)
+                f.flush()
+                os.fsync(f.fileno())
+                scan.end = f.tell()
+            if replace:
+                os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return scan, tmp
+
+    def write_all(self, hists: np.ndarray, labels: np.ndarray, names: Dict[int, str]) -> None:
+        """Atomically replace the store's contents."""
+        with self._lock:
+            self._adopt(self._write_file(self.path, [(hists, labels, names)])[0])
+
+    # --- Compaction ---
+
+    def needs_compaction(self) -> bool:
+        """Many small appends: more than two records per user, past a minimum file size."""
+        return self.records >= self.compact_min_records and self.records > 2 * self.users
+
+    def compact_async(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="model-compaction", daemon=True)
+        self._compactor.start()
+
+    def compact(self) -> None:
+        """
+        Merge every user's samples into one record. The bulk of the rewrite runs
+        without the lock; records appended meanwhile are copied over before the swap.
+        """
+        with self._compact_lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        tmp = None
+        try:
+            with self._lock:
+                if self.end == 0:
+                    self._adopt(self._scan(0, None, 0))
+                snapshot_end, snapshot_crc = self.end, self.last_crc
+            scan, tmp = self._write_file(self.path, [self._stack(self._scan(0, snapshot_end, 0))], replace=False)
+
+            with self._lock:
+                if self.end != snapshot_end:
+                    tail_scan = self._scan(snapshot_end, self.end, snapshot_crc)
+                    with open(tmp, "r+b") as f:
+                        f.seek(scan.end)
+                        for label in tail_scan.deleted:
+                            scan.last_offset = f.tell()
+                            scan.crc = self._write_record(f, DELETE, label, b"", scan.crc)
+                            scan.records += 1
+                            scan.users.discard(label)
+                        self._write_users(f, scan, *self._stack(tail_scan))
+                        f.flush()
+                        os.fsync(f.fileno())
+                        scan.end = f.tell()
+                os.replace(tmp, self.path)
+                self._adopt(scan)
+            logger.info(f"Compacted model store to {self.users} users ({self.end} bytes).")
+        except Exception as e:
+            logger.error(f"Model store compaction failed: {e}")
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        if self.on_compacted is not None:
+            self.on_compacted()
+
+    def wait(self) -> None:
+        """Block until a running background compaction finishes."""
+        if self._compactor is not None:
+            self._compactor.join()
+
+
+def migrate_legacy(store: ModelStore, recognizer, model_path: str, labels_path: str) -> bool:
+    """
+    Import a trained_faces.yml + labels.pickle model into `store`. The legacy files
+    are renamed with a .migrated suffix so this happens once. Returns True if migrated.
+    """
+    if store.exists() or not (os.path.exists(model_path) and os.path.exists(labels_path)):
+        return False
+
+    recognizer.read(model_path)
+    with open(labels_path, "rb") as f:
+        names = pickle.load(f)
+    hists = recognizer.getHistograms()
+    hists = np.vstack(hists) if hists else np.empty((0, store.dim), dtype=np.float32)
+    labels = recognizer.getLabels().ravel().astype(np.int32)
+    store.write_all(hists, labels, names)
+
+    for path in (model_path, labels_path):
+        os.replace(path, path + ".migrated")
+    logger.info(f"Migrated {len(names)} users from {model_path} to {store.path}.")
+    return True
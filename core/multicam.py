@@ -0,0 +1,191 @@
+import os
+import queue
+import time
+import logging
+import threading
+import multiprocessing
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from core.sources import iter_frames, is_image_dir
+
+logger = logging.getLogger(__name__)
+
+# Per-process recognizer, created once by the pool initializer
+_worker_recognizer = None
+
+
+def init_worker() -> None:
+    global _worker_recognizer
+    import cv2
+    from core.recognition import FaceRecognizer
+    # Parallelism comes from the pool; OpenCV's own threads would only oversubscribe the cores
+    cv2.setNumThreads(1)
+    # The parent prepared the model (prepare_shared_model); workers only read it
+    _worker_recognizer = FaceRecognizer(db_manager=None, server_url=None, read_only=True)
+    # Consecutive frames of one stream land on different workers, so per-process
+    # tracks would never line up; every frame is predicted on its own instead.
+    _worker_recognizer.tracker = None
+
+
+def _recognize(task: Tuple[Any, np.ndarray]) -> Tuple[Any, int, List[Tuple[int, str]]]:
+    """Pool task: (tag, frame) -> (tag, faces found, [(user_id, name), ...]). The tag is passed through untouched."""
+    tag, frame = task
+    locations, names, ids = _worker_recognizer.process_frame(frame)
+    known = [(user_id, name) for user_id, name in zip(ids, names) if user_id is not None]
+    return tag, len(locations), known
+
+
+def recognize_in_pool(pool, tasks: Iterable[Tuple[Any, np.ndarray]], window: int,
+                      ordered: bool = False) -> Iterator[Tuple[Any, int, List[Tuple[int, str]]]]:
+    """
+    Run `_recognize` over tasks in the pool with at most `window` frames in flight.
+    Pool.imap pulls its input eagerly, which would otherwise decode a whole
+    video into memory ahead of the workers.
+    """
+    slots = threading.Semaphore(window)
+
+    def throttled():
+        for task in tasks:
+            slots.acquire()
+            yield task
+
+    mapper = pool.imap if ordered else pool.imap_unordered
+    for result in mapper(_recognize, throttled()):
+        slots.release()
+        yield result
+
+
+class AttendanceWriter:
+    """
+    Single consumer for recognition results coming from many streams/workers.
+    Every sighting goes through one thread, so attendance is written by one
+    writer no matter how many processes produce results. `emit` receives an
+    event dict for every first-of-the-day mark.
+    """
+
+    def __init__(self, db_manager=None, emit: Optional[Callable[[Dict], None]] = None):
+        self.db = db_manager
+        self.emit = emit
+        self.marked: int = 0
+        self._seen: set = set()  # (user_id, day) pairs, used when running without a database (dry run)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id: int, name: str, source: str, frame_index: int, timestamp: Optional[str] = None) -> None:
+        self._queue.put((user_id, name, source, frame_index, timestamp))
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            user_id, name, source, frame_index, timestamp = item
+            timestamp = timestamp or time.strftime("%Y-%m-%d %H:%M:%S")
+            if self.db is not None:
+                success, _ = self.db.log_attendance(user_id, name, timestamp)
+            else:
+                key = (user_id, timestamp[:10])
+                success = key not in self._seen
+                self._seen.add(key)
+            if success:
+                self.marked += 1
+                if self.emit:
+                    self.emit({"user_id": user_id, "name": name, "source": source,
+                               "frame": frame_index, "timestamp": timestamp})
+
+
+class MultiCameraServer:
+    """
+    Headless recognition over several video sources at once.
+
+    One reader thread per source decodes frames into a shared bounded queue; a
+    process pool, each worker holding its own loaded LBPH model, runs
+    `process_frame` on them; results funnel into a single AttendanceWriter.
+    Files are read in full (the readers block when the pool falls behind),
+    live cameras drop frames instead so the feed never lags.
+    """
+
+    def __init__(self, sources: List[Union[str, int]], workers: Optional[int] = None,
+                 db_manager=None, emit: Optional[Callable[[Dict], None]] = None):
+        self.sources = [str(s) for s in sources]
+        self.workers = workers or os.cpu_count() or 1
+        self.db = db_manager
+        self.emit = emit
+        self.frames_per_source: Dict[str, int] = {s: 0 for s in self.sources}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.workers * 4)
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _reader(self, source_idx: int, max_frames: Optional[int]) -> None:
+        source = self.sources[source_idx]
+        live = source.isdigit() or source.startswith(("rtsp://", "http://", "https://"))
+        try:
+            for frame_idx, frame in enumerate(iter_frames(source, max_frames)):
+                if self._stop.is_set():
+                    break
+                task = ((source_idx, frame_idx), frame)
+                if live:
+                    try:
+                        self._queue.put_nowait(task)
+                    except queue.Full:
+                        continue
+                else:
+                    self._queue.put(task)
+        except Exception as e:
+            logger.error(f"Source {source} failed: {e}")
+        finally:
+            self._queue.put(None)  # One end marker per source
+
+    def _tasks(self) -> Iterator[Tuple[Tuple[int, int], np.ndarray]]:
+        finished = 0
+        while finished < len(self.sources):
+            task = self._queue.get()
+            if task is None:
+                finished += 1
+                continue
+            yield task
+
+    def run(self, max_frames: Optional[int] = None) -> Dict:
+        """Process every source to the end (or `max_frames` each). Returns throughput stats."""
+        for s in self.sources:
+            if not is_image_dir(s) and not s.isdigit() and "://" not in s and not os.path.exists(s):
+                raise FileNotFoundError(s)
+
+        writer = AttendanceWriter(self.db, self.emit)
+        readers = [threading.Thread(target=self._reader, args=(i, max_frames), daemon=True)
+                   for i in range(len(self.sources))]
+
+        from core.recognition import prepare_shared_model
+        prepare_shared_model()
+        start = time.perf_counter()
+        with multiprocessing.Pool(self.workers, initializer=init_worker) as pool:
+            for t in readers:
+                t.start()
+            for (source_idx, frame_idx), _, known in recognize_in_pool(pool, self._tasks(), self.workers * 4):
+                source = self.sources[source_idx]
+                self.frames_per_source[source] += 1
+                for user_id, name in known:
+                    writer.submit(user_id, name, source, frame_idx)
+        elapsed = time.perf_counter() - start
+        writer.close()
+
+        total = sum(self.frames_per_source.values())
+        stats = {
+            "workers": self.workers,
+            "frames": total,
+            "seconds": round(elapsed, 2),
+            "fps": round(total / elapsed, 1) if elapsed else 0.0,
+            "per_source": dict(self.frames_per_source),
+            "attendance_marked": writer.marked,
+        }
+        logger.info(f"Multi-camera run finished: {stats}")
+        return stats
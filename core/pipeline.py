@@ -0,0 +1,317 @@
+import threading
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.metrics import metrics
+from core.motion import MotionGate
+from utils.config import Config
+
+# BGR colours used for the on-frame annotations
+COLOR_MARKED = (0, 255, 0)
+COLOR_ALREADY = (0, 165, 255)
+COLOR_UNKNOWN = (0, 0, 255)
+
+
+class LatestQueue:
+    """Bounded queue that drops the oldest item instead of blocking the producer."""
+
+    def __init__(self, maxsize: int = 1):
+        self._items: Deque[Any] = deque(maxlen=max(1, maxsize))
+        self._cond = threading.Condition()
+        self.dropped: int = 0
+
+    def put(self, item: Any) -> None:
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Pop the oldest item, waiting up to `timeout` seconds. Returns None on timeout."""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def get_nowait(self) -> Optional[Any]:
+        with self._cond:
+            return self._items.popleft() if self._items else None
+
+    def clear(self) -> None:
+        with self._cond:
+            self._items.clear()
+
+
+class StageCounter:
+    """Counts items passing through a pipeline stage and reports a rolling rate."""
+
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self.total: int = 0
+        self._stamps: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def tick(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.total += 1
+            self._stamps.append(now)
+            while self._stamps and now - self._stamps[0] > self.window:
+                self._stamps.popleft()
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            while self._stamps and now - self._stamps[0] > self.window:
+                self._stamps.popleft()
+            return len(self._stamps) / self.window
+
+
+@dataclass
+class Annotation:
+    box: Tuple[int, int, int, int]  # top, right, bottom, left
+    name: str
+    color: Tuple[int, int, int]
+
+
+@dataclass
+class RecognitionResult:
+    frame_id: int
+    annotations: List[Annotation] = field(default_factory=list)
+    status: Optional[Tuple[str, str]] = None  # (text, text_color) for the status label
+    frame_size: Optional[Tuple[int, int]] = None  # (width, height) of the frame the boxes refer to
+
+
+class RecognitionPipeline:
+    """
+    Capture -> recognition -> display pipeline.
+
+    A capture thread reads frames as fast as the camera delivers them and hands
+    them to both the recognition worker and the UI through drop-oldest queues,
+    so neither a slow detector nor a slow repaint ever stalls the camera. The UI
+    pulls the newest frame and the newest annotations with `latest()`.
+
+    A motion gate skips recognition while the scene is static and empty, except
+    for a few frames after each movement and one frame every
+    MOTION_MAX_SKIP_SECONDS, so a person who stopped before being detected is
+    still found. After
+    IDLE_AFTER_SECONDS without motion or faces the capture drops to IDLE_FPS (and
+    IDLE_RESOLUTION) until motion is seen again. Work avoided is counted in
+    `savings` and in the metrics counters.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, face_recognizer, queue_size: int = 2):
+        self.logger = logging.getLogger(__name__)
+        self.cap = cap
+        self.face_recognizer = face_recognizer
+
+        self.frame_queue = LatestQueue(queue_size)    # capture -> recognition
+        self.display_queue = LatestQueue(1)           # capture -> UI
+        self.result_queue = LatestQueue(1)            # recognition -> UI
+
+        self.counters: Dict[str, StageCounter] = {
+            "capture": StageCounter(),
+            "recognition": StageCounter(),
+            "display": StageCounter(),
+            "skipped": StageCounter(),
+        }
+
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._frame_id: int = 0
+        self._latest_result = RecognitionResult(frame_id=-1)
+
+        self.motion_gate: Optional[MotionGate] = None
+        if Config.MOTION_GATE:
+            self.motion_gate = MotionGate(Config.MOTION_THRESHOLD, Config.MOTION_MIN_AREA)
+        self.idle: bool = False
+        self.savings: Dict[str, float] = {"skipped_frames": 0, "seconds_saved": 0.0, "idle_seconds": 0.0}
+        self._faces_in_view: bool = False
+        self._follow_frames: int = 0      # Frames still searched after the last motion
+        self._last_detection: float = 0.0
+        self._gate_reset = threading.Event()  # Set by the capture thread; the gate is only touched by recognition
+        self._last_activity: float = time.monotonic()  # Last motion or face
+        self._idle_mark: float = 0.0
+        self._empty_cost: float = 0.0  # Moving average of a recognition pass that found no face, seconds
+        self._full_size: Optional[Tuple[float, float]] = None
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._threads) and not self._stop.is_set()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self.face_recognizer.reset_tracking()
+        self.idle, self._faces_in_view = False, False
+        self._follow_frames, self._last_detection = 0, 0.0
+        self._last_activity = time.monotonic()
+        self._gate_reset.clear()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self._full_size = (self.cap.get(cv2.CAP_PROP_FRAME_WIDTH), self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._recognition_loop, name="recognition", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join(timeout)
+        self._threads = []
+        self.frame_queue.clear()
+        self.display_queue.clear()
+        self.result_queue.clear()
+
+    def _capture_loop(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self._update_idle(started)
+            with metrics.timer("capture_read"):
+                ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            self._frame_id += 1
+            item = (self._frame_id, frame)
+            self.counters["capture"].tick()
+            self.frame_queue.put(item)
+            self.display_queue.put(item)
+            if self.idle:
+                self._stop.wait(max(0.0, 1.0 / Config.IDLE_FPS - (time.monotonic() - started)))
+
+    def _update_idle(self, now: float) -> None:
+        """Capture thread: enter idle mode after a quiet period, leave it as soon as there is activity."""
+        if not Config.IDLE_AFTER_SECONDS:
+            return
+        if self.idle:
+            self.savings["idle_seconds"] += now - self._idle_mark
+            metrics.incr("idle_seconds", now - self._idle_mark)
+            self._idle_mark = now
+        idle = now - self._last_activity >= Config.IDLE_AFTER_SECONDS
+        if idle == self.idle:
+            return
+        self.idle, self._idle_mark = idle, now
+        self.logger.info("No activity: entering idle mode." if idle else "Activity: leaving idle mode.")
+        if Config.IDLE_RESOLUTION and self._full_size and all(self._full_size):
+            width, height = Config.IDLE_RESOLUTION if idle else self._full_size
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            # The recognition thread resets the motion gate before its next frame
+            self._gate_reset.set()
+
+    def _recognition_loop(self) -> None:
+        while not self._stop.is_set():
+            item = self.frame_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            frame_id, frame = item
+            if self.motion_gate is not None:
+                if self._gate_reset.is_set():
+                    self._gate_reset.clear()
+                    # The first frames after a mode switch differ from the reference while the camera settles,
+                    # so they are searched for faces instead of being compared
+                    self.motion_gate.reset(settle_frames=5)
+                    self._follow_frames = max(self._follow_frames, 5 + Config.MOTION_FOLLOW_FRAMES)
+                with metrics.timer("motion_gate"):
+                    moving = self.motion_gate.update(frame)
+                now = time.monotonic()
+                if moving:
+                    self._last_activity = now
+                    self._follow_frames = Config.MOTION_FOLLOW_FRAMES
+                elif self._follow_frames > 0:
+                    self._follow_frames -= 1
+                elif not self._faces_in_view and now - self._last_detection < Config.MOTION_MAX_SKIP_SECONDS:
+                    # Static, empty scene: the last (empty) result still holds
+                    self.counters["skipped"].tick()
+                    self.savings["skipped_frames"] += 1
+                    self.savings["seconds_saved"] += self._empty_cost
+                    metrics.incr("detections_skipped")
+                    metrics.incr("detection_seconds_saved", self._empty_cost)
+                    continue
+            started = time.perf_counter()
+            self._last_detection = time.monotonic()
+            try:
+                result = self._recognize(frame_id, frame)
+            except Exception as e:
+                self.logger.error(f"Recognition error: {e}")
+                continue
+            self._faces_in_view = bool(result.annotations)
+            if self._faces_in_view:
+                self._last_activity = time.monotonic()
+            else:
+                cost = time.perf_counter() - started
+                self._empty_cost = 0.9 * self._empty_cost + 0.1 * cost if self._empty_cost else cost
+            self.counters["recognition"].tick()
+            self.result_queue.put(result)
+
+    def _recognize(self, frame_id: int, frame: np.ndarray) -> RecognitionResult:
+        locations, names, ids = self.face_recognizer.process_frame(frame)
+        result = RecognitionResult(frame_id=frame_id, frame_size=(frame.shape[1], frame.shape[0]))
+
+        for box, name, user_id in zip(locations, names, ids):
+            if user_id is None:
+                color = COLOR_UNKNOWN
+                result.status = ("Face Not Recognized", "red")
+            else:
+                with metrics.timer("log_attendance"):
+                    success, msg = self.face_recognizer.db.log_attendance(user_id, name)
+                if success:
+                    color = COLOR_MARKED
+                    result.status = (msg, "#2ecc71")
+                else:
+                    color = COLOR_ALREADY
+                    result.status = (msg, "#e67e22")
+            result.annotations.append(Annotation(box, name, color))
+
+        return result
+
+    def latest(self) -> Tuple[Optional[np.ndarray], RecognitionResult, bool]:
+        """
+        Return (frame, result, result_is_new) for the UI thread.
+        `frame` is the newest captured frame (or None if nothing new arrived),
+        `result` the newest recognition output available.
+        """
+        item = self.display_queue.get_nowait()
+        frame = item[1] if item is not None else None
+
+        result = self.result_queue.get_nowait()
+        is_new = result is not None
+        if is_new:
+            self._latest_result = result
+
+        if frame is not None:
+            self.counters["display"].tick()
+        return frame, self._latest_result, is_new
+
+    def throughput(self) -> Dict[str, Any]:
+        """Per-stage rates (items/sec) and the number of frames each queue dropped."""
+        stats: Dict[str, Any] = {f"{name}_fps": round(c.rate(), 1) for name, c in self.counters.items()}
+        stats["dropped_recognition"] = self.frame_queue.dropped
+        stats["dropped_display"] = self.display_queue.dropped
+        stats["idle"] = self.idle
+        stats.update({k: round(v, 3) for k, v in self.savings.items()})
+        return stats
+
+
+def draw_annotations(frame: np.ndarray, annotations: List[Annotation], sx: float = 1.0, sy: float = 1.0) -> None:
+    """Draw boxes and name tags onto a BGR frame in place; `sx`, `sy` map capture coordinates onto it."""
+    scale = min(sx, sy)  # Tag and text size
+    for ann in annotations:
+        top, right, bottom, left = int(ann.box[0] * sy), int(ann.box[1] * sx), int(ann.box[2] * sy), int(ann.box[3] * sx)
+        cv2.rectangle(frame, (left, top), (right, bottom), ann.color, 2)
+        cv2.rectangle(frame, (left, bottom - int(35 * scale)), (right, bottom), ann.color, cv2.FILLED)
+        cv2.putText(frame, ann.name, (left + int(6 * scale), bottom - int(6 * scale)), cv2.FONT_HERSHEY_DUPLEX,
+                    scale, (255, 255, 255), 1)
@@ -0,0 +1,160 @@
+import os
+import time
+import pickle
+import logging
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.database import decode_samples
+from core.lbp_matcher import lbp_histogram
+
+logger = logging.getLogger(__name__)
+
+LEGACY_BATCH_USERS = 200  # Users per cv2 train/update call, to bound memory in the legacy rebuild
+
+# Per-process LBP parameters, set once by the pool initializer
+_worker_params: Tuple[int, int, int, int] = (1, 8, 8, 8)
+
+
+def _init_worker(params: Tuple[int, int, int, int]) -> None:
+    global _worker_params
+    import cv2
+    # Parallelism comes from the pool; OpenCV's own threads would only oversubscribe the cores
+    cv2.setNumThreads(1)
+    _worker_params = params
+
+
+def _histograms(item: Tuple[int, str, Tuple[int, int, bytes]]) -> Tuple[int, str, np.ndarray]:
+    """Worker: decode one user's stored crops and compute their LBP histograms."""
+    user_id, name, (count, size, blob) = item
+    samples = decode_samples(count, size, blob)
+    return user_id, name, np.vstack([lbp_histogram(sample, *_worker_params) for sample in samples])
+
+
+class ModelRebuilder:
+    """
+    Retrain the face model from scratch using the crops stored in the face_samples
+    table. With the binary store the LBP histograms are computed in a process pool
+    and the store is rewritten in one atomic replace; users enrolled before samples
+    were stored keep their existing templates. The legacy cv2 model is retrained
+    in batches of users.
+
+    Run it with the application closed: the model store has a single writer.
+    """
+
+    def __init__(self, recognizer, db_manager, workers: Optional[int] = None):
+        self.recognizer = recognizer
+        self.db = db_manager
+        self.workers = workers or os.cpu_count() or 1
+
+    def users_without_samples(self) -> List[Dict]:
+        return self.db.get_users_without_samples()
+
+    def run(self) -> Dict:
+        start = time.perf_counter()
+        self.recognizer.ensure_model()
+        if self.recognizer.store is not None:
+            report = self._rebuild_store()
+        else:
+            report = self._rebuild_legacy()
+        self.recognizer.reload_server()
+        report["seconds"] = round(time.perf_counter() - start, 2)
+        logger.info(f"Rebuilt the face model: {report['users']} users, {report['samples']} samples "
+                    f"in {report['seconds']}s.")
+        return report
+
+    def _rebuild_store(self) -> Dict:
+        recognizer, store = self.recognizer, self.recognizer.store
+        params = store.params
+        blocks: List[np.ndarray] = []
+        labels: List[np.ndarray] = []
+        names: Dict[int, str] = {}
+
+        with multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(params,)) as pool:
+            for i, (user_id, name, hists) in enumerate(
+                    pool.imap_unordered(_histograms, self.db.iter_face_samples(decode=False), chunksize=4), 1):
+                blocks.append(hists)
+                labels.append(np.full(len(hists), user_id, dtype=np.int32))
+                names[user_id] = name
+                if i % 100 == 0:
+                    logger.info(f"Computed histograms for {i} users")
+
+        # Users without stored crops cannot be retrained; carry their templates over unchanged
+        kept = []
+        missing = {user["id"]: user["name"] for user in self.users_without_samples()}
+        if missing and store.exists():
+            old_hists, old_labels, _ = store.load()
+            for user_id, name in missing.items():
+                rows = old_labels == user_id
+                if rows.any():
+                    blocks.append(old_hists[rows])
+                    labels.append(old_labels[rows])
+                    names[user_id] = name
+                    kept.append(user_id)
+
+        hists = np.vstack(blocks) if blocks else np.empty((0, store.dim), dtype=np.float32)
+        labels = np.concatenate(labels) if labels else np.empty(0, dtype=np.int32)
+        with recognizer._model_lock:
+            store.write_all(hists, labels, names)
+            recognizer.matcher.set_templates(hists, labels)
+            recognizer.known_face_names = names
+            recognizer.is_trained = len(labels) > 0
+        if recognizer.cache is not None:
+            recognizer.cache.save(store, recognizer.matcher, names, recognizer._model_lock)
+
+        return {
+            "users": len(names),
+            "samples": int(len(labels)),
+            "kept_without_samples": kept,
+            "missing": sorted(set(missing) - set(kept)),
+        }
+
+    def _rebuild_legacy(self) -> Dict:
+        import cv2
+        recognizer = self.recognizer
+        model = cv2.face.LBPHFaceRecognizer_create(recognizer.recognizer.getRadius(),
+                                                   recognizer.recognizer.getNeighbors(),
+                                                   recognizer.recognizer.getGridX(),
+                                                   recognizer.recognizer.getGridY())
+        names: Dict[int, str] = {}
+        faces: List[np.ndarray] = []
+        labels: List[int] = []
+        samples = 0
+        trained = False
+
+        def flush():
+            nonlocal trained
+            if faces:
+                (model.update if trained else model.train)(faces, np.array(labels, dtype=np.int32))
+                trained = True
+                faces.clear()
+                labels.clear()
+
+        for i, (user_id, name, crops) in enumerate(self.db.iter_face_samples(), 1):
+            faces.extend(crops)
+            labels.extend([user_id] * len(crops))
+            names[user_id] = name
+            samples += len(crops)
+            if i % LEGACY_BATCH_USERS == 0:
+                flush()
+        flush()
+
+        missing = [user["id"] for user in self.users_without_samples()]
+        if missing:
+            logger.warning(f"{len(missing)} users have no stored samples and were left out; they must re-enroll.")
+
+        if trained:
+            model.save(recognizer.model_path)
+        elif os.path.exists(recognizer.model_path):
+            os.remove(recognizer.model_path)
+        with open(recognizer.labels_path, "wb") as f:
+            pickle.dump(names, f)
+        recognizer.recognizer = model
+        recognizer.known_face_names = names
+        recognizer.is_trained = trained
+        if recognizer.matcher is not None:
+            recognizer.build_matcher()
+
+        return {"users": len(names), "samples": samples, "kept_without_samples": [], "missing": missing}
@@ -3,12 +3,25 @@ import numpy as np
 import os
 import pickle
 import logging
+import threading
+import urllib.parse
 from typing import List, Tuple, Optional, Any
 from core.database import DatabaseManager
+from core.tracker import FaceTracker, iou
+from core.lbp_matcher import LBPHMatcher
+from core.model_store import ModelStore, migrate_legacy
+from core.model_cache import ModelCache
+from core.enrollment import SampleCollector
+from core.metrics import metrics
+from core.recognition_service import RecognitionClient, RecognitionServiceError, is_loopback
+from utils.config import Config
 
 class FaceRecognizer:
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, server_url: Optional[str] = None,
+                 read_only: bool = False):
         self.db = db_manager
+        # Worker processes only read the model: no legacy migration, store creation or cache writes
+        self.read_only = read_only
         self.logger = logging.getLogger(__name__)
         
         # Initialize LBPH Face Recognizer
@@ -16,6 +29,7 @@ class FaceRecognizer:
         
         # Load Haar Cascade for face detection
         cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        self.cascade_path: str = cascade_path
         self.face_cascade = cv2.CascadeClassifier(cascade_path)
         if self.face_cascade.empty():
             self.logger.error("Failed to load Haar Cascade classifier.")
@@ -25,15 +39,79 @@ class FaceRecognizer:
         self.model_path: str = "trained_faces.yml"
         self.labels_path: str = "labels.pickle"
         
+        # Append-only binary model; the YAML/pickle pair above is only read to migrate it
+        self.store: Optional[ModelStore] = None
+        self.cache: Optional[ModelCache] = None
+        if Config.MODEL_STORE == "binary":
+            self.store = ModelStore(Config.MODEL_STORE_PATH, compact_min_records=Config.MODEL_COMPACT_MIN_RECORDS)
+            if not read_only:
+                self.store.on_compacted = self._write_cache_async
+            if Config.MODEL_CACHE_DIR:
+                self.cache = ModelCache(Config.MODEL_CACHE_DIR)
+        # Held while the store and matcher change together, so cache snapshots are consistent
+        self._model_lock = threading.RLock()
+        self._cache_dirty: bool = False
+        self._cache_writer: Optional[threading.Thread] = None
+        
         # Enterprise Config
         # Lower is stricter (0 is perfect match). > 65 is usually Unknown.
         self.confidence_threshold: int = 65 
         
-        self.load_known_faces()
+        # Identity is voted once per track and then reused while the face stays in view
+        self.tracker: Optional[FaceTracker] = None
+        if Config.USE_TRACKING:
+            self.tracker = FaceTracker(
+                iou_threshold=Config.TRACK_IOU_THRESHOLD,
+                centroid_threshold=Config.TRACK_CENTROID_THRESHOLD,
+                max_missed=Config.TRACK_MAX_MISSED,
+                vote_frames=Config.TRACK_VOTE_FRAMES,
+            )
+        self.predict_calls: int = 0
+        
+        # Detection settings; see utils/config.py for what each one trades off
+        self.detection_scale: float = Config.DETECTION_SCALE
+        self.detection_roi: Optional[Tuple[float, float, float, float]] = Config.DETECTION_ROI
+        self.detect_around_tracks: bool = Config.DETECT_AROUND_TRACKS
+        self._frame_index: int = 0
+        
+        # Optional vectorized matcher that replaces recognizer.predict; kept in sync with the cv2 model
+        self.matcher: Optional[LBPHMatcher] = None
+        self.match_threshold: float = self.confidence_threshold
+        
+        # Thin-client mode: crops are matched by a shared recognition server, and the
+        # model is only loaded here when the server is unreachable or a user is enrolled
+        self.remote: Optional[RecognitionClient] = None
+        self._model_loaded: bool = False
+        if server_url and not is_loopback(urllib.parse.urlsplit(server_url).hostname):
+            # Users enrolled here would never reach a server reading another machine's files
+            self.logger.warning(f"Ignoring recognition server {server_url}: it must run on this machine.")
+            server_url = None
+        if server_url:
+            self.remote = RecognitionClient(server_url, timeout=Config.RECOGNITION_SERVER_TIMEOUT,
+                                            retry_after=Config.RECOGNITION_SERVER_RETRY)
+            try:
+                health = self.remote.health()
+                self.logger.info(f"Matching faces on {server_url} ({health['users']} users).")
+                return
+            except RecognitionServiceError as e:
+                self.logger.warning(f"Recognition server unavailable, loading the model locally: {e}")
+        self.ensure_model()
+
+    def ensure_model(self) -> None:
+        """Load the local model unless it already is (thin clients defer this)."""
+        with self._model_lock:
+            if self._model_loaded:
+                return
+            self.load_known_faces()
+            if self.store is None and Config.MATCHER == "numpy":
+                self.build_matcher()
+            self._model_loaded = True
 
     def load_known_faces(self) -> None:
         """Load trained model from disk if it exists."""
-        if os.path.exists(self.model_path) and os.path.exists(self.labels_path):
+        if self.store is not None:
+            self._load_store()
+        elif os.path.exists(self.model_path) and os.path.exists(self.labels_path):
             try:
                 self.recognizer.read(self.model_path)
                 with open(self.labels_path, 'rb') as f:
@@ -42,10 +120,94 @@ class FaceRecognizer:
                 self.logger.info("Loaded trained face model successfully.")
             except Exception as e:
                 self.logger.error(f"Error loading model: {e}")
-                # We do not call train_model() here as we don't have raw images on disk to retrain from
+                # The face crops are kept in the database; `main.py rebuild` retrains from them
         else:
             self.logger.warning("No trained model found. Starting fresh.")
 
+    def _load_store(self) -> None:
+        self.matcher = self._new_matcher()
+        try:
+            if not self.read_only:
+                migrate_legacy(self.store, self.recognizer, self.model_path, self.labels_path)
+            names = self.cache.load(self.store, self.matcher) if self.cache is not None else None
+            if names is None:
+                hists, labels, names = self.store.load(create=not self.read_only)
+                self.matcher.set_templates(hists, labels)
+                self.logger.info(f"Loaded {len(names)} users ({len(labels)} samples) from {self.store.path}.")
+                if len(labels) and not self.read_only:
+                    self._write_cache_async()
+        except Exception as e:
+            self.logger.error(f"Error loading model store: {e}")
+            return
+        self.known_face_names = names
+        self.is_trained = len(self.matcher) > 0
+        if not self.is_trained:
+            self.logger.warning("No trained model found. Starting fresh.")
+
+    def _write_cache_async(self) -> None:
+        """Refresh the model cache in the background; repeated calls coalesce into one more write."""
+        if self.cache is None:
+            return
+        with self._model_lock:
+            self._cache_dirty = True
+            if self._cache_writer is not None:
+                return
+            self._cache_writer = threading.Thread(target=self._write_cache, name="model-cache", daemon=True)
+            self._cache_writer.start()
+
+    def wait_for_cache(self) -> None:
+        """Block until a background cache write, if any, has finished."""
+        writer = self._cache_writer
+        if writer is not None:
+            writer.join()
+
+    def _write_cache(self) -> None:
+        while True:
+            with self._model_lock:
+                if not self._cache_dirty:
+                    self._cache_writer = None
+                    return
+                self._cache_dirty = False
+            try:
+                self.cache.save(self.store, self.matcher, self.known_face_names, self._model_lock)
+            except Exception as e:
+                self.logger.error(f"Error writing model cache: {e}")
+
+    def _new_matcher(self) -> LBPHMatcher:
+        matcher = LBPHMatcher(
+            radius=self.recognizer.getRadius(),
+            neighbors=self.recognizer.getNeighbors(),
+            grid_x=self.recognizer.getGridX(),
+            grid_y=self.recognizer.getGridY(),
+            metric=Config.MATCHER_METRIC,
+            prototypes_per_user=Config.MATCHER_PROTOTYPES,
+        )
+        if matcher.metric == "hellinger":
+            self.match_threshold = Config.MATCHER_HELLINGER_THRESHOLD
+        else:
+            self.match_threshold = self.confidence_threshold
+        return matcher
+
+    def build_matcher(self) -> None:
+        """(Re)build the NumPy matcher from the histograms held by the cv2 model."""
+        matcher = self._new_matcher()
+        hists = self.recognizer.getHistograms() if self.is_trained else []
+        if hists:
+            matcher.set_templates(np.vstack(hists), self.recognizer.getLabels().ravel())
+        self.matcher = matcher
+        self.logger.info(f"NumPy matcher ready with {len(self.matcher)} templates.")
+
+    def predict_top_k(self, roi_gray: np.ndarray, k: int = 5) -> List[Tuple[int, float]]:
+        """Closest k users as (user_id, distance), best first. Uses the NumPy matcher when enabled."""
+        self.ensure_model()
+        if not self.is_trained:
+            return []
+        roi_gray = self._normalize_crop(roi_gray)
+        if self.matcher is not None:
+            return self.matcher.match(roi_gray, k)
+        label_id, confidence = self.recognizer.predict(roi_gray)
+        return [(label_id, confidence)]
+
     def process_frame(self, frame: np.ndarray) -> Tuple[List[Tuple[int, int, int, int]], List[str], List[Optional[int]]]:
         """
         Process a single frame for face recognition.
@@ -57,44 +219,183 @@ class FaceRecognizer:
         if frame is None:
             return [], [], []
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(
-            gray, 
-            scaleFactor=1.1, 
-            minNeighbors=5, 
-            minSize=(30, 30)
-        )
+        with metrics.timer("cvt_color"):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with metrics.timer("detect"):
+            faces = self.detect_faces(gray)
 
         face_locations = []
         face_names = []
         face_ids = []
 
-        for (x, y, w, h) in faces:
+        if self.tracker is not None:
+            tracks = self.tracker.update([tuple(f) for f in faces])
+        else:
+            tracks = [None] * len(faces)
+
+        for (x, y, w, h), track in zip(faces, tracks):
             # Convert to CSS order: top, right, bottom, left
             face_locations.append((y, x+w, y+h, x)) 
             
-            name = "Unknown"
-            user_id = None
+            if track is None:
+                user_id = self._predict(gray[y:y+h, x:x+w])
+            else:
+                if (self.is_trained or self.remote is not None) and track.needs_prediction(Config.TRACK_UNKNOWN_RETRY):
+                    track.add_vote(self._predict(gray[y:y+h, x:x+w]))
+                # Until the vote settles the face is reported as Unknown
+                user_id = track.identity
 
-            if self.is_trained:
-                roi_gray = gray[y:y+h, x:x+w]
-                try:
-                    # Predict gives label (id) and confidence (distance)
-                    label_id, confidence = self.recognizer.predict(roi_gray)
-                    
-                    if confidence < self.confidence_threshold: 
-                        name = self.known_face_names.get(label_id, "Unknown")
-                        user_id = label_id
-                    # Else remains Unknown
-                    
-                except Exception as e:
-                    self.logger.debug(f"Prediction error: {e}")
-            
+            name = self.known_face_names.get(user_id, "Unknown") if user_id is not None else "Unknown"
+            if name == "Unknown":
+                user_id = None
             face_names.append(name)
             face_ids.append(user_id)
             
         return face_locations, face_names, face_ids
 
+    def detect_faces(self, gray: np.ndarray, cascade: Optional[cv2.CascadeClassifier] = None) -> List[Tuple[int, int, int, int]]:
+        """
+        Run the Haar cascade over the configured search regions and return
+        face boxes (x, y, w, h) in full-resolution coordinates. Threads detecting
+        concurrently pass their own `cascade`.
+        """
+        cascade = cascade or self.face_cascade
+        self._frame_index += 1
+        scale = self.detection_scale
+        min_size = max(1, int(round(Config.DETECTION_MIN_SIZE * scale)))
+        regions = self._detection_regions(gray.shape[:2])
+
+        faces: List[Tuple[int, int, int, int]] = []
+        for (rx, ry, rw, rh) in regions:
+            region = gray[ry:ry+rh, rx:rx+rw]
+            if scale != 1.0:
+                region = cv2.resize(region, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            if region.shape[0] < min_size or region.shape[1] < min_size:
+                continue
+            found = cascade.detectMultiScale(
+                region,
+                scaleFactor=Config.DETECTION_SCALE_FACTOR,
+                minNeighbors=Config.DETECTION_MIN_NEIGHBORS,
+                minSize=(min_size, min_size)
+            )
+            for (x, y, w, h) in found:
+                faces.append((int(x / scale) + rx, int(y / scale) + ry, int(w / scale), int(h / scale)))
+
+        if len(regions) > 1:
+            faces = _suppress_overlaps(faces)
+        return faces
+
+    def _detection_regions(self, shape: Tuple[int, int]) -> List[Tuple[int, int, int, int]]:
+        """Regions (x, y, w, h) to search this frame: the ROI, or the areas around live tracks."""
+        height, width = shape
+        if self.detection_roi:
+            x0, y0, x1, y1 = self.detection_roi
+            roi = (int(x0 * width), int(y0 * height), int(x1 * width), int(y1 * height))
+        else:
+            roi = (0, 0, width, height)
+
+        full_scan = (roi[0], roi[1], roi[2] - roi[0], roi[3] - roi[1])
+        if not (self.detect_around_tracks and self.tracker is not None and self.tracker.tracks):
+            return [full_scan]
+        if self._frame_index % Config.DETECTION_FULL_SCAN_INTERVAL == 0:
+            # Periodic full sweep so faces entering the scene get picked up
+            return [full_scan]
+
+        regions = []
+        for track in self.tracker.tracks:
+            x, y, w, h = track.box
+            mx, my = int(w * Config.DETECTION_TRACK_MARGIN), int(h * Config.DETECTION_TRACK_MARGIN)
+            left, top = max(roi[0], x - mx), max(roi[1], y - my)
+            right, bottom = min(roi[2], x + w + mx), min(roi[3], y + h + my)
+            if right > left and bottom > top:
+                regions.append((left, top, right - left, bottom - top))
+        return regions or [full_scan]
+
+    def reset_tracking(self) -> None:
+        """Forget all tracks, e.g. when the video source changes."""
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def _predict(self, roi_gray: np.ndarray) -> Optional[int]:
+        """Run the recognizer on one face crop. Returns the user ID, or None if unknown."""
+        if self.remote is not None and self.remote.available():
+            try:
+                match = self.remote.identify([self._normalize_crop(roi_gray)])[0]
+            except RecognitionServiceError as e:
+                self.logger.warning(f"Recognition server unavailable, matching locally "
+                                    f"for {Config.RECOGNITION_SERVER_RETRY:.0f}s: {e}")
+            else:
+                self.predict_calls += 1
+                if match is None:
+                    return None
+                user_id, name = match
+                self.known_face_names[user_id] = name
+                return user_id
+        self.ensure_model()
+        if not self.is_trained:
+            return None
+        self.predict_calls += 1
+        try:
+            roi_gray = self._normalize_crop(roi_gray)
+            # Predict gives label (id) and confidence (distance)
+            with metrics.timer("predict"):
+                if self.matcher is not None:
+                    label_id, confidence = self.matcher.match(roi_gray)[0]
+                    threshold = self.match_threshold
+                else:
+                    label_id, confidence = self.recognizer.predict(roi_gray)
+                    threshold = self.confidence_threshold
+            if confidence < threshold:
+                return label_id
+        except Exception as e:
+            self.logger.debug(f"Prediction error: {e}")
+        return None
+
+    def predict_batch(self, crops: List[np.ndarray]) -> List[Optional[int]]:
+        """`_predict` for several face crops in one matcher call (the recognition server's batches)."""
+        if not self.is_trained or not crops:
+            return [None] * len(crops)
+        crops = [self._normalize_crop(c) for c in crops]
+        self.predict_calls += len(crops)
+        with metrics.timer("predict_batch"):
+            if self.matcher is not None:
+                matches = self.matcher.match_batch(crops)
+                threshold = self.match_threshold
+            else:
+                matches = [self.recognizer.predict(c) for c in crops]
+                threshold = self.confidence_threshold
+        return [int(m[0]) if m is not None and m[1] < threshold else None for m in matches]
+
+    def reload_server(self) -> None:
+        """Ask the recognition server, if any, to pick up model changes made here."""
+        if self.remote is None:
+            return
+        try:
+            self.remote.reload()
+        except RecognitionServiceError as e:
+            self.logger.warning(f"Recognition server did not reload the model: {e}")
+
+    def new_sample_collector(self) -> SampleCollector:
+        """A collector for registration crops, configured from utils/config.py."""
+        return SampleCollector(
+            self.cascade_path,
+            capacity=Config.REGISTRATION_SAMPLES,
+            size=Config.SAMPLE_SIZE,
+            workers=Config.REGISTRATION_WORKERS,
+            min_sharpness=Config.SAMPLE_MIN_SHARPNESS,
+            brightness_range=Config.SAMPLE_BRIGHTNESS_RANGE,
+            duplicate_threshold=Config.SAMPLE_DUPLICATE_THRESHOLD,
+        )
+
+    @staticmethod
+    def _normalize_crop(roi_gray: np.ndarray) -> np.ndarray:
+        """Resize a face crop to the size registration samples are stored at, so LBP textures are comparable."""
+        size = Config.SAMPLE_SIZE
+        if roi_gray.shape == (size, size):
+            return roi_gray
+        interpolation = cv2.INTER_AREA if roi_gray.shape[0] > size else cv2.INTER_LINEAR
+        return cv2.resize(roi_gray, (size, size), interpolation=interpolation)
+
     def register_new_face(self, frames: List[np.ndarray], name: str, employee_id: str) -> Tuple[bool, str]:
         """
         Extract faces from multiple frames, update the model, and save to DB.
@@ -110,6 +411,21 @@ class FaceRecognizer:
         if not frames:
             return False, "No frames provided"
 
+        self.logger.info(f"Processing {len(frames)} frames for {name} (ID: {employee_id})...")
+        collector = self.new_sample_collector()
+        try:
+            collector.add_frames(frames)
+            self.logger.info(collector.summary())
+            return self.register_samples(collector.samples(), name, employee_id)
+        finally:
+            collector.close()
+
+    def register_samples(self, samples: List[np.ndarray], name: str, employee_id: str) -> Tuple[bool, str]:
+        """Register a new user from grayscale face crops (e.g. from a SampleCollector)."""
+        if len(samples) < Config.REGISTRATION_MIN_SAMPLES:
+            # If we couldn't find enough usable faces, abort to avoid bad model
+            return False, "Could not detect face clearly. Please try again with better lighting."
+
         # 1. Save user to DB to get a unique internal ID
         # This prevents ID conflicts and ensures we have a valid key for the recognizer
         success, result = self.db.add_user_placeholder(name, employee_id)
@@ -118,51 +434,92 @@ class FaceRecognizer:
             return False, result # result is error message
             
         new_db_id = result # result is the integer ID
-        
-        collected_faces = []
-        collected_ids = []
-        
-        self.logger.info(f"Processing {len(frames)} frames for {name} (ID: {employee_id})...")
-        
-        for frame in frames:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(
-                gray, 
-                scaleFactor=1.1, 
-                minNeighbors=5, 
-                minSize=(50, 50)
-            )
-            
-            # Use the largest face in frame
-            if len(faces) > 0:
-                largest_face = max(faces, key=lambda rect: rect[2] * rect[3])
-                (x, y, w, h) = largest_face
-                roi_gray = gray[y:y+h, x:x+w]
-                
-                collected_faces.append(roi_gray)
-                collected_ids.append(new_db_id)
-
-        if len(collected_faces) < 5:
-            # If we couldn't find faces in at least 5 frames, abort to avoid bad model
-            return False, "Could not detect face clearly. Please try again with better lighting."
 
         # 2. Update the model
         try:
-            # LBPH supports updating the model with new data without retraining from scratch
-            self.recognizer.update(collected_faces, np.array(collected_ids))
-            
-            # Save updated model
-            self.recognizer.save(self.model_path)
-            
-            # Update labels map
-            self.known_face_names[new_db_id] = name
-            with open(self.labels_path, 'wb') as f:
-                pickle.dump(self.known_face_names, f)
-                
-            self.is_trained = True
-            self.logger.info(f"Successfully registered {name} with {len(collected_faces)} samples.")
+            self.save_samples([(new_db_id, name, samples)])
+            self.logger.info(f"Successfully registered {name} with {len(samples)} samples.")
             return True, f"Registered {name} successfully!"
             
         except Exception as e:
             self.logger.error(f"Training error: {e}")
+            # No model for this user; drop the row so the employee ID can be registered again
+            self.db.delete_user(new_db_id)
             return False, f"System Error during training: {str(e)}"
+
+    def save_samples(self, users: List[Tuple[int, str, List[np.ndarray]]]) -> None:
+        """
+        Add (user_id, name, face crops) entries to the model and persist them with one save.
+        With the binary store only the new histograms are written. The normalized
+        crops are also stored in the database so the model can be rebuilt later.
+        """
+        self.ensure_model()
+        # Normalize once: the live model and a later rebuild from the stored crops must see the same pixels
+        users = [(user_id, name, [self._normalize_crop(f) for f in faces]) for user_id, name, faces in users]
+        for user_id, _, faces in users:
+            self.db.save_face_samples(user_id, np.stack(faces))
+
+        if self.store is not None:
+            entries = [(user_id, name, np.vstack([self.matcher.histogram(f) for f in faces]))
+                       for user_id, name, faces in users]
+            with self._model_lock:
+                self.store.append_many(entries)
+                for user_id, name, hists in entries:
+                    self.matcher.add(hists, np.full(len(hists), user_id, dtype=np.int32))
+                    self.known_face_names[user_id] = name
+            self._write_cache_async()
+        else:
+            faces = [f for _, _, user_faces in users for f in user_faces]
+            labels = np.array([user_id for user_id, _, user_faces in users for _ in user_faces])
+            # LBPH supports updating the model with new data without retraining from scratch
+            self.recognizer.update(faces, labels)
+            if self.matcher is not None:
+                self.matcher.add(np.vstack([self.matcher.histogram(f) for f in faces]), labels)
+            self.recognizer.save(self.model_path)
+            for user_id, name, _ in users:
+                self.known_face_names[user_id] = name
+            with open(self.labels_path, 'wb') as f:
+                pickle.dump(self.known_face_names, f)
+        self.is_trained = True
+        self.reload_server()
+
+    def delete_user(self, user_id: int) -> None:
+        """Remove one user from the model, their stored samples and the users table."""
+        self.ensure_model()
+        if self.store is None:
+            # cv2 LBPH cannot forget samples, so the legacy model is retrained from everyone else's
+            from core.rebuild import ModelRebuilder
+            rebuilder = ModelRebuilder(self, self.db)
+            missing = [u for u in rebuilder.users_without_samples() if u["id"] != user_id]
+            if missing:
+                raise RuntimeError(f"{len(missing)} users have no stored samples; the model cannot be retrained without them")
+            self.db.delete_user(user_id)
+            rebuilder.run()
+            return
+
+        with self._model_lock:
+            self.store.delete(user_id)
+            self.matcher.remove(user_id)
+            self.known_face_names.pop(user_id, None)
+            self.is_trained = len(self.matcher) > 0
+        self._write_cache_async()
+        self.db.delete_user(user_id)
+        self.reload_server()
+
+
+def prepare_shared_model() -> None:
+    """
+    Migrate, create and cache the face model in this process, so worker processes
+    can then open it read-only (FaceRecognizer(read_only=True)) without racing each other.
+    """
+    recognizer = FaceRecognizer(db_manager=None, server_url=None)
+    recognizer.wait_for_cache()
+
+
+def _suppress_overlaps(faces: List[Tuple[int, int, int, int]], threshold: float = 0.3) -> List[Tuple[int, int, int, int]]:
+    """Drop boxes found twice in overlapping search regions, keeping the larger one."""
+    kept: List[Tuple[int, int, int, int]] = []
+    for box in sorted(faces, key=lambda b: b[2] * b[3], reverse=True):
+        if all(iou(box, other) < threshold for other in kept):
+            kept.append(box)
+    return kept
@@ -0,0 +1,359 @@
+import io
+import json
+import time
+import queue
+import logging
+import ipaddress
+import threading
+import http.client
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+NPY_TYPE = "application/x-npy"
+
+
+class RecognitionServiceError(Exception):
+    """The recognition server could not be reached or did not answer the request."""
+
+
+def is_loopback(host: Optional[str]) -> bool:
+    """Whether `host` is this machine; server and stations must share one data directory."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host or "").is_loopback
+    except ValueError:
+        return False
+
+
+def _encode_array(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _decode_array(body: bytes) -> np.ndarray:
+    array = np.load(io.BytesIO(body), allow_pickle=False)
+    if array.dtype != np.uint8:
+        raise ValueError(f"Expected uint8 pixels, got {array.dtype}")
+    return array
+
+
+class _Request:
+    """One client request waiting in the batch queue."""
+
+    __slots__ = ("crops", "frame", "boxes", "result", "error", "done")
+
+    def __init__(self, crops: Optional[List[np.ndarray]] = None, frame: Optional[np.ndarray] = None):
+        self.crops = crops or []
+        self.frame = frame
+        self.boxes: List[Tuple[int, int, int, int]] = []
+        self.result: List[Tuple[Optional[int], str]] = []
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+
+
+class RecognitionServer:
+    """
+    HTTP front for one FaceRecognizer shared by the attendance stations of a site,
+    so the model is loaded (and kept in sync) once instead of once per station.
+
+        POST /identify   .npy uint8 array of grayscale face crops, (n, h, w) or (h, w)
+                         -> {"results": [{"user_id": 3, "name": "..."} or null, ...]}
+        POST /recognize  JPEG/PNG (or .npy BGR) frame
+                         -> {"faces": [{"box": [top, right, bottom, left], "user_id": 3 or null, "name": "..."}]}
+        POST /reload     reload the model from disk, e.g. after a station enrolled a user
+        GET  /health     -> {"users": n, "trained": true, "pending": n}
+
+    Handler threads only decode and enqueue. Worker threads take up to `max_batch`
+    queued requests at a time (waiting at most `batch_wait` seconds to fill a
+    batch), detect faces in any frames with a cascade of their own, and match
+    every crop of the batch in one `predict_batch` call. No tracking is done
+    here: requests from different stations are unrelated.
+
+    Stations enrol users into their own attendance.db and faces.store and then
+    ask the server to reload from its disk, so the server only listens on
+    localhost and must run from the stations' data directory.
+    """
+
+    def __init__(self, recognizer_factory: Callable[[], Any], host: str = "127.0.0.1", port: int = 0,
+                 workers: int = 2, max_batch: int = 16, batch_wait: float = 0.0, timeout: float = 10.0):
+        if not is_loopback(host):
+            raise ValueError(f"Recognition server must listen on localhost, not {host}")
+        self.recognizer_factory = recognizer_factory
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.timeout = timeout  # Longest a request waits for its batch before the client gets a 503
+        self.recognizer = None
+        self._queue: "queue.Queue[_Request]" = queue.Queue(maxsize=max_batch * workers * 4)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._reload_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _new_recognizer(self):
+        recognizer = self.recognizer_factory()
+        # Consecutive requests come from different stations, so tracks would never line up
+        recognizer.tracker = None
+        return recognizer
+
+    def start(self) -> None:
+        self.recognizer = self._new_recognizer()
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._work, name=f"recognition-worker-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="recognition-http", daemon=True).start()
+        logger.info(f"Recognition server on {self.url} ({len(self.recognizer.known_face_names)} users, "
+                    f"{self.workers} workers, batches of up to {self.max_batch})")
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._stop.set()
+        for t in self._threads:
+            t.join(2.0)
+        self._threads = []
+        # Fail whatever was still queued instead of leaving clients to time out
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            request.error = RecognitionServiceError("Server stopping")
+            request.done.set()
+
+    def reload(self) -> None:
+        """Load the model again and swap it in; batches already running finish on the old one."""
+        with self._reload_lock:
+            self.recognizer = self._new_recognizer()
+        logger.info(f"Reloaded the face model ({len(self.recognizer.known_face_names)} users).")
+
+    def health(self) -> Dict[str, Any]:
+        recognizer = self.recognizer
+        return {"users": len(recognizer.known_face_names), "trained": recognizer.is_trained,
+                "pending": self._queue.qsize()}
+
+    def identify(self, crops: List[np.ndarray]) -> List[Tuple[Optional[int], str]]:
+        """(user_id or None, name) for each grayscale face crop."""
+        return self._submit(_Request(crops=crops)).result
+
+    def recognize(self, frame: np.ndarray) -> List[Tuple[Tuple[int, int, int, int], Optional[int], str]]:
+        """(box as (top, right, bottom, left), user_id or None, name) for each face in a frame."""
+        request = self._submit(_Request(frame=frame))
+        return [((y, x + w, y + h, x), user_id, name)
+                for (x, y, w, h), (user_id, name) in zip(request.boxes, request.result)]
+
+    def _submit(self, request: _Request) -> _Request:
+        if self._stop.is_set():
+            raise RecognitionServiceError("Server stopping")
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            raise RecognitionServiceError("Server busy") from None
+        if not request.done.wait(self.timeout):
+            raise RecognitionServiceError("Timed out waiting for a worker")
+        if request.error is not None:
+            raise request.error
+        return request
+
+    def _work(self) -> None:
+        cascade = None
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            recognizer = self.recognizer
+            if cascade is None:
+                # CascadeClassifier is not safe to share between threads
+                cascade = cv2.CascadeClassifier(recognizer.cascade_path)
+            self._run(recognizer, cascade, batch)
+
+    def _run(self, recognizer, cascade, batch: List[_Request]) -> None:
+        try:
+            with metrics.timer("server_batch"):
+                crops: List[np.ndarray] = []
+                for request in batch:
+                    if request.frame is not None:
+                        frame = request.frame
+                        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                        request.boxes = recognizer.detect_faces(gray, cascade=cascade)
+                        request.crops = [gray[y:y+h, x:x+w] for (x, y, w, h) in request.boxes]
+                    crops.extend(request.crops)
+                ids = iter(recognizer.predict_batch(crops))
+                names = recognizer.known_face_names
+                for request in batch:
+                    for _ in request.crops:
+                        user_id = next(ids)
+                        name = names.get(user_id, "Unknown") if user_id is not None else "Unknown"
+                        request.result.append((user_id if name != "Unknown" else None, name))
+        except Exception as e:
+            logger.error(f"Recognition batch failed: {e}")
+            for request in batch:
+                request.error = e
+        finally:
+            for request in batch:
+                request.done.set()
+        metrics.incr("server_requests", len(batch))
+        metrics.incr("server_batches")
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive: stations reuse one connection
+            disable_nagle_algorithm = True  # Headers and body go out in separate writes; don't stall on delayed ACKs
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/health":
+                    self._reply(200, server.health())
+                else:
+                    self._reply(404, {"error": "Not found"})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                path = self.path.rstrip("/")
+                try:
+                    if path == "/identify":
+                        crops = _decode_array(body)
+                        if crops.ndim == 2:
+                            crops = crops[None]
+                        if crops.ndim != 3:
+                            raise ValueError(f"Expected (n, h, w) crops, got shape {crops.shape}")
+                        results = server.identify(list(crops))
+                        self._reply(200, {"results": [None if user_id is None else {"user_id": user_id, "name": name}
+                                                      for user_id, name in results]})
+                    elif path == "/recognize":
+                        if self.headers.get("Content-Type") == NPY_TYPE:
+                            frame = _decode_array(body)
+                        else:
+                            frame = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+                        if frame is None or frame.ndim not in (2, 3):
+                            raise ValueError("Could not decode the frame")
+                        faces = server.recognize(frame)
+                        self._reply(200, {"faces": [{"box": list(box), "user_id": user_id, "name": name}
+                                                    for box, user_id, name in faces]})
+                    elif path == "/reload":
+                        server.reload()
+                        self._reply(200, server.health())
+                    else:
+                        self._reply(404, {"error": "Not found"})
+                except ValueError as e:
+                    self._reply(400, {"error": str(e)})
+                except RecognitionServiceError as e:
+                    self._reply(503, {"error": str(e)})
+                except Exception as e:
+                    self._reply(500, {"error": str(e)})
+
+            def _reply(self, status: int, payload: Dict) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class RecognitionClient:
+    """
+    Station side of RecognitionServer, with one keep-alive connection per thread.
+
+    After a failed request `available()` reports False for `retry_after` seconds,
+    so the caller matches in-process meanwhile instead of paying a timeout on
+    every face.
+    """
+
+    def __init__(self, url: str, timeout: float = 2.0, retry_after: float = 30.0):
+        parsed = urllib.parse.urlsplit(url)
+        self.url = url
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._local = threading.local()
+        self._down_until: float = 0.0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None,
+                 content_type: Optional[str] = None) -> Dict:
+        headers = {"Content-Type": content_type} if content_type else {}
+        while True:
+            conn = getattr(self._local, "conn", None)
+            reused = conn is not None
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                self._local.conn = None
+                if reused and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    continue  # The server closed an idle keep-alive connection; retry once on a new one
+                self._down_until = time.monotonic() + self.retry_after
+                raise RecognitionServiceError(f"{self.url}{path}: {e}") from e
+            break
+        if response.status != 200:
+            if response.status >= 500:
+                self._down_until = time.monotonic() + self.retry_after
+            try:
+                message = json.loads(payload).get("error", "")
+            except ValueError:
+                message = payload[:200].decode("utf-8", "replace")
+            raise RecognitionServiceError(f"{self.url}{path}: HTTP {response.status} {message}")
+        self._down_until = 0.0
+        return json.loads(payload)
+
+    def health(self) -> Dict:
+        return self._request("GET", "/health")
+
+    def reload(self) -> Dict:
+        return self._request("POST", "/reload")
+
+    def identify(self, crops: List[np.ndarray]) -> List[Optional[Tuple[int, str]]]:
+        """(user_id, name), or None if unknown, for each grayscale crop. Crops must share one size."""
+        results = self._request("POST", "/identify", _encode_array(np.stack(crops)), NPY_TYPE)["results"]
+        return [None if r is None else (r["user_id"], r["name"]) for r in results]
+
+    def recognize(self, frame: np.ndarray, quality: int = 90) -> Tuple[List[Tuple[int, int, int, int]], List[str], List[Optional[int]]]:
+        """Detect and identify the faces in a BGR frame on the server. Same return value as FaceRecognizer.process_frame."""
+        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Could not encode the frame")
+        faces = self._request("POST", "/recognize", encoded.tobytes(), "image/jpeg")["faces"]
+        return [tuple(f["box"]) for f in faces], [f["name"] for f in faces], [f["user_id"] for f in faces]
@@ -0,0 +1,51 @@
+import os
+from typing import Iterator, Optional, Union
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def is_image_dir(source: Union[str, int]) -> bool:
+    return isinstance(source, str) and os.path.isdir(source)
+
+
+def list_images(directory: str) -> list:
+    """Image files in a directory, sorted by name so replays are deterministic."""
+    return sorted(
+        os.path.join(directory, f) for f in os.listdir(directory)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def open_capture(source: Union[str, int]) -> cv2.VideoCapture:
+    """Open a camera index ("0", 0) or a video file/stream URL."""
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return cv2.VideoCapture(int(source), cv2.CAP_DSHOW)  # DirectShow opens faster on Windows
+    return cv2.VideoCapture(source)
+
+
+def iter_frames(source: Union[str, int], max_frames: Optional[int] = None) -> Iterator[np.ndarray]:
+    """Yield BGR frames from a camera, a video file or a directory of images."""
+    count = 0
+    if is_image_dir(source):
+        for path in list_images(source):
+            if max_frames is not None and count >= max_frames:
+                return
+            frame = cv2.imread(path)
+            if frame is not None:
+                count += 1
+                yield frame
+        return
+
+    cap = open_capture(source)
+    try:
+        while max_frames is None or count < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count += 1
+            yield frame
+    finally:
+        cap.release()
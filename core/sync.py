@@ -0,0 +1,130 @@
+import json
+import random
+import logging
+import threading
+import urllib.request
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+Uploader = Callable[[List[Dict]], None]
+
+# Unique key of the cloud table. Uploads skip rows already there, so a batch
+# re-sent after a crash (uploaded, but not yet marked synced) adds no duplicates.
+CONFLICT_COLUMNS = "station,local_id"
+
+
+class RestUploader:
+    """
+    POST a batch of rows to a PostgREST endpoint (the REST API behind Supabase),
+    ignoring rows whose `on_conflict` key is already in the table.
+    Any non-2xx response raises, which the sync worker treats as a failed batch.
+    """
+
+    def __init__(self, base_url: str, api_key: str, table: str = "attendance", timeout: float = 10.0,
+                 on_conflict: str = CONFLICT_COLUMNS):
+        self.url = f"{base_url.rstrip('/')}/rest/v1/{table}?on_conflict={on_conflict}"
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def __call__(self, rows: List[Dict]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(rows).encode("utf-8"),
+            method="POST",
+            headers={
+                "Content-Type": "application/json",
+                "apikey": self.api_key,
+                "Authorization": f"Bearer {self.api_key}",
+                "Prefer": "resolution=ignore-duplicates,return=minimal",
+            },
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def supabase_uploader(client, table: str = "attendance", on_conflict: str = CONFLICT_COLUMNS) -> Uploader:
+    """Adapt a supabase-py client to the Uploader interface."""
+    def upload(rows: List[Dict]) -> None:
+        client.table(table).upsert(rows, on_conflict=on_conflict, ignore_duplicates=True).execute()
+    return upload
+
+
+class CloudSyncWorker:
+    """
+    Background thread that drains unsynced attendance rows (the outbox) to the cloud.
+
+    Rows are uploaded in batches and only marked synced after the upload succeeds,
+    so nothing is lost if the app exits mid-batch; the next run picks up where
+    this one stopped. Each row carries `station` and its local `id`, so the
+    uploaders can skip rows a previous attempt already stored. Failures back off
+    exponentially up to `max_delay` seconds.
+    """
+
+    def __init__(self, db_manager, upload: Uploader, batch_size: int = 100,
+                 base_delay: float = 2.0, max_delay: float = 300.0, idle_interval: float = 30.0,
+                 station: str = ""):
+        self.db = db_manager
+        self.upload = upload
+        self.station = station
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_interval = idle_interval
+
+        self.failures: int = 0
+        self.synced_count: int = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cloud-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self) -> None:
+        """Wake the worker early, e.g. right after a new attendance row was written."""
+        self._wake.set()
+
+    def backoff_delay(self) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (self.failures - 1)))
+        return delay * random.uniform(0.5, 1.0)  # jitter so kiosks don't retry in lockstep
+
+    def sync_once(self) -> int:
+        """Upload one batch. Returns the number of rows synced (0 if the outbox is empty)."""
+        rows = self.db.get_unsynced_logs(self.batch_size)
+        if not rows:
+            return 0
+        payload = [
+            {"station": self.station, "local_id": row["id"], "user_id": row["user_id"], "name": row["name"], "timestamp": str(row["timestamp"]).replace(" ", "T")}
+            for row in rows
+        ]
+        self.upload(payload)
+        self.db.mark_synced([row["id"] for row in rows])
+        self.synced_count += len(rows)
+        return len(rows)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                synced = self.sync_once()
+            except Exception as e:
+                self.failures += 1
+                delay = self.backoff_delay()
+                logger.warning(f"Cloud sync failed ({self.failures} in a row), retrying in {delay:.1f}s: {e}")
+                self._stop.wait(delay)
+                continue
+
+            self.failures = 0
+            if synced < self.batch_size:
+                # Outbox drained; sleep until a new row arrives or the idle interval passes
+                self._wake.wait(self.idle_interval)
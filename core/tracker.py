@@ -0,0 +1,125 @@
+import itertools
+from collections import Counter, deque
+from typing import Deque, List, Optional, Tuple
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+
+def iou(a: Box, b: Box) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def centroid_distance(a: Box, b: Box) -> float:
+    """Distance between box centres, relative to the larger box side."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    dx = (ax + aw / 2) - (bx + bw / 2)
+    dy = (ay + ah / 2) - (by + bh / 2)
+    return (dx * dx + dy * dy) ** 0.5 / max(aw, ah, bw, bh, 1)
+
+
+class Track:
+    """One face followed across frames, with a small vote over its predicted identity."""
+
+    def __init__(self, track_id: int, box: Box, vote_frames: int):
+        self.track_id = track_id
+        self.box = box
+        self.missed: int = 0
+        self.age: int = 0
+        self.votes: Deque[Optional[int]] = deque(maxlen=vote_frames)
+        self.identity: Optional[int] = None   # Confirmed user ID, once the vote settles
+        self.frames_since_predict: int = 0
+
+    def add_vote(self, label: Optional[int]) -> None:
+        self.votes.append(label)
+        self.frames_since_predict = 0
+        if len(self.votes) < self.votes.maxlen:
+            return
+        label, count = Counter(self.votes).most_common(1)[0]
+        if label is not None and count * 2 > len(self.votes):
+            self.identity = label
+
+    @property
+    def is_unknown(self) -> bool:
+        """Vote window is full and the majority could not be recognized."""
+        if self.identity is not None or len(self.votes) < self.votes.maxlen:
+            return False
+        label, count = Counter(self.votes).most_common(1)[0]
+        return label is None and count * 2 > len(self.votes)
+
+    def needs_prediction(self, unknown_retry: int) -> bool:
+        if self.identity is not None:
+            return False
+        if self.is_unknown:
+            # Keep re-checking strangers occasionally; they may turn towards the camera
+            return self.frames_since_predict >= unknown_retry
+        return True
+
+
+class FaceTracker:
+    """
+    Greedy IoU tracker with a centroid-distance fallback for fast movement.
+    Detections that match no live track start a new one; tracks unseen for
+    more than `max_missed` frames are dropped.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, centroid_threshold: float = 0.5,
+                 max_missed: int = 5, vote_frames: int = 3):
+        self.iou_threshold = iou_threshold
+        self.centroid_threshold = centroid_threshold
+        self.max_missed = max_missed
+        self.vote_frames = vote_frames
+        self.tracks: List[Track] = []
+        self._ids = itertools.count(1)
+
+    def reset(self) -> None:
+        self.tracks = []
+
+    def update(self, boxes: List[Box]) -> List[Track]:
+        """Associate this frame's detections with tracks. Returns one Track per box, in order."""
+        assigned: List[Optional[Track]] = [None] * len(boxes)
+        free = set(range(len(self.tracks)))
+
+        # 1. IoU matches, best first
+        pairs = sorted(
+            ((iou(t.box, b), ti, bi) for ti, t in enumerate(self.tracks) for bi, b in enumerate(boxes)),
+            reverse=True,
+        )
+        for score, ti, bi in pairs:
+            if score < self.iou_threshold:
+                break
+            if ti in free and assigned[bi] is None:
+                assigned[bi] = self.tracks[ti]
+                free.discard(ti)
+
+        # 2. Centroid fallback for boxes that jumped too far for any overlap
+        for bi, box in enumerate(boxes):
+            if assigned[bi] is not None or not free:
+                continue
+            ti = min(free, key=lambda i: centroid_distance(self.tracks[i].box, box))
+            if centroid_distance(self.tracks[ti].box, box) < self.centroid_threshold:
+                assigned[bi] = self.tracks[ti]
+                free.discard(ti)
+
+        for ti in free:
+            self.tracks[ti].missed += 1
+
+        for bi, box in enumerate(boxes):
+            track = assigned[bi]
+            if track is None:
+                track = Track(next(self._ids), box, self.vote_frames)
+                self.tracks.append(track)
+                assigned[bi] = track
+            track.box = tuple(int(v) for v in box)
+            track.missed = 0
+            track.age += 1
+            track.frames_since_predict += 1
+
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return assigned
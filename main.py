@@ -1,6 +1,12 @@
+import time
+STARTED_AT = time.perf_counter()  # Reference point for the startup-time budget
+
 import sys
 import os
+import json
 import logging
+import argparse
+import multiprocessing
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -8,17 +14,334 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from ui.main_window import MainWindow
-except ImportError as e:
-    logging.error(f"Failed to import UI components: {e}")
-    sys.exit(1)
 
-if __name__ == "__main__":
+def run_gui():
+    try:
+        from ui.main_window import MainWindow
+    except ImportError as e:
+        logging.error(f"Failed to import UI components: {e}")
+        sys.exit(1)
+
     logging.info("Initializing Biometric Attendance System...")
     try:
-        app = MainWindow()
+        app = MainWindow(started_at=STARTED_AT)
         app.mainloop()
     except Exception as e:
         logging.critical(f"Application crashed: {e}", exc_info=True)
         input("Press Enter to close...")
+
+
+def run_multicam(args):
+    from core.database import DatabaseManager
+    from core.multicam import MultiCameraServer
+
+    db = None if args.dry_run else DatabaseManager()
+    emit = (lambda event: print(json.dumps(event), flush=True)) if args.dry_run else None
+    server = MultiCameraServer(args.source, workers=args.workers, db_manager=db, emit=emit)
+    try:
+        stats = server.run(max_frames=args.max_frames)
+    except KeyboardInterrupt:
+        server.stop()
+        return
+    finally:
+        if db:
+            db.close()
+    logging.info(f"Throughput: {stats['fps']} fps over {stats['frames']} frames with {stats['workers']} workers")
+
+
+def run_batch(args):
+    import datetime
+    from core.batch import BatchProcessor
+    from core.database import DatabaseManager
+
+    start_time = datetime.datetime.fromisoformat(args.start_time) if args.start_time else None
+    db = None if args.dry_run else DatabaseManager()
+    out = open(args.output, "w") if args.output else sys.stdout
+    emit = (lambda event: out.write(json.dumps(event) + "\n")) if args.dry_run else None
+    try:
+        processor = BatchProcessor(args.inputs, workers=args.workers, db_manager=db, emit=emit,
+                                   start_time=start_time, image_interval=args.image_interval)
+        stats = processor.run()
+    finally:
+        if db:
+            db.close()
+        if out is not sys.stdout:
+            out.close()
+    logging.info(f"Processed {stats['frames']} frames from {stats['sources']} sources at {stats['fps']} fps, "
+                 f"{stats['attendance_marked']} attendance events")
+
+
+def run_import(args):
+    import csv
+    from core.bulk_import import BulkImporter, read_roster
+    from core.database import DatabaseManager
+    from core.recognition import FaceRecognizer
+    from utils.config import Config
+
+    entries = read_roster(args.roster, args.photos)
+    db = DatabaseManager()
+    try:
+        # The server URL only lets the import ask a running server to reload the model
+        importer = BulkImporter(FaceRecognizer(db, server_url=Config.RECOGNITION_SERVER_URL), db, workers=args.workers, min_samples=args.min_samples)
+        report = importer.run(entries)
+    finally:
+        db.close()
+
+    for failure in report["failures"]:
+        logging.warning(f"{failure['employee_id']} ({failure['name']}): {failure['reason']}")
+    if args.report:
+        with open(args.report, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["employee_id", "name", "reason"])
+            writer.writeheader()
+            writer.writerows(report["failures"])
+    logging.info(f"Imported {report['imported']}/{report['users']} users ({report['samples']} samples) "
+                 f"from {report['photos']} photos in {report['seconds']}s: "
+                 f"{report['photos_per_s']} photos/s, {report['users_per_s']} users/s")
+    sys.exit(1 if report["failed"] else 0)
+
+
+def run_rebuild(args):
+    """Retrain the face model from the stored samples. Run with the GUI closed."""
+    from core.database import DatabaseManager
+    from core.rebuild import ModelRebuilder
+    from core.recognition import FaceRecognizer
+    from utils.config import Config
+
+    db = DatabaseManager(connect_cloud=False)
+    try:
+        recognizer = FaceRecognizer(db, server_url=Config.RECOGNITION_SERVER_URL)
+        rebuilder = ModelRebuilder(recognizer, db, workers=args.workers)
+        missing = rebuilder.users_without_samples()
+        if missing and recognizer.store is None and not args.allow_missing:
+            logging.error(f"{len(missing)} users have no stored samples and would be dropped from the model; "
+                          f"pass --allow-missing to rebuild anyway")
+            sys.exit(1)
+        report = rebuilder.run()
+    finally:
+        db.close()
+
+    if report["kept_without_samples"]:
+        logging.warning(f"{len(report['kept_without_samples'])} users have no stored samples; "
+                        f"their existing templates were kept")
+    if report["missing"]:
+        logging.warning(f"{len(report['missing'])} users are not in the model: {report['missing']}")
+    print(json.dumps(report))
+
+
+def run_delete_user(args):
+    """Remove one user's face samples, templates and record. Run with the GUI closed."""
+    from core.database import DatabaseManager
+    from core.recognition import FaceRecognizer
+    from utils.config import Config
+
+    db = DatabaseManager(connect_cloud=False)
+    try:
+        user = db.get_user_by_employee_id(args.employee_id)
+        if user is None:
+            logging.error(f"No user with employee ID {args.employee_id}")
+            sys.exit(1)
+        recognizer = FaceRecognizer(db, server_url=Config.RECOGNITION_SERVER_URL)
+        recognizer.delete_user(user["id"])
+        if recognizer.store is not None:
+            recognizer.store.wait()
+    finally:
+        db.close()
+    logging.info(f"Deleted {user['name']} ({args.employee_id}).")
+
+
+def run_serve(args):
+    """Serve face matching to the attendance stations on this machine."""
+    from core.recognition import FaceRecognizer
+    from core.recognition_service import RecognitionServer
+    from utils.config import Config
+
+    # The server owns the model; it never forwards to another server
+    server = RecognitionServer(lambda: FaceRecognizer(db_manager=None, server_url=None),
+                               port=args.port or Config.RECOGNITION_SERVER_PORT,
+                               workers=args.workers or Config.RECOGNITION_SERVER_WORKERS,
+                               max_batch=args.max_batch or Config.RECOGNITION_BATCH_SIZE,
+                               batch_wait=Config.RECOGNITION_BATCH_WAIT)
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+def run_backfill_summary(args):
+    """Recompute the daily attendance summary from the raw attendance rows."""
+    from core.database import DatabaseManager
+
+    db = DatabaseManager(connect_cloud=False)
+    try:
+        start = time.perf_counter()
+        rows = db.backfill_daily_summary(args.start, args.end)
+    finally:
+        db.close()
+    logging.info(f"Wrote {rows} daily summary rows in {time.perf_counter() - start:.2f}s.")
+
+
+def run_archive(args):
+    """Move closed months of attendance into per-month archive files."""
+    from core.database import DatabaseManager
+
+    db = DatabaseManager(connect_cloud=False)
+    try:
+        moved = db.archive_closed_months(args.retention_months)
+    finally:
+        db.close()
+    logging.info(f"Archived {sum(moved.values())} rows from {len(moved)} months into {db.archive.directory}.")
+
+
+def run_export(args):
+    """Stream attendance or users to CSV / JSON lines, optionally gzip-compressed."""
+    from core.database import DatabaseManager
+    from core.export import export_attendance, export_users, open_output
+
+    db = DatabaseManager(connect_cloud=False)
+    try:
+        user_id = None
+        if args.employee_id:
+            user = db.get_user_by_employee_id(args.employee_id)
+            if user is None:
+                logging.error(f"No user with employee ID {args.employee_id}")
+                sys.exit(1)
+            user_id = user["id"]
+
+        start = time.perf_counter()
+        out = open_output(args.output, args.gzip)
+        try:
+            if args.table == "users":
+                rows = export_users(db, out, args.format)
+            else:
+                rows = export_attendance(db, out, args.format, args.start, args.end, user_id)
+        finally:
+            if out is sys.stdout:
+                out.flush()
+            else:
+                out.close()
+    finally:
+        db.close()
+    logging.info(f"Exported {rows} {args.table} rows in {time.perf_counter() - start:.2f}s.")
+
+
+def run_startup_check(args):
+    """Open the GUI, wait for first paint (and warm-up with --wait-ready), close it and check the budgets."""
+    from ui.main_window import MainWindow
+    from utils.config import Config
+
+    app = MainWindow(started_at=STARTED_AT)
+
+    def poll():
+        timings = app.startup_timings
+        done = "first_paint" in timings and (not args.wait_ready or "ready" in timings)
+        if done or time.perf_counter() - STARTED_AT > args.timeout:
+            app.on_closing()
+        else:
+            app.after(20, poll)
+
+    app.after(20, poll)
+    app.mainloop()
+
+    timings = {name: round(seconds, 3) for name, seconds in app.startup_timings.items()}
+    budgets = {"first_paint": args.budget or Config.STARTUP_BUDGET}
+    if args.wait_ready:
+        budgets["ready"] = args.warmup_budget or Config.WARMUP_BUDGET
+    failures = [name for name, budget in budgets.items() if timings.get(name, float("inf")) > budget]
+    if args.wait_ready and app.warmup_error:
+        failures.append("warmup_error")
+    print(json.dumps({"timings": timings, "budgets": budgets, "failures": failures}))
+    sys.exit(1 if failures else 0)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Biometric Attendance System. Run without a command to open the GUI.")
+    commands = parser.add_subparsers(dest="command")
+
+    multicam = commands.add_parser("multicam", help="Headless recognition over several cameras or video files")
+    multicam.add_argument("--source", action="append", required=True,
+                          help="Camera index, stream URL, video file or image folder (repeat for each camera)")
+    multicam.add_argument("--workers", type=int, default=None, help="Recognition processes (default: CPU count)")
+    multicam.add_argument("--max-frames", type=int, default=None, help="Stop each source after this many frames")
+    multicam.add_argument("--dry-run", action="store_true", help="Print attendance events as JSONL instead of writing to the DB")
+    multicam.set_defaults(func=run_multicam)
+
+    batch = commands.add_parser("batch", help="Reprocess recorded video files or image folders as fast as possible")
+    batch.add_argument("inputs", nargs="+", help="Video files, image folders, or folders of videos")
+    batch.add_argument("--workers", type=int, default=None, help="Recognition processes (default: CPU count)")
+    batch.add_argument("--dry-run", action="store_true", help="Emit attendance events as JSONL instead of writing to the DB")
+    batch.add_argument("--output", help="JSONL file for --dry-run events (default: stdout)")
+    batch.add_argument("--start-time", help="Local wall-clock time of the first frame, e.g. 2024-05-01T08:00:00 "
+                                            "(default: a video's modification time minus its length; "
+                                            "each image's modification time)")
+    batch.add_argument("--image-interval", type=float, default=1.0,
+                       help="Seconds between consecutive images when --start-time is given")
+    batch.set_defaults(func=run_batch)
+
+    enroll = commands.add_parser("import", help="Bulk-enrol users from a CSV roster and folders of photos")
+    enroll.add_argument("roster", help="CSV with name and employee_id columns (optional photos column: folder per user)")
+    enroll.add_argument("--photos", help="Folder containing one sub-folder of photos per employee_id "
+                                         "(default: next to the CSV)")
+    enroll.add_argument("--workers", type=int, default=None, help="Face extraction processes (default: CPU count)")
+    enroll.add_argument("--min-samples", type=int, default=1, help="Usable face photos required per user")
+    enroll.add_argument("--report", help="Write per-user failures to this CSV")
+    enroll.set_defaults(func=run_import)
+
+    rebuild = commands.add_parser("rebuild", help="Retrain the face model from the stored face samples")
+    rebuild.add_argument("--workers", type=int, default=None, help="Histogram processes (default: CPU count)")
+    rebuild.add_argument("--allow-missing", action="store_true",
+                         help="Legacy model only: rebuild even if some users have no stored samples (they are dropped)")
+    rebuild.set_defaults(func=run_rebuild)
+
+    delete = commands.add_parser("delete-user", help="Remove one user and their face samples from the model")
+    delete.add_argument("employee_id", help="Employee ID of the user to remove")
+    delete.set_defaults(func=run_delete_user)
+
+    serve = commands.add_parser("serve", help="Run the shared recognition server used by stations with RECOGNITION_SERVER_URL")
+    serve.add_argument("--port", type=int, default=None, help="Port to listen on (default: Config.RECOGNITION_SERVER_PORT)")
+    serve.add_argument("--workers", type=int, default=None, help="Matching threads (default: Config.RECOGNITION_SERVER_WORKERS)")
+    serve.add_argument("--max-batch", type=int, default=None, help="Requests per batch (default: Config.RECOGNITION_BATCH_SIZE)")
+    serve.set_defaults(func=run_serve)
+
+    backfill = commands.add_parser("backfill-summary",
+                                   help="Rebuild the daily attendance summary used by reports from the raw log")
+    backfill.add_argument("--start", help="First day to rebuild, YYYY-MM-DD (default: all history)")
+    backfill.add_argument("--end", help="Last day to rebuild, YYYY-MM-DD (default: all history)")
+    backfill.set_defaults(func=run_backfill_summary)
+
+    archive = commands.add_parser("archive", help="Move closed months of attendance into per-month archive files")
+    archive.add_argument("--retention-months", type=int, default=None,
+                         help="Months kept in the live table, the current one included (default: Config.ARCHIVE_RETENTION_MONTHS)")
+    archive.set_defaults(func=run_archive)
+
+    export = commands.add_parser("export", help="Stream attendance or users to CSV or JSON lines")
+    export.add_argument("table", choices=["attendance", "users"])
+    export.add_argument("--output", "-o", default="-", help="Output file, '-' for stdout; a .gz name implies --gzip")
+    export.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    export.add_argument("--gzip", action="store_true", help="Compress the output")
+    export.add_argument("--start", help="First day, YYYY-MM-DD (attendance only)")
+    export.add_argument("--end", help="Last day, YYYY-MM-DD (attendance only)")
+    export.add_argument("--employee-id", help="Only this user's attendance")
+    export.set_defaults(func=run_export)
+
+    startup = commands.add_parser("startup-check", help="Measure GUI startup time and fail if it is over budget")
+    startup.add_argument("--wait-ready", action="store_true", help="Also wait for the model warm-up to finish")
+    startup.add_argument("--budget", type=float, default=None, help="Seconds to first paint (default: Config.STARTUP_BUDGET)")
+    startup.add_argument("--warmup-budget", type=float, default=None,
+                         help="Seconds until warm-up finishes (default: Config.WARMUP_BUDGET)")
+    startup.add_argument("--timeout", type=float, default=60.0, help="Give up after this many seconds")
+    startup.set_defaults(func=run_startup_check)
+
+    return parser
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    args = build_parser().parse_args()
+    if args.command is None:
+        run_gui()
+    else:
+        args.func(args)
@@ -0,0 +1,59 @@
+import os
+import datetime
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from core.batch import iter_timed_frames
+from core.database import TIMESTAMP_FORMAT
+
+
+class TimedFramesTest(unittest.TestCase):
+    FPS = 10.0
+    FRAMES = 50  # 5 seconds of video
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.video = os.path.join(self.dir.name, "clip.avi")
+        writer = cv2.VideoWriter(self.video, cv2.VideoWriter_fourcc(*"MJPG"), self.FPS, (64, 48))
+        for i in range(self.FRAMES):
+            writer.write(np.full((48, 64, 3), i * 4, np.uint8))
+        writer.release()
+        self.ended = datetime.datetime(2024, 5, 1, 8, 30, 0)
+        os.utime(self.video, (self.ended.timestamp(), self.ended.timestamp()))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def stamps(self, **kwargs):
+        return [datetime.datetime.strptime(stamp, TIMESTAMP_FORMAT)
+                for _, stamp, _ in iter_timed_frames(self.video, **kwargs)]
+
+    def test_default_base_is_modification_time_minus_length(self):
+        stamps = self.stamps()
+        self.assertEqual(len(stamps), self.FRAMES)
+        self.assertEqual(stamps[0], self.ended - datetime.timedelta(seconds=self.FRAMES / self.FPS))
+        self.assertEqual(stamps[-1], datetime.datetime(2024, 5, 1, 8, 29, 59))
+        self.assertTrue(all(stamp <= self.ended for stamp in stamps))
+
+    def test_start_time_overrides_modification_time(self):
+        start = datetime.datetime(2024, 5, 1, 7, 0, 0)
+        stamps = self.stamps(start_time=start)
+        self.assertEqual(stamps[0], start)
+        self.assertEqual(stamps[25], start + datetime.timedelta(seconds=2))  # 2.5s; timestamps have whole seconds
+        self.assertEqual(stamps[-1], start + datetime.timedelta(seconds=4))
+
+    def test_images_use_start_time_and_interval(self):
+        images = os.path.join(self.dir.name, "images")
+        os.mkdir(images)
+        for i in range(3):
+            cv2.imwrite(os.path.join(images, f"{i:03d}.png"), np.zeros((8, 8, 3), np.uint8))
+        start = datetime.datetime(2024, 5, 1, 9, 0, 0)
+        stamps = [stamp for _, stamp, _ in iter_timed_frames(images, start, image_interval=2.0)]
+        self.assertEqual(stamps, ["2024-05-01 09:00:00", "2024-05-01 09:00:02", "2024-05-01 09:00:04"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from core.connection import ConnectionManager
+
+
+class ReaderLifetimeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cm = ConnectionManager(os.path.join(self.dir.name, "attendance.db"))
+
+    def tearDown(self):
+        self.cm.close_all()
+        self.dir.cleanup()
+
+    def test_reader_is_closed_when_its_thread_exits(self):
+        self.cm.reader().execute("SELECT 1")
+        for _ in range(20):
+            t = threading.Thread(target=lambda: self.cm.reader().execute("SELECT 1"))
+            t.start()
+            t.join()
+        self.assertEqual(self.cm.open_readers, 1)
+
+    def test_close_all_closes_remaining_readers(self):
+        self.cm.reader()
+        self.cm.close_all()
+        self.assertEqual(self.cm.open_readers, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
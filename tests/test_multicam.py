@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+
+from benchmarks.synthetic import FRAME_SIZE, registration_frames, synthetic_face, synthetic_frame
+from core.database import DatabaseManager
+from core.multicam import MultiCameraServer
+from core.recognition import FaceRecognizer
+
+
+class MultiCameraTest(unittest.TestCase):
+    FRAMES = 6
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.TemporaryDirectory()
+        os.chdir(self.dir.name)  # attendance.db and faces.store are relative paths; workers inherit the cwd
+        self.db = DatabaseManager(connect_cloud=False)
+        recognizer = FaceRecognizer(self.db)
+        self.users = {}
+        for seed, name in ((1, "Ada"), (2, "Bob")):
+            success, msg = recognizer.register_new_face(registration_frames(seed, 8), name, f"E{seed}")
+            self.assertTrue(success, msg)
+            self.users[seed] = self.db.get_user_by_employee_id(f"E{seed}")["id"]
+        recognizer.store.wait()
+        self.videos = [self.write_video(seed) for seed in self.users]
+
+    def tearDown(self):
+        self.db.close()
+        os.chdir(self.cwd)
+        self.dir.cleanup()
+
+    def write_video(self, seed: int) -> str:
+        path = os.path.join(self.dir.name, f"camera-{seed}.avi")
+        height, width = FRAME_SIZE
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"FFV1"), 10.0, (width, height))  # Lossless
+        for i in range(self.FRAMES):
+            writer.write(synthetic_frame(synthetic_face(seed, 100 + i)))
+        writer.release()
+        return path
+
+    def test_two_videos_feed_one_attendance_writer(self):
+        events = []
+        server = MultiCameraServer(self.videos, workers=2, db_manager=self.db, emit=events.append)
+        stats = server.run()
+
+        self.assertEqual(stats["frames"], 2 * self.FRAMES)
+        self.assertEqual(stats["per_source"], {video: self.FRAMES for video in self.videos})
+        # One first-of-the-day mark per user, each from the camera that saw them
+        self.assertEqual(stats["attendance_marked"], 2)
+        self.assertEqual({(e["user_id"], e["source"]) for e in events},
+                         {(self.users[1], self.videos[0]), (self.users[2], self.videos[1])})
+        self.assertEqual(sorted(name for name, _ in self.db.get_recent_logs(10)), ["Ada", "Bob"])
+
+
+if __name__ == "__main__":
+    unittest.main()
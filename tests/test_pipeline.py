@@ -0,0 +1,80 @@
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from core.pipeline import RecognitionPipeline
+from utils.config import Config
+
+
+class StillCamera:
+    """A camera watching a scene that never changes."""
+
+    def read(self):
+        time.sleep(0.005)
+        return True, np.full((120, 160, 3), 100, np.uint8)
+
+    def get(self, prop):
+        return 0
+
+    def set(self, prop, value):
+        pass
+
+
+class LateRecognizer:
+    """Finds a face only from its `found_after`-th call, like a person the first detections missed."""
+
+    def __init__(self, found_after: int):
+        self.found_after = found_after
+        self.calls = 0
+
+    def reset_tracking(self):
+        pass
+
+    def process_frame(self, frame):
+        self.calls += 1
+        if self.calls < self.found_after:
+            return [], [], []
+        return [(10, 50, 50, 10)], ["Unknown"], [None]
+
+
+@mock.patch.multiple(Config, MOTION_GATE=True, IDLE_AFTER_SECONDS=0, MOTION_FOLLOW_FRAMES=3,
+                     MOTION_MAX_SKIP_SECONDS=0.2)
+class MotionGateTest(unittest.TestCase):
+    def run_pipeline(self, recognizer, seconds: float) -> RecognitionPipeline:
+        pipeline = RecognitionPipeline(StillCamera(), recognizer)
+        pipeline.start()
+        time.sleep(seconds)
+        pipeline.stop()
+        return pipeline
+
+    def test_static_scene_is_mostly_skipped(self):
+        recognizer = LateRecognizer(found_after=10 ** 6)
+        pipeline = self.run_pipeline(recognizer, 0.5)
+        self.assertGreater(pipeline.savings["skipped_frames"], 2 * recognizer.calls)
+
+    def test_person_missed_while_moving_is_found_standing_still(self):
+        recognizer = LateRecognizer(found_after=6)  # first pass, 3 follow-up frames, then periodic passes
+        pipeline = self.run_pipeline(recognizer, 1.0)
+        self.assertGreaterEqual(recognizer.calls, 6)
+        self.assertTrue(pipeline._faces_in_view)
+
+    def test_mode_switch_resets_gate_on_recognition_thread(self):
+        recognizer = LateRecognizer(found_after=10 ** 6)
+        pipeline = RecognitionPipeline(StillCamera(), recognizer)
+        pipeline.start()
+        try:
+            time.sleep(0.1)
+            before = recognizer.calls
+            pipeline._gate_reset.set()
+            time.sleep(0.1)
+            # 5 settle frames plus the follow-up frames are searched
+            self.assertGreaterEqual(recognizer.calls - before, 5 + Config.MOTION_FOLLOW_FRAMES)
+            self.assertFalse(pipeline._gate_reset.is_set())
+        finally:
+            pipeline.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
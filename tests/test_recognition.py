@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import synthetic_face
+from core.database import DatabaseManager
+from core.recognition import FaceRecognizer
+from utils.config import Config
+
+
+class SaveSamplesTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.TemporaryDirectory()
+        os.chdir(self.dir.name)  # attendance.db and faces.store are relative paths
+        self.db = DatabaseManager(connect_cloud=False)
+        self.recognizer = FaceRecognizer(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        os.chdir(self.cwd)
+        self.dir.cleanup()
+
+    def test_model_is_built_from_the_stored_crops(self):
+        # Crops larger than SAMPLE_SIZE, as a caller skipping the sample collector might pass
+        crops = [cv2.resize(synthetic_face(1, s), (200, 200)) for s in range(4)]
+        _, user_id = self.db.add_user_placeholder("Ada", "E1")
+        self.recognizer.save_samples([(user_id, "Ada", crops)])
+
+        [(_, _, stored)] = list(self.db.iter_face_samples())
+        self.assertEqual(stored.shape, (4, Config.SAMPLE_SIZE, Config.SAMPLE_SIZE))
+        hists, labels, _ = self.recognizer.store.load()
+        expected = np.vstack([self.recognizer.matcher.histogram(s) for s in stored])
+        np.testing.assert_allclose(hists, expected, rtol=1e-5)
+        self.assertEqual(labels.tolist(), [user_id] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.synthetic import synthetic_face
+from core.database import DatabaseManager
+from core.recognition import FaceRecognizer
+from core.recognition_service import RecognitionClient, RecognitionServer
+
+
+class LocalServerTest(unittest.TestCase):
+    """A station and the shared server on localhost, run from one data directory."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.TemporaryDirectory()
+        os.chdir(self.dir.name)  # attendance.db, faces.store and model_cache are relative paths
+        self.server = RecognitionServer(lambda: FaceRecognizer(db_manager=None, server_url=None))
+        self.server.start()
+        self.db = DatabaseManager(connect_cloud=False)
+        self.station = FaceRecognizer(self.db, server_url=self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+        self.db.close()
+        os.chdir(self.cwd)
+        self.dir.cleanup()
+
+    def enrol(self, user: int, name: str) -> int:
+        success, msg = self.station.register_samples([synthetic_face(user, s) for s in range(8)], name, f"E{user}")
+        self.assertTrue(success, msg)
+        return self.db.get_user_by_employee_id(f"E{user}")["id"]
+
+    def test_station_enrolment_is_recognized_by_server(self):
+        self.assertIsNotNone(self.station.remote)
+        ada, bob = self.enrol(1, "Ada"), self.enrol(2, "Bob")
+        self.assertEqual(self.server.health()["users"], 2)
+
+        client = RecognitionClient(self.server.url)
+        matches = client.identify([synthetic_face(1, 100), synthetic_face(2, 100)])
+        self.assertEqual(matches, [(ada, "Ada"), (bob, "Bob")])
+        self.assertEqual(self.station._predict(synthetic_face(2, 101)), bob)
+
+    def test_station_matches_locally_when_server_stops(self):
+        ada = self.enrol(1, "Ada")
+        self.server.stop()
+        self.assertEqual(self.station._predict(synthetic_face(1, 100)), ada)
+        self.assertFalse(self.station.remote.available())
+
+    def test_server_only_listens_on_localhost(self):
+        with self.assertRaises(ValueError):
+            RecognitionServer(lambda: None, host="0.0.0.0")
+
+    def test_station_ignores_server_on_another_host(self):
+        station = FaceRecognizer(self.db, server_url="http://192.0.2.10:8765")
+        self.assertIsNone(station.remote)
+
+
+if __name__ == "__main__":
+    unittest.main()
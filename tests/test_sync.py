@@ -0,0 +1,143 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.database import DatabaseManager
+from core.sync import CONFLICT_COLUMNS, CloudSyncWorker, RestUploader
+
+
+class StandInRest(ThreadingHTTPServer):
+    """
+    Local stand-in for the PostgREST endpoint that fails the first `fail_first` POSTs.
+    Like PostgREST with `resolution=ignore-duplicates`, it skips rows whose
+    `on_conflict` key it already stored.
+    """
+
+    def __init__(self, fail_first: int = 0):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.fail_first = fail_first
+        self.attempts = 0
+        self.received = 0
+        self.rows = []
+        self.headers = []
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with self.server.lock:
+            self.server.attempts += 1
+            failing = self.server.attempts <= self.server.fail_first
+            if not failing:
+                path, _, query = self.path.partition("?")
+                columns = urllib.parse.parse_qs(query)["on_conflict"][0].split(",")
+                self.server.headers.append((path, columns, self.headers["apikey"], self.headers["Prefer"]))
+                stored = {tuple(row[c] for c in columns) for row in self.server.rows}
+                for row in json.loads(body):
+                    self.server.received += 1
+                    if tuple(row[c] for c in columns) not in stored:
+                        self.server.rows.append(row)
+        self.send_response(503 if failing else 201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class CloudSyncTest(unittest.TestCase):
+    ROWS = 5
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.TemporaryDirectory()
+        os.chdir(self.dir.name)  # attendance.db is a relative path
+        self.db = DatabaseManager(connect_cloud=False)
+        for user_id in range(1, self.ROWS + 1):
+            self.db.log_attendance(user_id, f"user-{user_id}", f"2024-05-0{user_id} 08:00:00")
+
+    def tearDown(self):
+        self.db.close()
+        os.chdir(self.cwd)
+        self.dir.cleanup()
+
+    def sync(self, rest: StandInRest, **kwargs) -> CloudSyncWorker:
+        worker = CloudSyncWorker(self.db, RestUploader(rest.url, "test-key", timeout=2.0), station="kiosk-1", **kwargs)
+        worker.start()
+        self.addCleanup(worker.stop)
+        return worker
+
+    def wait_for(self, condition, timeout: float = 5.0) -> None:
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.01)
+
+    def test_retries_with_backoff_then_marks_rows_synced(self):
+        rest = StandInRest(fail_first=2)
+        self.addCleanup(rest.close)
+        worker = self.sync(rest, batch_size=2, base_delay=0.05, max_delay=0.2)
+        self.wait_for(lambda: worker.synced_count == self.ROWS)
+
+        self.assertEqual(rest.attempts, 2 + 3)  # two refused, then three batches of at most 2
+        self.assertEqual(worker.failures, 0)
+        self.assertEqual(self.db.get_unsynced_logs(), [])
+        self.assertEqual([row["user_id"] for row in rest.rows], list(range(1, self.ROWS + 1)))
+        self.assertEqual(rest.rows[0], {"station": "kiosk-1", "local_id": 1, "user_id": 1, "name": "user-1",
+                                        "timestamp": "2024-05-01T08:00:00"})
+        path, columns, key, prefer = rest.headers[0]
+        self.assertEqual((path, columns, key), ("/rest/v1/attendance", CONFLICT_COLUMNS.split(","), "test-key"))
+        self.assertIn("resolution=ignore-duplicates", prefer)
+
+    def test_batch_resent_after_crash_is_not_duplicated(self):
+        rest = StandInRest()
+        self.addCleanup(rest.close)
+        worker = CloudSyncWorker(self.db, RestUploader(rest.url, "test-key", timeout=2.0), station="kiosk-1")
+        # Uploaded, then the app died before marking the rows synced
+        with mock.patch.object(self.db, "mark_synced", side_effect=RuntimeError("crash")):
+            with self.assertRaises(RuntimeError):
+                worker.sync_once()
+        self.assertEqual(worker.sync_once(), self.ROWS)
+
+        self.assertEqual(rest.received, 2 * self.ROWS)
+        self.assertEqual(len(rest.rows), self.ROWS)
+        self.assertEqual(self.db.get_unsynced_logs(), [])
+
+    def test_failed_uploads_keep_rows_in_outbox(self):
+        rest = StandInRest(fail_first=10 ** 6)
+        self.addCleanup(rest.close)
+        worker = self.sync(rest, base_delay=0.01, max_delay=0.04)
+        self.wait_for(lambda: rest.attempts >= 4)
+
+        self.assertGreaterEqual(worker.failures, 3)
+        self.assertLessEqual(worker.backoff_delay(), 0.04)
+        self.assertEqual(worker.synced_count, 0)
+        self.assertEqual(len(self.db.get_unsynced_logs()), self.ROWS)
+
+    def test_backoff_doubles_up_to_max_delay(self):
+        worker = CloudSyncWorker(self.db, lambda rows: None, base_delay=2.0, max_delay=10.0)
+        for failures, ceiling in ((1, 2.0), (2, 4.0), (3, 8.0), (6, 10.0)):
+            worker.failures = failures
+            delay = worker.backoff_delay()
+            self.assertGreaterEqual(delay, ceiling / 2)
+            self.assertLessEqual(delay, ceiling)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,21 @@
 import customtkinter as ctk
-import cv2
-from PIL import Image, ImageTk
 import threading
+import time
+import logging
+from core.metrics import metrics
+from core.pipeline import RecognitionPipeline
+from core.sources import open_capture
+from utils.config import Config
+from .renderer import FrameRenderer
 
 class AttendanceFrame(ctk.CTkFrame):
     def __init__(self, master, face_recognizer):
         super().__init__(master)
+        self.logger = logging.getLogger(__name__)
         self.face_recognizer = face_recognizer
         self.cap = None
+        self.pipeline = None
+        self._last_stats_log = 0.0
         self.is_running = False
         self.loading_camera = False
         
@@ -17,23 +25,37 @@ class AttendanceFrame(ctk.CTkFrame):
         # Camera Feed Label
         self.camera_label = ctk.CTkLabel(self, text="Camera Feed Loading...")
         self.camera_label.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
+        self.renderer = FrameRenderer(self.camera_label, 640, 480)
+        self._frame = None  # Newest captured frame, repainted at Config.DISPLAY_FPS
         
         # Status Label Overlay (We'll just use a bottom label for simplicity)
         self.status_label = ctk.CTkLabel(self, text="Ready", font=ctk.CTkFont(size=18, weight="bold"))
         self.status_label.grid(row=1, column=0, padx=20, pady=10)
+        
+        # Per-stage timing overlay (only when instrumentation is on)
+        self.debug_label = None
+        self._last_overlay = 0.0
+        if Config.METRICS_OVERLAY and metrics.enabled:
+            self.debug_label = ctk.CTkLabel(self, text="", justify="left", anchor="w",
+                                            font=ctk.CTkFont(family="Courier", size=11))
+            self.debug_label.grid(row=2, column=0, padx=20, pady=(0, 10), sticky="w")
 
     def start_camera(self):
         if not self.is_running and not self.loading_camera:
             self.loading_camera = True
             self.camera_label.configure(text="Connecting to Camera... 📷", image=None)
+            self.renderer.reset()
             threading.Thread(target=self._init_camera, daemon=True).start()
 
     def _init_camera(self):
         try:
-            new_cap = cv2.VideoCapture(0, cv2.CAP_DSHOW) # Faster on Windows
+            new_cap = open_capture(Config.CAMERA_SOURCE)
             if new_cap.isOpened():
                 self.cap = new_cap
+                self.pipeline = RecognitionPipeline(new_cap, self.face_recognizer, Config.PIPELINE_QUEUE_SIZE)
+                self.pipeline.start()
                 self.is_running = True
+                self._last_stats_log = time.monotonic()
                 self.after(0, self.update_camera)
             else:
                 self.after(0, lambda: self.camera_label.configure(text="Camera Failed to Open"))
@@ -44,60 +66,44 @@ class AttendanceFrame(ctk.CTkFrame):
 
     def stop_camera(self):
         self.is_running = False
+        self._frame = None
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
         if self.cap:
             self.cap.release()
             self.cap = None
             
     def update_camera(self):
-        if self.is_running and self.cap:
-            ret, frame = self.cap.read()
-            if ret:
-                # Run recognition
-                locations, names, ids = self.face_recognizer.process_frame(frame)
-                
-                # Draw boxes and names on the frame
-                for (top, right, bottom, left), name in zip(locations, names):
-                    
-                    color = (0, 255, 0) # Green by default
-                    
-                    # Log Attendance if known
-                    status_text = ""
-                    if name != "Unknown" and ids:
-                        try:
-                            idx = names.index(name)
-                            user_id = ids[idx]
-                            
-                            if user_id is not None:
-                                success, msg = self.face_recognizer.db.log_attendance(user_id, name)
-                                status_text = msg
-                                
-                                if success:
-                                    color = (0, 255, 0) # Green
-                                    self.status_label.configure(text=msg, text_color="#2ecc71") # Green
-                                else:
-                                    color = (0, 165, 255) # Orange/Yellow (BGR)
-                                    self.status_label.configure(text=msg, text_color="#e67e22") # Orange
+        """Paint the newest captured frame with the newest recognition results."""
+        if self.is_running and self.pipeline:
+            frame, result, is_new = self.pipeline.latest()
 
-                        except ValueError:
-                            pass
-                    else:
-                         color = (0, 0, 255) # Red for unknown
-                         self.status_label.configure(text="Face Not Recognized", text_color="red")
+            if is_new and result.status:
+                text, text_color = result.status
+                self.status_label.configure(text=text, text_color=text_color)
 
-                    # Draw visual feedback on frame
-                    cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-                    
-                    # Draw a label with a name below the face
-                    cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
-                    cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 1.0, (255, 255, 255), 1)
+            if frame is not None:
+                self._frame = frame
+            if self._frame is not None:
+                # Resized into the renderer's own buffer; the recognition worker may still be reading the frame
+                self.renderer.paint(self._frame, result.annotations, source_size=result.frame_size)
 
-                # Convert to ImageTk
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb)
-                imgtk = ctk.CTkImage(light_image=img, dark_image=img, size=(640, 480))
-                
-                self.camera_label.configure(image=imgtk, text="")
-                self.camera_label.image = imgtk # Keep reference
+            self._log_throughput()
+            self._update_overlay()
             
             if self.is_running:
-                self.after(10, self.update_camera)
+                self.after(int(1000 / Config.DISPLAY_FPS), self.update_camera)
+
+    def _log_throughput(self):
+        interval = Config.PIPELINE_STATS_INTERVAL
+        now = time.monotonic()
+        if interval and now - self._last_stats_log >= interval:
+            self._last_stats_log = now
+            self.logger.info(f"Pipeline throughput: {self.pipeline.throughput()}")
+
+    def _update_overlay(self):
+        now = time.monotonic()
+        if self.debug_label is not None and now - self._last_overlay >= 0.5:
+            self._last_overlay = now
+            self.debug_label.configure(text=metrics.overlay_text())
@@ -1,73 +1,241 @@
+import datetime
+import logging
+import threading
+from typing import List, Optional, Tuple
+
 import customtkinter as ctk
+from core.database import day_bounds
+from utils.config import Config
+
+LOGS_AFTER_LIMIT = 500  # Rows per keyset query when catching up on new activity
+
 
 class HomeFrame(ctk.CTkFrame):
+    """
+    Dashboard with today's stats and a scrollable activity log.
+
+    The log is virtualized: a fixed pool of row widgets is re-labelled as the
+    view scrolls over the rows held in memory. A background thread polls for
+    rows newer than the last seen attendance id (and older pages on demand), so
+    a refresh only inserts what changed.
+    """
+
     def __init__(self, master, db_manager):
         super().__init__(master)
         self.db = db_manager
-        
+        self.logger = logging.getLogger(__name__)
+
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(3, weight=1) # Log list expands
 
         self.label = ctk.CTkLabel(self, text="Dashboard", font=ctk.CTkFont(size=24, weight="bold"))
         self.label.grid(row=0, column=0, padx=20, pady=20, sticky="w")
-        
+
         # Stats
         self.stats_frame = ctk.CTkFrame(self)
         self.stats_frame.grid(row=1, column=0, padx=20, pady=0, sticky="ew")
-        
+        self.users_label = ctk.CTkLabel(self.stats_frame, font=ctk.CTkFont(size=18))
+        self.users_label.pack(pady=5, padx=20)
+        self.today_label = ctk.CTkLabel(self.stats_frame, font=ctk.CTkFont(size=18))
+        self.today_label.pack(pady=5, padx=20)
+
         # Logs Title
         self.logs_label = ctk.CTkLabel(self, text="Recent Activity", font=ctk.CTkFont(size=18, weight="bold"))
         self.logs_label.grid(row=2, column=0, padx=20, pady=(20, 10), sticky="w")
-        
-        # Logs List (Scrollable)
-        self.logs_frame = ctk.CTkScrollableFrame(self)
+
+        # Logs List: header, a fixed pool of rows and a scrollbar
+        self.logs_frame = ctk.CTkFrame(self)
         self.logs_frame.grid(row=3, column=0, padx=20, pady=10, sticky="nsew")
-        
+        self.logs_frame.grid_columnconfigure(0, weight=1)
+
+        header_frame = ctk.CTkFrame(self.logs_frame, fg_color="transparent")
+        header_frame.grid(row=0, column=0, sticky="ew", pady=2)
+        ctk.CTkLabel(header_frame, text="Name", font=ctk.CTkFont(weight="bold"), width=150, anchor="w").pack(side="left", padx=5)
+        ctk.CTkLabel(header_frame, text="Time", font=ctk.CTkFont(weight="bold"), width=150, anchor="w").pack(side="left", padx=5)
+
+        self.row_widgets: List[Tuple[ctk.CTkFrame, ctk.CTkLabel, ctk.CTkLabel]] = []
+        for i in range(Config.HOME_VISIBLE_ROWS):
+            row_frame = ctk.CTkFrame(self.logs_frame)
+            name_label = ctk.CTkLabel(row_frame, width=150, anchor="w")
+            name_label.pack(side="left", padx=5)
+            time_label = ctk.CTkLabel(row_frame, width=150, anchor="w")
+            time_label.pack(side="left", padx=5)
+            self.row_widgets.append((row_frame, name_label, time_label))
+        self.shown: List[Optional[int]] = [None] * len(self.row_widgets)  # Attendance id each row displays
+        self.empty_label = ctk.CTkLabel(self.logs_frame, text="No recent activity.")
+
+        self.scrollbar = ctk.CTkScrollbar(self.logs_frame, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, rowspan=len(self.row_widgets), sticky="ns")
+        for widget in [self.logs_frame] + [w for row in self.row_widgets for w in row]:
+            widget.bind("<MouseWheel>", self._on_mouse_wheel)
+            widget.bind("<Button-4>", lambda e: self.scroll_by(-3))
+            widget.bind("<Button-5>", lambda e: self.scroll_by(3))
+
         self.refresh_button = ctk.CTkButton(self, text="Refresh Data", command=self.update_stats)
         self.refresh_button.grid(row=4, column=0, padx=20, pady=20, sticky="e")
-        
+
+        # Loaded rows as (id, name, timestamp), oldest first; display index 0 is the newest
+        self.rows: List[Tuple[int, str, str]] = []
+        self.offset: int = 0                 # Display index of the top visible row
+        self.last_id: int = 0                # Newest attendance id seen
+        self.history_done: bool = False      # No rows older than self.rows[0]
+        self.today_count: int = 0
+        self.stats_day: Optional[datetime.date] = None
+
+        # Background refresh: the Tk timer wakes the poller only while the dashboard is on screen
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._want_stats = True
+        self._want_older = True              # The first page of history
+        self._poller = threading.Thread(target=self._poll_loop, name="home-refresh", daemon=True)
+        self._poller.start()
+        self._refresh_job = None
+
+        self._render()
         self.update_stats()
 
+    # --- Refresh ---
+
     def update_stats(self):
-        # Stats
-        stats = self.db.get_stats()
-        
-        # Clear previous widgets in stats frame
-        for widget in self.stats_frame.winfo_children():
-            widget.destroy()
-            
-        stat_label_users = ctk.CTkLabel(self.stats_frame, text=f"Total Registered Users: {stats['users']}", 
-                                  font=ctk.CTkFont(size=18))
-        stat_label_users.pack(pady=5, padx=20)
-        
-        stat_label_today = ctk.CTkLabel(self.stats_frame, text=f"Today's Attendance: {stats['today']}", 
-                                  font=ctk.CTkFont(size=18))
-        stat_label_today.pack(pady=5, padx=20)
-        
-        # Recent Logs
-        # Clear previous logs
-        for widget in self.logs_frame.winfo_children():
-            widget.destroy()
-            
-        logs = self.db.get_recent_logs(limit=20)
-        
-        if not logs:
-            no_log_label = ctk.CTkLabel(self.logs_frame, text="No recent activity.")
-            no_log_label.pack(pady=10)
+        """Refresh now: re-read the totals and fetch any new rows (the periodic refresh only fetches rows)."""
+        self._want_stats = True
+        self._wake.set()
+        if self._refresh_job is None:
+            self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        self._refresh_job = self.after(int(Config.HOME_REFRESH_SECONDS * 1000), self._tick)
+
+    def _tick(self):
+        if self.winfo_ismapped():
+            self._wake.set()
+        self._schedule_refresh()
+
+    def stop_refresh(self):
+        self._stop.set()
+        self._wake.set()
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+
+    def _poll_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                result = self._poll()
+            except Exception as e:
+                self.logger.error(f"Dashboard refresh failed: {e}")
+                continue
+            if self._stop.is_set():
+                return
+            try:
+                self.after(0, lambda: self._apply(*result))
+            except Exception:
+                return  # Window destroyed
+
+    def _poll(self):
+        """Runs on the poller thread: (stats or None, new rows, older rows or None)."""
+        new_rows, after_id = [], self.last_id
+        if self.rows or self.history_done:
+            # Keyset pagination on the id: only rows logged since the last refresh
+            while True:
+                page = self.db.get_logs_after(after_id, LOGS_AFTER_LIMIT)
+                new_rows.extend(page)
+                if len(page) < LOGS_AFTER_LIMIT:
+                    break
+                after_id = page[-1][0]
+
+        older = None
+        if self._want_older and not self.history_done:
+            self._want_older = False
+            oldest = self.rows[0][0] if self.rows else None
+            older = self.db.get_logs_before(oldest, Config.HOME_PAGE_SIZE)
+
+        # Read last, so every row fetched above is already included in the totals
+        stats = None
+        if self._want_stats or self.stats_day != datetime.date.today():
+            self._want_stats = False
+            stats = (datetime.date.today(), self.db.get_stats())
+        return stats, new_rows, older
+
+    def _apply(self, stats, new_rows, older):
+        """Runs on the UI thread: merge a poll result and re-label only the rows that changed."""
+        if stats is not None:
+            day, values = stats
+            self.stats_day, self.today_count = day, values["today"]
+            self.users_label.configure(text=f"Total Registered Users: {values['users']}")
+
+        new_rows = [row for row in new_rows if row[0] > self.last_id]
+        if new_rows:
+            self.rows.extend(new_rows)
+            self.last_id = new_rows[-1][0]
+            if stats is None and self.stats_day is not None:
+                # Counted incrementally; a full get_stats only runs on a manual refresh or a new day
+                start, end = day_bounds(self.stats_day)
+                self.today_count += sum(1 for row in new_rows if start <= str(row[2]) < end)
+            if self.offset:
+                self.offset += len(new_rows)  # Keep a scrolled-back view on the same rows
+
+        if older is not None:
+            oldest = self.rows[0][0] if self.rows else None
+            older = [row for row in reversed(older) if oldest is None or row[0] < oldest]
+            self.rows[:0] = older
+            if len(older) < Config.HOME_PAGE_SIZE:
+                self.history_done = True
+            if not self.last_id and self.rows:
+                self.last_id = self.rows[-1][0]
+
+        self.today_label.configure(text=f"Today's Attendance: {self.today_count}")
+        self._render()
+
+    # --- Virtualized list ---
+
+    def _render(self):
+        visible = len(self.row_widgets)
+        self.offset = max(0, min(self.offset, len(self.rows) - visible))
+        for i, (row_frame, name_label, time_label) in enumerate(self.row_widgets):
+            index = len(self.rows) - 1 - (self.offset + i)
+            if index < 0:
+                if self.shown[i] is not None:
+                    row_frame.grid_forget()
+                    self.shown[i] = None
+                continue
+            log_id, name, timestamp = self.rows[index]
+            if self.shown[i] == log_id:
+                continue
+            name_label.configure(text=name)
+            time_label.configure(text=str(timestamp))
+            if self.shown[i] is None:
+                row_frame.grid(row=i + 1, column=0, sticky="ew", pady=2)
+            self.shown[i] = log_id
+
+        if self.rows:
+            self.empty_label.grid_forget()
         else:
-            # Header
-            header_frame = ctk.CTkFrame(self.logs_frame, fg_color="transparent")
-            header_frame.pack(fill="x", pady=2)
-            
-            ctk.CTkLabel(header_frame, text="Name", font=ctk.CTkFont(weight="bold"), width=150, anchor="w").pack(side="left", padx=5)
-            ctk.CTkLabel(header_frame, text="Time", font=ctk.CTkFont(weight="bold"), width=150, anchor="w").pack(side="left", padx=5)
-
-            for log in logs:
-                # log is a tuple: (name, timestamp)
-                name, timestamp = log
-                
-                row_frame = ctk.CTkFrame(self.logs_frame)
-                row_frame.pack(fill="x", pady=2)
-                
-                ctk.CTkLabel(row_frame, text=name, width=150, anchor="w").pack(side="left", padx=5)
-                ctk.CTkLabel(row_frame, text=str(timestamp), width=150, anchor="w").pack(side="left", padx=5)
+            self.empty_label.grid(row=1, column=0, pady=10)
+
+        total = max(len(self.rows), 1)
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+
+        # Near the end of the loaded history: fetch the next older page in the background
+        if not self.history_done and self.rows and self.offset + 2 * visible >= len(self.rows):
+            self._want_older = True
+            self._wake.set()
+
+    def scroll_by(self, rows):
+        self.offset += rows
+        self._render()
+
+    def _on_mouse_wheel(self, event):
+        self.scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        visible = len(self.row_widgets)
+        if action == "moveto":
+            self.offset = int(float(value) * len(self.rows))
+        elif action == "scroll":
+            self.offset += int(value) * (visible if unit == "pages" else 1)
+        self._render()
@@ -1,24 +1,45 @@
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
 import customtkinter as ctk
 from .home_frame import HomeFrame
-from .register_frame import RegisterFrame
-from .attendance_frame import AttendanceFrame
 from core.database import DatabaseManager
-from core.recognition import FaceRecognizer
+from core.metrics import MetricsExporter, metrics
 from utils.config import Config
 
 ctk.set_appearance_mode(Config.THEME_MODE)
 ctk.set_default_color_theme(Config.COLOR_THEME)
 
+# Frames that need the face recognizer; they are built once warm-up has finished
+RECOGNIZER_FRAMES = ("register", "attendance")
+
+
 class MainWindow(ctk.CTk):
-    def __init__(self):
+    def __init__(self, started_at: Optional[float] = None):
         super().__init__()
+        self.logger = logging.getLogger(__name__)
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        # Seconds from started_at to each milestone ("first_paint", "ready")
+        self.startup_timings: Dict[str, float] = {}
 
         self.title("Biometric Attendance System")
         self.geometry("1000x600")
 
-        # Initialize Core Systems
-        self.db_manager = DatabaseManager()
-        self.face_recognizer = FaceRecognizer(self.db_manager)
+        # Optional metrics endpoint / JSON dump
+        self.metrics_exporter = None
+        if metrics.enabled and (Config.METRICS_PORT is not None or Config.METRICS_JSON_PATH):
+            self.metrics_exporter = MetricsExporter(metrics, port=Config.METRICS_PORT,
+                                                    json_path=Config.METRICS_JSON_PATH,
+                                                    json_interval=Config.METRICS_JSON_INTERVAL)
+            self.metrics_exporter.start()
+
+        # Local database only; the recognizer and cloud client load on the warm-up thread
+        self.db_manager = DatabaseManager(connect_cloud=False)
+        self.face_recognizer = None
+        self.warmup_error: Optional[str] = None
+        self._closing = False
 
         # Layout configuration
         self.grid_rowconfigure(0, weight=1)
@@ -48,40 +69,131 @@ class MainWindow(ctk.CTk):
                                                command=self.attendance_button_event)
         self.attendance_button.grid(row=3, column=0, sticky="ew")
 
-        # Frames
-        self.home_frame = HomeFrame(self, self.db_manager)
-        self.register_frame = RegisterFrame(self, self.face_recognizer)
-        self.attendance_frame = AttendanceFrame(self, self.face_recognizer)
+        self.warmup_label = ctk.CTkLabel(self.navigation_frame, text="Warming up...", text_color="orange")
+        self.warmup_label.grid(row=5, column=0, padx=20, pady=20)
+
+        # Frames are built the first time they are selected
+        self.frames: Dict[str, ctk.CTkFrame] = {}
+        self.selected: Optional[str] = None
+        self.placeholder = None
 
         # Select default frame
         self.select_frame_by_name("home")
 
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.after_idle(self._on_first_paint)
+        threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
+
+    def _on_first_paint(self):
+        self._record_milestone("first_paint", Config.STARTUP_BUDGET)
+
+    def _record_milestone(self, name, budget):
+        elapsed = time.perf_counter() - self.started_at
+        self.startup_timings[name] = elapsed
+        if elapsed > budget:
+            self.logger.warning(f"Startup: {name} after {elapsed:.2f}s, over the {budget:.2f}s budget")
+        else:
+            self.logger.info(f"Startup: {name} after {elapsed:.2f}s")
+
+    def _warm_up(self):
+        """Load the face model, Haar cascade and cloud client off the UI thread."""
+        try:
+            # Importing here keeps cv2 and the model out of the time to first paint
+            from core.recognition import FaceRecognizer
+            # The kiosk is a thin client when a shared recognition server is configured
+            recognizer = FaceRecognizer(self.db_manager, server_url=Config.RECOGNITION_SERVER_URL)
+            if not self._closing:
+                self.db_manager.init_cloud_db()
+        except Exception as e:
+            self.logger.error(f"Warm-up failed: {e}", exc_info=True)
+            self.warmup_error = str(e)
+            recognizer = None
+        if not self._closing:
+            self.after(0, lambda: self._on_warm(recognizer))
+        # Housekeeping after the UI is usable; check-ins only wait for one month at a time
+        if Config.ARCHIVE_ON_STARTUP and not self._closing:
+            try:
+                self.db_manager.archive_closed_months()
+            except Exception as e:
+                self.logger.error(f"Attendance archival failed: {e}", exc_info=True)
+
+    def _on_warm(self, recognizer):
+        if self._closing:
+            return
+        self.face_recognizer = recognizer
+        self._record_milestone("ready", Config.WARMUP_BUDGET)
+        if recognizer is None:
+            self.warmup_label.configure(text="Face model failed to load", text_color="red")
+        else:
+            self.warmup_label.configure(text="Ready", text_color=("gray10", "gray90"))
+        # Swap the placeholder for the real frame if the user is already waiting on it
+        if self.selected in RECOGNIZER_FRAMES:
+            self.select_frame_by_name(self.selected)
+
+    def is_ready(self):
+        return self.face_recognizer is not None or self.warmup_error is not None
+
+    def on_closing(self):
+        """Release the cameras and database connections before exiting."""
+        self._closing = True
+        for frame in self.frames.values():
+            if hasattr(frame, "stop_camera"):
+                frame.stop_camera()
+            if hasattr(frame, "stop_refresh"):
+                frame.stop_refresh()
+        self.db_manager.close()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        self.destroy()
+
+    def _get_frame(self, name):
+        """The frame for `name`, built on first use, or a placeholder while warm-up is running."""
+        if name in self.frames:
+            return self.frames[name]
+        if name == "home":
+            frame = HomeFrame(self, self.db_manager)
+        elif self.face_recognizer is None:
+            return self._get_placeholder()
+        elif name == "register":
+            from .register_frame import RegisterFrame
+            frame = RegisterFrame(self, self.face_recognizer)
+        else:
+            from .attendance_frame import AttendanceFrame
+            frame = AttendanceFrame(self, self.face_recognizer)
+        self.frames[name] = frame
+        return frame
+
+    def _get_placeholder(self):
+        if self.placeholder is None:
+            self.placeholder = ctk.CTkFrame(self)
+            self.placeholder_label = ctk.CTkLabel(self.placeholder, font=ctk.CTkFont(size=18))
+            self.placeholder_label.pack(expand=True)
+        text = self.warmup_error and f"Face recognition unavailable: {self.warmup_error}"
+        self.placeholder_label.configure(text=text or "Warming up face recognition...")
+        return self.placeholder
+
     def select_frame_by_name(self, name):
+        self.selected = name
+
         # set button color for selected button
         self.home_button.configure(fg_color=("gray75", "gray25") if name == "home" else "transparent")
         self.register_button.configure(fg_color=("gray75", "gray25") if name == "register" else "transparent")
         self.attendance_button.configure(fg_color=("gray75", "gray25") if name == "attendance" else "transparent")
 
+        # hide every other frame that has been built
+        shown = self._get_frame(name)
+        for frame in list(self.frames.values()) + [self.placeholder]:
+            if frame is not None and frame is not shown:
+                frame.grid_forget()
+                if hasattr(frame, "stop_camera"):
+                    frame.stop_camera()
+
         # show selected frame
+        shown.grid(row=0, column=1, sticky="nsew")
         if name == "home":
-            self.home_frame.grid(row=0, column=1, sticky="nsew")
-            self.home_frame.update_stats() # Refresh stats
-        else:
-            self.home_frame.grid_forget()
-            
-        if name == "register":
-            self.register_frame.grid(row=0, column=1, sticky="nsew")
-            self.register_frame.start_camera()
-        else:
-            self.register_frame.grid_forget()
-            self.register_frame.stop_camera()
-
-        if name == "attendance":
-            self.attendance_frame.grid(row=0, column=1, sticky="nsew")
-            self.attendance_frame.start_camera()
-        else:
-            self.attendance_frame.grid_forget()
-            self.attendance_frame.stop_camera()
+            shown.update_stats() # Refresh stats
+        elif hasattr(shown, "start_camera"):
+            shown.start_camera()
 
     def home_button_event(self):
         self.select_frame_by_name("home")
@@ -1,11 +1,13 @@
 import customtkinter as ctk
 import cv2
-from PIL import Image, ImageTk
 import threading
 import time
 import logging
-from typing import Optional, List
+from typing import Optional
 import numpy as np
+from core.sources import open_capture
+from utils.config import Config
+from .renderer import FrameRenderer
 
 class RegisterFrame(ctk.CTkFrame):
     def __init__(self, master, face_recognizer):
@@ -17,8 +19,8 @@ class RegisterFrame(ctk.CTkFrame):
         self.is_running: bool = False
         self.loading_camera: bool = False
         self.current_frame_data: Optional[np.ndarray] = None
-        self.capture_frames: List[np.ndarray] = []
         self.is_capturing: bool = False
+        self.reader_thread: Optional[threading.Thread] = None
         
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
@@ -33,6 +35,7 @@ class RegisterFrame(ctk.CTkFrame):
         
         self.camera_label = ctk.CTkLabel(self.camera_frame, text="Camera Feed")
         self.camera_label.pack(expand=True, fill="both", padx=10, pady=10)
+        self.renderer = FrameRenderer(self.camera_label, 400, 300)
 
         # Right Side: Form
         self.form_frame = ctk.CTkFrame(self)
@@ -76,12 +79,14 @@ class RegisterFrame(ctk.CTkFrame):
     def _init_camera(self):
         """Internal method to initialize OpenCV camera."""
         try:
-            # CAP_DSHOW is generally faster on Windows
-            new_cap = cv2.VideoCapture(0, cv2.CAP_DSHOW) 
+            new_cap = open_capture(Config.CAMERA_SOURCE)
             if new_cap.isOpened():
                 self.cap = new_cap
                 self.is_running = True
                 self.logger.info("Camera initialized successfully.")
+                # Frames are read at the camera's rate on this thread and painted at Config.DISPLAY_FPS
+                self.reader_thread = threading.Thread(target=self._read_frames, name="register-capture", daemon=True)
+                self.reader_thread.start()
                 self.after(0, self.update_camera)
             else:
                 self.logger.error("Failed to open camera.")
@@ -95,33 +100,33 @@ class RegisterFrame(ctk.CTkFrame):
     def stop_camera(self):
         """Stop the camera and release resources."""
         self.is_running = False
+        if self.reader_thread is not None:
+            self.reader_thread.join(timeout=1.0)
+            self.reader_thread = None
         if self.cap:
             self.cap.release()
             self.cap = None
+            self.current_frame_data = None
+            self.renderer.reset()
             self.logger.info("Camera stopped.")
 
-    def update_camera(self):
-        """Read frame from camera and update UI."""
-        if self.is_running and self.cap:
-            ret, frame = self.cap.read()
+    def _read_frames(self):
+        """Capture thread: keep the newest frame; each read returns a new array."""
+        cap = self.cap
+        while self.is_running and cap is not None:
+            ret, frame = cap.read()
             if ret:
-                self.current_frame_data = frame.copy()
-                
-                # If capturing for training, collect frames
-                if self.is_capturing:
-                    # Add visual indicator (Green Border)
-                    cv2.rectangle(frame, (0,0), (frame.shape[1], frame.shape[0]), (0, 255, 0), 10)
-                
-                # Convert to ImageTk
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb)
-                imgtk = ctk.CTkImage(light_image=img, dark_image=img, size=(400, 300))
-                
-                self.camera_label.configure(image=imgtk, text="")
-                self.camera_label.image = imgtk # Keep reference
-            
-            if self.is_running:
-                self.after(20, self.update_camera)
+                self.current_frame_data = frame
+            else:
+                time.sleep(0.01)
+
+    def update_camera(self):
+        """Paint the newest frame, with a green border while samples are being captured."""
+        if self.is_running:
+            frame = self.current_frame_data
+            if frame is not None:
+                self.renderer.paint(frame, border=(0, 255, 0) if self.is_capturing else None)
+            self.after(int(1000 / Config.DISPLAY_FPS), self.update_camera)
 
     def start_capture_sequence(self):
         """Begin the face capture training process."""
@@ -145,30 +150,43 @@ class RegisterFrame(ctk.CTkFrame):
         threading.Thread(target=self._capture_frames_thread, args=(name, emp_id), daemon=True).start()
 
     def _capture_frames_thread(self, name: str, emp_id: str):
-        """Capture multiple frames and trigger registration."""
+        """Feed new camera frames to a sample collector until it has enough good crops, then register."""
         self.is_capturing = True
-        self.capture_frames = []
-        target_frames = 30
+        collector = self.face_recognizer.new_sample_collector()
+        target = Config.REGISTRATION_SAMPLES
+        deadline = time.monotonic() + Config.REGISTRATION_MAX_SECONDS
+        last_frame = None
+        success, msg = False, "Registration failed"
         
-        for i in range(target_frames):
-            if not self.is_running: break
-            if self.current_frame_data is not None:
-                self.capture_frames.append(self.current_frame_data)
+        try:
+            while self.is_running and not collector.is_full() and time.monotonic() < deadline:
+                frame = self.current_frame_data
+                # The reader thread stores a new array for every frame it reads, so identity means "already sent"
+                if frame is not None and frame is not last_frame:
+                    collector.submit(frame)
+                    last_frame = frame
+                    
+                # Update progress bar
+                progress = collector.accepted / target
+                self.after(0, lambda p=progress: self.progress_bar.set(p))
                 
-            # Update progress bar
-            progress = (i + 1) / target_frames
-            self.after(0, lambda p=progress: self.progress_bar.set(p))
-            
-            time.sleep(0.05) # Capture every 50ms
+                time.sleep(0.03)
+                
+            self.is_capturing = False
+            self.after(0, lambda: self.status_label.configure(text="Processing Model...", text_color="blue"))
             
-        self.is_capturing = False
-        
-        self.after(0, lambda: self.status_label.configure(text="Processing Model...", text_color="blue"))
-        
-        # Now register with collected frames
-        success, msg = self.face_recognizer.register_new_face(self.capture_frames, name, emp_id)
-        
-        self.after(0, lambda: self._finish_registration(success, msg))
+            # Now register with the collected crops
+            samples = collector.samples()
+            self.logger.info(collector.summary())
+            success, msg = self.face_recognizer.register_samples(samples, name, emp_id)
+        except Exception as e:
+            self.logger.error(f"Registration failed: {e}", exc_info=True)
+            success, msg = False, str(e)
+        finally:
+            self.is_capturing = False
+            collector.close()
+            # Always re-enable the form, whatever happened above
+            self.after(0, lambda: self._finish_registration(success, msg))
 
     def _finish_registration(self, success: bool, msg: str):
         """Handle post-registration UI updates."""
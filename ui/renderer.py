@@ -0,0 +1,71 @@
+import warnings
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+from core.metrics import metrics
+from core.pipeline import draw_annotations
+
+
+class FrameRenderer:
+    """
+    Paints camera frames into a label through one reused PhotoImage.
+
+    Each paint resizes the frame once with OpenCV into a preallocated display
+    buffer, draws the annotations there (at display size, so the captured frame
+    is never copied or modified), and converts into an RGBA buffer that a PIL
+    image shares; the PhotoImage is then updated in place. A paint is skipped
+    when neither the frame nor the annotations changed.
+    """
+
+    def __init__(self, label, width: int, height: int):
+        self.label = label
+        self.size = (width, height)
+        self._bgr = np.empty((height, width, 3), dtype=np.uint8)
+        self._rgba = np.empty((height, width, 4), dtype=np.uint8)
+        # Shares self._rgba's memory, so converting into the buffer updates the image
+        self._image = Image.frombuffer("RGBA", self.size, self._rgba, "raw", "RGBA", 0, 1)
+        self._photo: Optional[ImageTk.PhotoImage] = None
+        self._painted: Tuple = (None, None, None)  # (frame, annotations, border) of the last paint
+
+    def paint(self, frame: np.ndarray, annotations: Sequence = (), border: Optional[Tuple[int, int, int]] = None,
+              source_size: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        Show a BGR frame with annotations and an optional BGR border. Returns False if
+        nothing changed. `source_size` is the (width, height) of the frame the
+        annotation boxes were found in, when that may differ from `frame`.
+        """
+        last_frame, last_annotations, last_border = self._painted
+        if frame is last_frame and annotations is last_annotations and border == last_border:
+            return False
+        self._painted = (frame, annotations, border)
+
+        width, height = self.size
+        with metrics.timer("display_resize"):
+            if frame.shape[:2] == (height, width):
+                np.copyto(self._bgr, frame)
+            else:
+                cv2.resize(frame, self.size, dst=self._bgr, interpolation=cv2.INTER_AREA)
+            if annotations:
+                source_width, source_height = source_size or (frame.shape[1], frame.shape[0])
+                draw_annotations(self._bgr, annotations, width / source_width, height / source_height)
+            if border is not None:
+                cv2.rectangle(self._bgr, (0, 0), (width - 1, height - 1), border, 6)
+        with metrics.timer("display_convert"):
+            cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGBA, dst=self._rgba)
+        with metrics.timer("display_paint"):
+            if self._photo is None:
+                self._photo = ImageTk.PhotoImage(self._image)
+            else:
+                self._photo.paste(self._image)
+            if self.label.cget("image") is not self._photo:
+                with warnings.catch_warnings():
+                    # CTkLabel prefers CTkImage, which would mean a new image and a rescale per frame
+                    warnings.simplefilter("ignore")
+                    self.label.configure(image=self._photo, text="")
+        return True
+
+    def reset(self) -> None:
+        """Forget the last paint, e.g. after the label showed a text message instead."""
+        self._painted = (None, None, None)
@@ -1,4 +1,5 @@
 import os
+import socket
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,14 +8,111 @@ class Config:
     SUPABASE_URL = os.getenv("SUPABASE_URL", "your-project-url")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY", "your-anon-key")
     USE_CLOUD = os.getenv("USE_CLOUD", "False").lower() == "true"
+    CLOUD_TRANSPORT = os.getenv("CLOUD_TRANSPORT", "supabase")  # supabase (client library) or rest (plain HTTP)
+    
+    # Cloud sync outbox
+    SYNC_BATCH_SIZE = 100
+    SYNC_RETRY_BASE = 2.0      # Seconds before the first retry; doubles per consecutive failure
+    SYNC_RETRY_MAX = 300.0
+    SYNC_IDLE_INTERVAL = 30.0  # Seconds between outbox polls when nothing new was logged
+    STATION_ID = os.getenv("STATION_ID", socket.gethostname())  # Uploaded with each row's local id as its cloud key
     
     # Paths
     DB_PATH = "attendance.db"
     
+    # Archival: months older than the retention window move to <DB folder>/<ARCHIVE_DIR>/attendance-YYYY-MM.db
+    ARCHIVE_DIR = "archive"
+    ARCHIVE_RETENTION_MONTHS = 3   # Months kept in the live table, the current one included
+    ARCHIVE_ON_STARTUP = True      # Archive closed months from the GUI's warm-up thread
+    
     # Appearance
     THEME_MODE = "Dark"  # System, Dark, Light
     COLOR_THEME = "blue"   # blue, green, dark-blue
     
+    # Dashboard activity log
+    HOME_REFRESH_SECONDS = 2.0  # Background poll for new attendance rows while the dashboard is shown
+    HOME_VISIBLE_ROWS = 15      # Row widgets in the pool; scrolling re-labels them instead of creating more
+    HOME_PAGE_SIZE = 100        # Older rows fetched per page when scrolling past the loaded history
+    
+    # Startup (seconds from process start; see `python main.py startup-check`)
+    STARTUP_BUDGET = 1.5        # Until the main window is first painted
+    WARMUP_BUDGET = 10.0        # Until the face model, cascade and cloud client are loaded
+    
     # Biometrics
     TOLERANCE = 0.6  # Lower is stricter
     MODEL = "hog"    # hog or cnn (cnn is slower but more accurate)
+    
+    # Camera pipeline
+    CAMERA_SOURCE = os.getenv("CAMERA_SOURCE", "0")  # Camera index, stream URL or video file
+    PIPELINE_QUEUE_SIZE = 2        # Frames buffered between capture and recognition (oldest dropped)
+    DISPLAY_FPS = 15               # Camera view repaint rate, independent of capture and recognition
+    PIPELINE_STATS_INTERVAL = 10   # Seconds between throughput log lines (0 disables)
+    
+    # Motion gate and idle mode (kiosks watching an empty hallway)
+    MOTION_GATE = True             # Skip face detection while the scene is static and no face was in view
+    MOTION_THRESHOLD = 25          # Grey-level change for a thumbnail pixel to count as moving
+    MOTION_MIN_AREA = 0.003        # Fraction of thumbnail pixels that must move
+    MOTION_FOLLOW_FRAMES = 10      # Frames still searched for faces after motion stops or the capture mode changes
+    MOTION_MAX_SKIP_SECONDS = 2.0  # Search a static scene at least this often (someone may have walked up unseen)
+    IDLE_AFTER_SECONDS = 30.0      # No motion or faces for this long enters idle mode (0 disables)
+    IDLE_FPS = 5                   # Capture rate while idle
+    IDLE_RESOLUTION = (320, 240)   # Capture size while idle (None keeps the camera's resolution)
+    
+    # Face tracking (predict once per track instead of once per frame)
+    USE_TRACKING = True
+    TRACK_IOU_THRESHOLD = 0.3
+    TRACK_CENTROID_THRESHOLD = 0.5  # Max centre shift, relative to box size, for the fallback match
+    TRACK_MAX_MISSED = 5            # Frames a track survives without a matching detection
+    TRACK_VOTE_FRAMES = 3           # Predictions voted over before a track's identity is fixed
+    TRACK_UNKNOWN_RETRY = 15        # Frames between re-checks of a track voted Unknown
+    
+    # Face detection (Haar cascade)
+    DETECTION_SCALE = 1.0             # Detect on a copy resized by this factor (1.0 = full resolution).
+                                      # The cascade's 24px window means faces under ~24/scale px are missed;
+                                      # 0.5 is faster, check the trade-off with `python -m benchmarks.detection`.
+    DETECTION_SCALE_FACTOR = 1.1      # detectMultiScale pyramid step; larger is faster but may miss faces
+    DETECTION_MIN_NEIGHBORS = 5
+    DETECTION_MIN_SIZE = 30           # Smallest face to detect, in full-resolution pixels
+    DETECTION_ROI = None              # (x0, y0, x1, y1) as fractions of the frame, e.g. (0.2, 0.0, 0.8, 1.0)
+    DETECT_AROUND_TRACKS = False      # Only search near existing tracks between full scans
+    DETECTION_FULL_SCAN_INTERVAL = 10 # Frames between full-ROI scans when detecting around tracks
+    DETECTION_TRACK_MARGIN = 0.5      # Search margin around a track, relative to its size
+    
+    # Registration sample capture
+    REGISTRATION_SAMPLES = 30         # Distinct face crops kept per new user
+    REGISTRATION_MIN_SAMPLES = 5      # Registration fails with fewer usable crops than this
+    REGISTRATION_MAX_SECONDS = 4.0    # Stop capturing after this long even if fewer samples were kept
+    REGISTRATION_WORKERS = 4          # Threads running face detection on captured frames
+    SAMPLE_SIZE = 160                 # Crops are stored as SAMPLE_SIZE x SAMPLE_SIZE grayscale
+    SAMPLE_MIN_SHARPNESS = 30.0       # Variance of the Laplacian; lower is rejected as blurry
+    SAMPLE_BRIGHTNESS_RANGE = (40, 220)  # Mean grey level outside this is rejected as badly lit
+    SAMPLE_DUPLICATE_THRESHOLD = 2.0  # Mean grey-level difference of 16x16 thumbnails below which a crop is a duplicate
+    
+    # Face model storage
+    MODEL_STORE = os.getenv("MODEL_STORE", "binary")  # binary (append-only, see core/model_store.py) or yml (legacy)
+    MODEL_STORE_PATH = "faces.store"
+    MODEL_COMPACT_MIN_RECORDS = 64    # Compact once the store has this many records and >2 per user
+    MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "model_cache")  # Memory-mapped matcher snapshot ("" disables)
+    
+    # Face matching (the binary model store always matches with the NumPy matcher)
+    MATCHER = os.getenv("MATCHER", "cv2")  # cv2 (LBPH predict) or numpy (vectorized, see core/lbp_matcher.py)
+    MATCHER_METRIC = "chisqr"         # chisqr (same distances as cv2) or hellinger (faster, 0..1 scale)
+    MATCHER_PROTOTYPES = 0            # Templates kept per user (0 = every sample, 1 = mean, >1 = k-means)
+    MATCHER_HELLINGER_THRESHOLD = 0.45  # Unknown above this when MATCHER_METRIC is hellinger; calibrate with benchmarks.matcher
+    
+    # Shared recognition server (`python main.py serve`); stations with a URL send face crops there
+    RECOGNITION_SERVER_URL = os.getenv("RECOGNITION_SERVER_URL")  # e.g. http://127.0.0.1:8765 (unset: match in-process)
+    RECOGNITION_SERVER_PORT = 8765
+    RECOGNITION_SERVER_WORKERS = 2    # Threads matching batches
+    RECOGNITION_BATCH_SIZE = 16       # Requests grouped into one batch at most
+    RECOGNITION_BATCH_WAIT = 0.0      # Extra seconds a worker waits to fill a batch (0: batch what queued up while busy)
+    RECOGNITION_SERVER_TIMEOUT = 2.0  # Client request timeout, seconds
+    RECOGNITION_SERVER_RETRY = 30.0   # Seconds a station matches locally before trying a failed server again
+    
+    # Instrumentation (per-stage timings; near-zero cost when disabled)
+    METRICS_ENABLED = os.getenv("METRICS", "False").lower() == "true"
+    METRICS_WINDOW = 512              # Samples kept per stage for the rolling percentiles
+    METRICS_OVERLAY = METRICS_ENABLED # Show the timing overlay under the attendance camera feed
+    METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None  # Prometheus /metrics
+    METRICS_JSON_PATH = os.getenv("METRICS_JSON_PATH")  # Periodic JSON dump of the snapshot
+    METRICS_JSON_INTERVAL = 10.0